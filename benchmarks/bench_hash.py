@@ -0,0 +1,91 @@
+"""
+Micro-benchmark de integrity.calculate_hash: backends y algoritmos frente al bucle original
+de 8 KB con iter(lambda: f.read(...)).
+
+Uso:
+    python benchmarks/bench_hash.py [--sizes 100K,1M,10M,100M,1G,10G] [--repeat 3]
+
+Los archivos se generan en una carpeta temporal (o en --dir, útil para medir un disco concreto).
+Por defecto se omite 10G; pásalo explícitamente en --sizes si hay espacio y tiempo.
+Los tiempos incluyen la caché de páginas del SO: para medir el disco, vacíala entre pasadas.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.integrity import calculate_hash, ALGORITHMS, BACKENDS
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def legacy_hash(file_path: Path) -> str:
+    """Implementación original: SHA-256 en bloques de 8 KB."""
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(8192), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+
+def make_file(path: Path, size: int):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:min(remaining, len(block))])
+            remaining -= len(block)
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100K,1M,10M,100M,1G", help="tamaños separados por comas")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones (se toma la mejor)")
+    parser.add_argument("--dir", type=Path, default=None, help="carpeta donde crear los archivos")
+    args = parser.parse_args()
+
+    folder = Path(tempfile.mkdtemp(prefix="bench_hash_", dir=args.dir))
+    try:
+        variants = [("legacy-8K", "sha256", legacy_hash)]
+        for algorithm in ALGORITHMS:
+            for backend in BACKENDS:
+                variants.append((backend, algorithm,
+                                 lambda p, a=algorithm, b=backend: calculate_hash(p, algorithm=a, backend=b)))
+
+        print(f"{'tamaño':>8}  {'backend':<12}{'algoritmo':<10}{'MB/s':>10}")
+        for size_text in args.sizes.split(","):
+            size = parse_size(size_text)
+            path = folder / f"data_{size_text.strip()}.bin"
+            make_file(path, size)
+            for name, algorithm, func in variants:
+                seconds = best_of(lambda: func(path), args.repeat)
+                print(f"{size_text.strip():>8}  {name:<12}{algorithm:<10}{size / seconds / 1e6:>10.0f}")
+            os.remove(path)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
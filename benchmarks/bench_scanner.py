@@ -0,0 +1,165 @@
+"""
+Benchmark del escáner: llamadas al sistema y tiempo por archivo, scandir frente al escáner
+original basado en os.walk + resolve() + exists().
+
+Uso:
+    python benchmarks/bench_scanner.py [--dirs 200] [--files 50] [--sidecars 0.2] [--dir RUTA]
+
+Se cuentan las llamadas a os.stat, os.lstat, os.scandir, os.listdir, os.readlink y
+DirEntry.stat (cada una es un viaje de ida y vuelta en un NAS). is_dir()/is_symlink() de
+DirEntry no cuentan: usan el tipo que ya trae el listado. Con --dir se puede medir sobre
+una carpeta real (p. ej. un recurso SMB montado) en lugar de un árbol sintético.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.scanner import scan_directory, MediaGroup, ALL_MEDIA_EXTENSIONS, SIDECAR_EXTENSIONS
+
+_COUNTED = ("stat", "lstat", "scandir", "listdir", "readlink")
+
+
+def legacy_scan_directory(source_dir: Path, excluded_folders=None):
+    """Copia del escáner original (os.walk con resolve() por carpeta y exists() por archivo)."""
+    source_path = Path(source_dir).resolve()
+    excluded_folders = {Path(folder).resolve() for folder in excluded_folders or ()}
+    if source_path in excluded_folders:
+        return
+    for root, dirs, files in os.walk(source_path):
+        root_path = Path(root).resolve()
+        dirs_to_remove = []
+        for dir_name in dirs:
+            dir_path = (root_path / dir_name).resolve()
+            if dir_path in excluded_folders or any(dir_path == excluded or dir_path.is_relative_to(excluded) for excluded in excluded_folders):
+                dirs_to_remove.append(dir_name)
+        for dir_name in dirs_to_remove:
+            dirs.remove(dir_name)
+        file_map = {f.lower(): f for f in files}
+        for filename in files:
+            file_path = root_path / filename
+            if not file_path.exists():
+                continue
+            if file_path.suffix.lower() in ALL_MEDIA_EXTENSIONS:
+                media_group = MediaGroup(file_path)
+                for sidecar_ext in SIDECAR_EXTENSIONS:
+                    for candidate in (f"{file_path.stem}{sidecar_ext}".lower(), f"{file_path.name}{sidecar_ext}".lower()):
+                        if candidate in file_map:
+                            sidecar_path = root_path / file_map[candidate]
+                            if sidecar_path.exists():
+                                media_group.add_sidecar(sidecar_path)
+                yield media_group
+
+
+class _CountingEntry:
+    """DirEntry que cuenta las llamadas a stat()."""
+
+    def __init__(self, entry, counts):
+        self._entry = entry
+        self._counts = counts
+
+    def stat(self, **kwargs):
+        self._counts["DirEntry.stat"] += 1
+        return self._entry.stat(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+
+class _CountingScandir:
+    def __init__(self, it, counts):
+        self._it = it
+        self._counts = counts
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountingEntry(next(self._it), self._counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def close(self):
+        self._it.close()
+
+
+def count_syscalls(scanner, root: Path):
+    """Ejecuta `scanner` contando llamadas. Retorna (grupos, contador, segundos)."""
+    counts = {name: 0 for name in _COUNTED}
+    counts["DirEntry.stat"] = 0
+    originals = {name: getattr(os, name) for name in _COUNTED}
+
+    def counting(name):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            result = originals[name](*args, **kwargs)
+            return _CountingScandir(result, counts) if name == "scandir" else result
+        return wrapper
+
+    patches = [mock.patch.object(os, name, counting(name)) for name in _COUNTED]
+    for patch in patches:
+        patch.start()
+    try:
+        start = time.perf_counter()
+        groups = list(scanner(root))
+        seconds = time.perf_counter() - start
+    finally:
+        for patch in patches:
+            patch.stop()
+    return groups, counts, seconds
+
+
+def build_tree(root: Path, dirs: int, files: int, sidecar_ratio: float):
+    for d in range(dirs):
+        folder = root / f"{2000 + d // 12}" / f"mes_{d % 12:02d}_{d}"
+        folder.mkdir(parents=True)
+        for i in range(files):
+            (folder / f"IMG_{i:04d}.JPG").touch()
+            if i < files * sidecar_ratio:
+                (folder / f"IMG_{i:04d}.xmp").touch()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=int, default=200, help="carpetas del árbol sintético")
+    parser.add_argument("--files", type=int, default=50, help="archivos multimedia por carpeta")
+    parser.add_argument("--sidecars", type=float, default=0.2, help="fracción de archivos con sidecar .xmp")
+    parser.add_argument("--dir", type=Path, default=None, help="escanear esta carpeta en lugar de generar una")
+    args = parser.parse_args()
+
+    folder = None
+    if args.dir is None:
+        folder = Path(tempfile.mkdtemp(prefix="bench_scanner_"))
+        build_tree(folder, args.dirs, args.files, args.sidecars)
+    root = args.dir or folder
+    try:
+        results = {}
+        for name, scanner in (("os.walk (original)", legacy_scan_directory), ("scandir", scan_directory)):
+            groups, counts, seconds = count_syscalls(scanner, root)
+            total = sum(counts.values())
+            results[name] = total
+            detail = ", ".join(f"{k}={v}" for k, v in counts.items() if v)
+            print(f"{name:<20} grupos={len(groups):>7}  llamadas={total:>8}  "
+                  f"por archivo={total / max(len(groups), 1):>6.2f}  {seconds * 1000:>8.1f} ms  ({detail})")
+        legacy, new = results.values()
+        print(f"Reducción de llamadas: {legacy / max(new, 1):.1f}x")
+    finally:
+        if folder is not None:
+            shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
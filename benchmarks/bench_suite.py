@@ -0,0 +1,224 @@
+"""
+Suite de benchmarks de extremo a extremo sobre un corpus sintético (ver benchmarks/corpus.py).
+
+Uso:
+    python benchmarks/bench_suite.py [--files 1000] [--repeat 3] [--only scan,date,...]
+                                     [--corpus CARPETA] [--dir RUTA] [--dest-dir RUTA]
+                                     [--output resultados.json] [--compare base.json] [--threshold 0.15]
+
+Mide rendimiento (archivos/s, MB/s) y latencia p50/p99 por operación de:
+    scan      scan_directory sobre todo el árbol (una operación = un recorrido completo)
+    date      get_date_taken por archivo, sin caché
+    hash      calculate_hash por archivo, sin caché
+    move      move_media_safe por grupo (renombrado; con --dest-dir en otro disco, copia verificada)
+    dedupe    scan_and_move_duplicates sobre todo el árbol (una operación = una búsqueda completa)
+
+Con --output los resultados se guardan en JSON. Con --compare se comparan con otro JSON y
+se marca como regresión cualquier caída de archivos/s o subida de p50/p99 mayor que
+--threshold; en ese caso el proceso termina con código 1 (útil en CI).
+Los tiempos incluyen la caché de páginas del SO.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import MANIFEST_NAME, CorpusFile, build_corpus, load_manifest
+from src.date_extractor import get_date_taken
+from src.deduplicator import scan_and_move_duplicates
+from src.integrity import calculate_hash
+from src.mover import move_media_safe
+from src.scanner import scan_directory
+
+BENCHMARKS = ("scan", "date", "hash", "move", "dedupe")
+
+# Métricas comparadas: nombre -> True si más alto es mejor
+METRICS = {"files_per_s": True, "p50_ms": False, "p99_ms": False}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano (sin interpolar)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], files: int, nbytes: int, seconds: float) -> dict:
+    return {
+        "ops": len(latencies), "files": files, "bytes": nbytes, "seconds": round(seconds, 4),
+        "files_per_s": round(files / seconds, 1) if seconds else 0.0,
+        "mb_per_s": round(nbytes / seconds / 1e6, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 3),
+    }
+
+
+def time_each(func: Callable, items: list) -> List[float]:
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def copy_tree(corpus_dir: Path, work_dir: Path) -> Path:
+    """Copia de trabajo para los benchmarks que mueven archivos (no se cronometra)."""
+    target = work_dir / "tree"
+    if target.exists():
+        shutil.rmtree(target)
+    shutil.copytree(corpus_dir, target, ignore=shutil.ignore_patterns(MANIFEST_NAME))
+    return target
+
+
+def bench_scan(corpus_dir: Path, corpus: List[CorpusFile], work_dir: Path, repeat: int, **_) -> dict:
+    latencies, groups = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        groups = sum(1 for _ in scan_directory(corpus_dir))
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, groups * repeat, 0, sum(latencies))
+
+
+def bench_date(corpus_dir: Path, corpus: List[CorpusFile], work_dir: Path, repeat: int, **_) -> dict:
+    paths = [entry.path for entry in corpus] * repeat
+    latencies = time_each(get_date_taken, paths)
+    return summarize(latencies, len(paths), 0, sum(latencies))
+
+
+def bench_hash(corpus_dir: Path, corpus: List[CorpusFile], work_dir: Path, repeat: int, **_) -> dict:
+    paths = [entry.path for entry in corpus] * repeat
+    latencies = time_each(calculate_hash, paths)
+    return summarize(latencies, len(paths), sum(os.path.getsize(p) for p in paths), sum(latencies))
+
+
+def bench_move(corpus_dir: Path, corpus: List[CorpusFile], work_dir: Path, repeat: int,
+               dest_dir: Optional[Path] = None, **_) -> dict:
+    latencies, files, nbytes = [], 0, 0
+    for _ in range(repeat):
+        tree = copy_tree(corpus_dir, work_dir)
+        dest = Path(tempfile.mkdtemp(prefix="bench_move_", dir=dest_dir or work_dir))
+        # Fechas resueltas antes: se mide solo el movimiento
+        groups = [(group, get_date_taken(group.main_file)) for group in scan_directory(tree)]
+        for group, date in groups:
+            start = time.perf_counter()
+            result = move_media_safe(group, dest, date_taken=date)
+            latencies.append(time.perf_counter() - start)
+            nbytes += result.size
+        files += len(groups)
+        shutil.rmtree(dest)
+    return summarize(latencies, files, nbytes, sum(latencies))
+
+
+def bench_dedupe(corpus_dir: Path, corpus: List[CorpusFile], work_dir: Path, repeat: int, **_) -> dict:
+    latencies, files, nbytes = [], 0, 0
+    for _ in range(repeat):
+        tree = copy_tree(corpus_dir, work_dir)
+        start = time.perf_counter()
+        for _message in scan_and_move_duplicates(tree):
+            pass
+        latencies.append(time.perf_counter() - start)
+        files += len(corpus)
+        nbytes += sum(entry.path.stat().st_size for entry in corpus)
+    return summarize(latencies, files, nbytes, sum(latencies))
+
+
+RUNNERS: Dict[str, Callable[..., dict]] = {
+    "scan": bench_scan, "date": bench_date, "hash": bench_hash, "move": bench_move, "dedupe": bench_dedupe,
+}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Regresiones de `current` frente a `baseline` (mismas claves de resultados)."""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def print_table(results: dict, baseline: Optional[dict] = None):
+    print(f"{'benchmark':<10}{'ops':>8}{'arch/s':>12}{'MB/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'Δ arch/s':>11}")
+    for name, r in results.items():
+        delta = ""
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base.get("files_per_s"):
+            delta = f"{(r['files_per_s'] - base['files_per_s']) / base['files_per_s']:+.1%}"
+        print(f"{name:<10}{r['ops']:>8}{r['files_per_s']:>12.1f}{r['mb_per_s']:>10.1f}"
+              f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{delta:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000, help="archivos del corpus generado")
+    parser.add_argument("--seed", type=int, default=0, help="semilla del corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="pasadas por benchmark")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="benchmarks separados por comas")
+    parser.add_argument("--corpus", type=Path, default=None, help="corpus ya generado con corpus.py")
+    parser.add_argument("--dir", type=Path, default=None, help="carpeta de trabajo (disco a medir)")
+    parser.add_argument("--dest-dir", type=Path, default=None, help="destino de 'move' (otro disco: copia)")
+    parser.add_argument("--output", type=Path, default=None, help="guardar los resultados en JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON de referencia para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.15, help="empeoramiento tolerado (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(RUNNERS)
+    if unknown:
+        parser.error(f"benchmarks desconocidos: {', '.join(sorted(unknown))}")
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_suite_", dir=args.dir))
+    try:
+        if args.corpus:
+            corpus_dir, corpus = args.corpus, load_manifest(args.corpus)
+        else:
+            corpus_dir = work_dir / "corpus"
+            corpus = build_corpus(corpus_dir, files=args.files, seed=args.seed)
+
+        results = {}
+        for name in selected:
+            results[name] = RUNNERS[name](corpus_dir, corpus, work_dir, args.repeat, dest_dir=args.dest_dir)
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {
+        "meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "files": len(corpus),
+                 "seed": args.seed, "repeat": args.repeat},
+        "results": results,
+    }
+    print_table(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if baseline is not None:
+        regressions = compare(baseline, report, args.threshold)
+        for line in regressions:
+            print(f"REGRESIÓN {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Generador de un corpus multimedia sintético y reproducible para benchmarks y pruebas de escala.
+
+Uso:
+    python benchmarks/corpus.py DESTINO [--files 1000] [--dirs 20] [--duplicates 0.1]
+                                        [--sidecars 0.2] [--image-size 256] [--payload 256K] [--seed 0]
+
+A diferencia de los archivos vacíos de los tests, cada archivo tiene contenido real:
+- JPEG, PNG y WebP con EXIF (DateTimeOriginal) y una maker note voluminosa, como las cámaras;
+- MP4 y MOV con `ftyp` + `mdat` + `moov/mvhd` (moov al final, como graban las cámaras);
+- RAW basados en TIFF (.dng, .nef, .arw, .cr2, .orf, .pef) con IFD0, sub-IFD EXIF y datos de sensor,
+  y RAF (cabecera Fujifilm + JPEG con EXIF + datos de sensor);
+- sidecars .xmp y una proporción controlada de duplicados exactos en otras carpetas.
+
+La misma semilla produce los mismos bytes (con la misma versión de Pillow). Al terminar se
+escribe `manifest.json` con la fecha esperada de cada archivo y el original de cada duplicado.
+"""
+import argparse
+import io
+import json
+import random
+import shutil
+import struct
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Proporción de cada tipo de archivo principal (se normaliza)
+DEFAULT_MIX = {".jpg": 0.45, ".png": 0.05, ".webp": 0.05, ".mp4": 0.1, ".mov": 0.05,
+               ".dng": 0.08, ".nef": 0.08, ".arw": 0.04, ".cr2": 0.04, ".orf": 0.02, ".pef": 0.02, ".raf": 0.02}
+
+IMAGE_FORMATS = {".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+VIDEO_FORMATS = {".mp4": b"isom", ".mov": b"qt  "}
+RAW_MAKES = {".dng": "Adobe", ".nef": "NIKON CORPORATION", ".arw": "SONY", ".cr2": "Canon",
+             ".orf": "OLYMPUS IMAGING CORP.", ".pef": "PENTAX"}
+
+MANIFEST_NAME = "manifest.json"
+
+_MP4_EPOCH = datetime(1904, 1, 1)
+_FIRST_DATE = datetime(2015, 1, 1)
+_EXIF_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class CorpusFile:
+    """Un archivo principal del corpus y lo que deberían encontrar los lectores."""
+
+    def __init__(self, path: Path, expected_date: datetime, sidecar: Optional[Path] = None,
+                 duplicate_of: Optional[Path] = None):
+        self.path = path
+        self.expected_date = expected_date
+        self.sidecar = sidecar
+        # Archivo del que es copia exacta (None si es único)
+        self.duplicate_of = duplicate_of
+
+    def as_dict(self, root: Path) -> dict:
+        rel = lambda p: None if p is None else p.relative_to(root).as_posix()
+        return {"path": rel(self.path), "date": self.expected_date.isoformat(),
+                "sidecar": rel(self.sidecar), "duplicate_of": rel(self.duplicate_of)}
+
+    def __repr__(self):
+        return f"<CorpusFile {self.path.name} {self.expected_date:%Y-%m-%d}>"
+
+
+def build_corpus(folder: Path, files: int = 1000, dirs: int = 20, duplicate_ratio: float = 0.1,
+                 sidecar_ratio: float = 0.2, image_size: int = 256, payload_size: int = 256 * 1024,
+                 mix: Optional[Dict[str, float]] = None, seed: int = 0) -> List[CorpusFile]:
+    """
+    Genera `files` archivos principales repartidos en `dirs` carpetas (DCIM/100CAM00...).
+
+    Args:
+        duplicate_ratio: fracción de archivos que son copia exacta de otro anterior.
+        sidecar_ratio: fracción de fotos y RAW con un .xmp al lado.
+        image_size: lado en píxeles de JPEG/PNG/WebP (ruido: apenas comprime).
+        payload_size: bytes de datos de vídeo o de sensor en MP4/MOV/RAW.
+        mix: proporción por extensión (por defecto DEFAULT_MIX).
+
+    Returns:
+        Lista de CorpusFile en orden de creación (también en manifest.json).
+    """
+    folder = Path(folder)
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    extensions = list(mix)
+    weights = [mix[ext] for ext in extensions]
+    folders = [folder / "DCIM" / f"{100 + i}CAM{i:02d}" for i in range(max(1, dirs))]
+    for path in folders:
+        path.mkdir(parents=True, exist_ok=True)
+
+    corpus: List[CorpusFile] = []
+    originals: List[CorpusFile] = []
+    for i in range(files):
+        target_dir = folders[i % len(folders)]
+        if originals and rng.random() < duplicate_ratio:
+            original = rng.choice(originals)
+            path = target_dir / f"COPY_{i:06d}{original.path.suffix}"
+            shutil.copyfile(original.path, path)
+            corpus.append(CorpusFile(path, original.expected_date, duplicate_of=original.path))
+            continue
+
+        ext = rng.choices(extensions, weights)[0]
+        date = _FIRST_DATE + timedelta(seconds=rng.randrange(8 * 365 * 86400))
+        path = target_dir / f"IMG_{i:06d}{ext}"
+        path.write_bytes(make_media(ext, date, rng, image_size, payload_size))
+
+        sidecar = None
+        if ext not in VIDEO_FORMATS and rng.random() < sidecar_ratio:
+            sidecar = path.with_suffix(".xmp")
+            sidecar.write_text(make_xmp(date), encoding="utf-8")
+        entry = CorpusFile(path, date, sidecar)
+        corpus.append(entry)
+        originals.append(entry)
+
+    manifest = {"seed": seed, "files": [entry.as_dict(folder) for entry in corpus]}
+    (folder / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return corpus
+
+
+def make_media(ext: str, date: datetime, rng: random.Random, image_size: int = 256,
+               payload_size: int = 256 * 1024) -> bytes:
+    """Bytes de un archivo `ext` con fecha de captura `date`."""
+    if ext in IMAGE_FORMATS:
+        return make_image(IMAGE_FORMATS[ext], date, rng, image_size)
+    if ext in VIDEO_FORMATS:
+        return make_video(VIDEO_FORMATS[ext], date, rng.randbytes(payload_size))
+    if ext in RAW_MAKES:
+        return make_tiff_raw(RAW_MAKES[ext], date, rng.randbytes(payload_size), canon=ext == ".cr2",
+                             magic=b"RO" if ext == ".orf" else b"*\x00")
+    if ext == ".raf":
+        return make_raf(date, rng, rng.randbytes(payload_size))
+    raise ValueError(f"Extensión no soportada por el generador: {ext}")
+
+
+def make_image(fmt: str, date: datetime, rng: random.Random, size: int) -> bytes:
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif[0x010F] = "OrdenaFotos"
+    exif[0x0132] = date.strftime(_EXIF_FORMAT)
+    exif.get_ifd(0x8769)[0x9003] = date.strftime(_EXIF_FORMAT)
+    # Maker note voluminosa, como en las cámaras reales
+    exif.get_ifd(0x8769)[0x927C] = rng.randbytes(16 * 1024)
+
+    image = Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+    out = io.BytesIO()
+    image.save(out, fmt, exif=exif)
+    return out.getvalue()
+
+
+def make_video(brand: bytes, date: datetime, payload: bytes) -> bytes:
+    """ftyp + mdat + moov(mvhd v0): la fecha es la creation_time de mvhd (segundos desde 1904)."""
+    seconds = int((date - _MP4_EPOCH).total_seconds())
+    mvhd_body = struct.pack(">B3xIIII", 0, seconds, seconds, 1000, 1000) + b"\x00" * 80
+    moov = _box(b"moov", _box(b"mvhd", mvhd_body) + _box(b"trak", b"\x00" * 64))
+    return _box(b"ftyp", brand + b"\x00\x00\x02\x00" + brand + b"mp41") + _box(b"mdat", payload) + moov
+
+
+def _box(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def make_tiff_raw(make: str, date: datetime, sensor_data: bytes, canon: bool = False,
+                  magic: bytes = b"*\x00") -> bytes:
+    """
+    RAW mínimo basado en TIFF (little endian): IFD0 con Make, DateTime y puntero al sub-IFD
+    EXIF (DateTimeOriginal), seguido de los datos de sensor. Con `canon`, cabecera CR2;
+    `magic` sustituye al 42 de TIFF (b"RO" en los ORF de Olympus).
+    """
+    header_size = 16 if canon else 8
+    date_text = date.strftime(_EXIF_FORMAT).encode("ascii") + b"\x00"
+    make_text = make.encode("ascii") + b"\x00"
+
+    ifd0_offset = header_size
+    ifd0_size = 2 + 5 * 12 + 4
+    exif_offset = ifd0_offset + ifd0_size
+    exif_size = 2 + 1 * 12 + 4
+    data_offset = exif_offset + exif_size
+    make_offset = data_offset
+    date_offset = make_offset + len(make_text)
+    sensor_offset = date_offset + len(date_text)
+
+    def entry(tag, kind, count, value):
+        return struct.pack("<HHII", tag, kind, count, value)
+
+    ifd0 = struct.pack("<H", 5) + b"".join([
+        entry(0x010F, 2, len(make_text), make_offset),        # Make
+        entry(0x0111, 4, 1, sensor_offset),                   # StripOffsets
+        entry(0x0117, 4, 1, len(sensor_data)),                # StripByteCounts
+        entry(0x0132, 2, len(date_text), date_offset),        # DateTime
+        entry(0x8769, 4, 1, exif_offset),                     # ExifIFD
+    ]) + struct.pack("<I", 0)
+    exif_ifd = struct.pack("<H", 1) + entry(0x9003, 2, len(date_text), date_offset) + struct.pack("<I", 0)
+
+    header = b"II" + magic + struct.pack("<I", ifd0_offset)
+    if canon:
+        header += b"CR\x02\x00" + struct.pack("<I", 0)
+    return header + ifd0 + exif_ifd + make_text + date_text + sensor_data
+
+
+def make_raf(date: datetime, rng: random.Random, sensor_data: bytes) -> bytes:
+    """RAF: cabecera Fujifilm con la posición del JPEG embebido (byte 84), el JPEG con EXIF y el sensor."""
+    jpeg = make_image("JPEG", date, rng, 160)
+    header_size = 160
+    header = (b"FUJIFILMCCD-RAW 0201FF383501" + b"X-T3".ljust(32, b"\x00")).ljust(84, b"\x00")
+    header += struct.pack(">II", header_size, len(jpeg))
+    header += struct.pack(">II", header_size + len(jpeg), len(sensor_data))
+    return header.ljust(header_size, b"\x00") + jpeg + sensor_data
+
+
+def make_xmp(date: datetime) -> str:
+    return ('<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+            f'<rdf:Description xmlns:exif="http://ns.adobe.com/exif/1.0/" exif:DateTimeOriginal="{date.isoformat()}"/>'
+            '</rdf:RDF></x:xmpmeta>\n')
+
+
+def load_manifest(folder: Path) -> List[CorpusFile]:
+    """Lee el manifest.json de un corpus generado antes."""
+    folder = Path(folder)
+    data = json.loads((folder / MANIFEST_NAME).read_text(encoding="utf-8"))
+    path = lambda rel: None if rel is None else folder / rel
+    return [CorpusFile(folder / item["path"], datetime.fromisoformat(item["date"]), path(item["sidecar"]),
+                       path(item["duplicate_of"])) for item in data["files"]]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dest", type=Path, help="carpeta donde crear el corpus (debe estar vacía o no existir)")
+    parser.add_argument("--files", type=int, default=1000, help="archivos principales")
+    parser.add_argument("--dirs", type=int, default=20, help="carpetas")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="fracción de duplicados exactos")
+    parser.add_argument("--sidecars", type=float, default=0.2, help="fracción de fotos con .xmp")
+    parser.add_argument("--image-size", type=int, default=256, help="lado de JPEG/PNG/WebP en píxeles")
+    parser.add_argument("--payload", default="256K", help="tamaño de los datos de vídeo y RAW")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.dest.exists() and any(args.dest.iterdir()):
+        sys.exit(f"{args.dest} no está vacía")
+    corpus = build_corpus(args.dest, args.files, args.dirs, args.duplicates, args.sidecars,
+                          args.image_size, parse_size(args.payload), seed=args.seed)
+    total = sum(entry.path.stat().st_size for entry in corpus)
+    duplicates = sum(entry.duplicate_of is not None for entry in corpus)
+    print(f"{len(corpus)} archivos ({duplicates} duplicados), {total / 1e6:.1f} MB en {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import threading
 import queue
 import webbrowser
@@ -13,10 +13,22 @@ from datetime import datetime
 from PIL import Image, ImageTk
 
 # Importamos logica de negocio
-from src.scanner import scan_directory
-from src.mover import move_media_safe, STATUS_SUCCESS, STATUS_SKIPPED, STATUS_ERROR, STATUS_DUPLICATE
+from src.mover import STATUS_SUCCESS, STATUS_SKIPPED, STATUS_ERROR, STATUS_DUPLICATE, TRANSFER_RENAME, TRANSFER_COPY
+from src.pipeline import organize_pipeline, DEFAULT_DATE_WORKERS, DEFAULT_MOVER_WORKERS
 from src.deduplicator import scan_and_move_duplicates
+from src.hash_engine import DEFAULT_HASH_WORKERS
+from src.integrity import ALGORITHMS, DEFAULT_ALGORITHM
 from src.cleaner import clean_empty_directories
+from src.scanner import DEFAULT_SCAN_WORKERS
+from src.snapshot import DirectorySnapshot
+from src.checkpoint import Checkpoint
+from src.journal import JournalError, OperationJournal, journal_path, undo_journal
+from src.watcher import watch
+from src.cache import HashCache, DateCache
+from src.log_view import drain_queue, lines_to_trim, DEFAULT_MAX_LINES
+from src.progress import ProgressTracker, format_event
+from src import metrics
+from src.profiling import RunProfiler, profile_base
 
 class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
     def __init__(self):
@@ -38,7 +50,17 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
         self.dest_path = tk.StringVar()
         self.dry_run = tk.BooleanVar(value=False)
         self.classify_by_type = tk.BooleanVar(value=False)
+        self.verify_copies = tk.BooleanVar(value=True)
+        self.incremental = tk.BooleanVar(value=False)
+        self.full_rescan = tk.BooleanVar(value=False)
+        self.watch_mode = tk.BooleanVar(value=False)
+        self.collect_metrics = tk.BooleanVar(value=False)
+        self.profile_run = tk.BooleanVar(value=False)
+        self.scan_workers = tk.IntVar(value=DEFAULT_SCAN_WORKERS)
+        self.date_workers = tk.IntVar(value=DEFAULT_DATE_WORKERS)
+        self.mover_workers = tk.IntVar(value=DEFAULT_MOVER_WORKERS)
         self.is_running = False
+        self.stop_event = threading.Event()
         self.last_log_file = None
         
         # --- Variables (Exclusión de Carpetas) ---
@@ -48,7 +70,11 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
 
         # --- Variables (Duplicados) ---
         self.dup_target_path = tk.StringVar()
+        self.dup_workers = tk.IntVar(value=DEFAULT_HASH_WORKERS)
+        self.dup_algorithm = tk.StringVar(value=DEFAULT_ALGORITHM)
+        self.dup_profile = tk.BooleanVar(value=False)
         self.is_dup_running = False
+        self.dup_cancel_event = threading.Event()
 
         # Cola de mensajes para thread-safety
         self.log_queue = queue.Queue()
@@ -186,6 +212,13 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
             bootstyle="success"
         ).pack(fill=tk.X, pady=2)
         
+        ttk.Button(
+            btn_container,
+            text="✳ Patrón",
+            command=self.add_excluded_pattern,
+            bootstyle="info"
+        ).pack(fill=tk.X, pady=2)
+        
         ttk.Button(
             btn_container,
             text="➖ Eliminar",
@@ -198,10 +231,27 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
         opts_frame.pack(fill=tk.X, pady=10)
         
         ttk.Checkbutton(opts_frame, text="Modo Simulación (Dry Run)", variable=self.dry_run, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
-        ttk.Checkbutton(opts_frame, text="Separar por tipo (RAW/Fotos/Video)", variable=self.classify_by_type, bootstyle="round-toggle").pack(side=tk.LEFT)
-
-        self.progress_bar = ttk.Progressbar(container, mode='indeterminate', bootstyle="success-striped")
-        self.progress_bar.pack(fill=tk.X, pady=(0, 15))
+        ttk.Checkbutton(opts_frame, text="Separar por tipo (RAW/Fotos/Video)", variable=self.classify_by_type, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(opts_frame, text="Verificar copias (hash)", variable=self.verify_copies, bootstyle="round-toggle").pack(side=tk.LEFT)
+
+        scan_frame = ttk.Frame(container)
+        scan_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Checkbutton(scan_frame, text="Escaneo incremental (solo cambios)", variable=self.incremental, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(scan_frame, text="Forzar reescaneo completo", variable=self.full_rescan, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(scan_frame, text="Modo vigilancia (continuo)", variable=self.watch_mode, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(scan_frame, text="Medir tiempos por etapa", variable=self.collect_metrics, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(scan_frame, text="Perfilar (cProfile)", variable=self.profile_run, bootstyle="round-toggle").pack(side=tk.LEFT)
+        ttk.Spinbox(opts_frame, from_=1, to=16, width=3, textvariable=self.mover_workers).pack(side=tk.RIGHT)
+        ttk.Label(opts_frame, text="Movimiento:").pack(side=tk.RIGHT, padx=(10, 2))
+        ttk.Spinbox(opts_frame, from_=1, to=32, width=3, textvariable=self.date_workers).pack(side=tk.RIGHT)
+        ttk.Label(opts_frame, text="Hilos fechas:").pack(side=tk.RIGHT, padx=(10, 2))
+        ttk.Spinbox(opts_frame, from_=1, to=32, width=3, textvariable=self.scan_workers).pack(side=tk.RIGHT)
+        ttk.Label(opts_frame, text="Escaneo:").pack(side=tk.RIGHT, padx=(10, 2))
+
+        self.progress_bar = ttk.Progressbar(container, mode='determinate', maximum=1000, bootstyle="success-striped")
+        self.progress_bar.pack(fill=tk.X)
+        self.progress_label = ttk.Label(container, text="", font=("Segoe UI", 9))
+        self.progress_label.pack(fill=tk.X, pady=(2, 15))
 
         # --- SECCIÓN 3: Botones de Acción ---
         btn_frame = ttk.Frame(container)
@@ -222,6 +272,11 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
                                       height=2, width=15, relief="flat", cursor="hand2")
         self.btn_open_log.pack(side=tk.LEFT, padx=5)
 
+        self.btn_undo = tk.Button(btn_frame, text="DESHACER", command=self.start_undo,
+                                  bg="#8e44ad", fg="white", font=("Segoe UI", 10, "bold"),
+                                  height=2, width=12, relief="flat", cursor="hand2")
+        self.btn_undo.pack(side=tk.LEFT, padx=5)
+
         # --- SECCIÓN 4: Log ---
         log_frame = ttk.LabelFrame(container, text=" Registro de Actividad ", padding=5)
         log_frame.pack(fill='both', expand=True, pady=(15, 0))
@@ -249,14 +304,33 @@ class OrganizerApp(tb.Window): # Extend tb.Window instead of ttk.Window
         ttk.Entry(row, textvariable=self.dup_target_path).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
         ttk.Button(row, text="Examinar", command=self.browse_dup_target, bootstyle="secondary").pack(side=tk.RIGHT)
 
-        # Botón Acción
-        self.btn_find_dups = tk.Button(container, text="BUSCAR Y MOVER DUPLICADOS", command=self.start_deduplication,
+        # Hilos de hashing
+        opts_row = ttk.Frame(container)
+        opts_row.pack(fill=tk.X)
+        ttk.Label(opts_row, text="Hilos de lectura/hash:").pack(side=tk.LEFT)
+        ttk.Spinbox(opts_row, from_=1, to=64, width=5, textvariable=self.dup_workers).pack(side=tk.LEFT, padx=5)
+        ttk.Label(opts_row, text="Algoritmo:").pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Combobox(opts_row, values=ALGORITHMS, width=10, state='readonly', textvariable=self.dup_algorithm).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(opts_row, text="Perfilar (cProfile)", variable=self.dup_profile, bootstyle="round-toggle").pack(side=tk.LEFT, padx=(20, 0))
+
+        # Botones Acción
+        dup_btn_row = ttk.Frame(container)
+        dup_btn_row.pack(pady=10)
+
+        self.btn_find_dups = tk.Button(dup_btn_row, text="BUSCAR Y MOVER DUPLICADOS", command=self.start_deduplication,
                                        bg="#f39c12", fg="white", font=("Segoe UI", 10, "bold"),
                                        height=2, width=30, relief="flat", cursor="hand2")
-        self.btn_find_dups.pack(pady=10)
+        self.btn_find_dups.pack(side=tk.LEFT, padx=5)
+
+        self.btn_stop_dups = tk.Button(dup_btn_row, text="DETENER", command=self.stop_deduplication, state='disabled',
+                                       bg="#95a5a6", fg="white", font=("Segoe UI", 10, "bold"),
+                                       height=2, width=15, relief="flat", cursor="hand2")
+        self.btn_stop_dups.pack(side=tk.LEFT, padx=5)
 
-        self.dup_progress = ttk.Progressbar(container, mode='indeterminate', bootstyle="warning-striped")
-        self.dup_progress.pack(fill=tk.X, pady=10)
+        self.dup_progress = ttk.Progressbar(container, mode='determinate', maximum=1000, bootstyle="warning-striped")
+        self.dup_progress.pack(fill=tk.X, pady=(10, 0))
+        self.dup_progress_label = ttk.Label(container, text="", font=("Segoe UI", 9))
+        self.dup_progress_label.pack(fill=tk.X, pady=(2, 10))
 
         # Log Específico
         log_frame = ttk.LabelFrame(container, text=" Resultados de Benchs ", padding=5)
@@ -310,17 +384,27 @@ SEGURIDAD:
         self.log_queue.put((message, area))
 
     def check_queue(self):
-        while not self.log_queue.empty():
-            msg, area = self.log_queue.get()
+        # Una inserción por área y tick, sea cual sea el número de mensajes acumulados
+        for area, lines in drain_queue(self.log_queue, DEFAULT_MAX_LINES).items():
             target_text = self.log_text if area == 'organizer' else self.dup_log_text
-            
-            target_text.config(state='normal')
-            target_text.insert(tk.END, msg + "\n")
-            target_text.see(tk.END)
-            target_text.config(state='disabled')
-        
+            self._append_log_lines(target_text, lines)
+
         self.after(100, self.check_queue)
 
+    def _append_log_lines(self, target_text, lines):
+        """Añade un lote de líneas y recorta el widget a las últimas DEFAULT_MAX_LINES."""
+        # Solo seguir el final si el usuario no se ha desplazado hacia arriba
+        at_bottom = target_text.yview()[1] >= 0.999
+        target_text.config(state='normal')
+        target_text.insert(tk.END, "\n".join(lines) + "\n")
+        # index('end-1c') es "<líneas+1>.0" porque el texto termina en salto de línea
+        excess = lines_to_trim(int(target_text.index('end-1c').split('.')[0]) - 1, DEFAULT_MAX_LINES)
+        if excess:
+            target_text.delete("1.0", f"{excess + 1}.0")
+        target_text.config(state='disabled')
+        if at_bottom:
+            target_text.see(tk.END)
+
     def browse_source(self):
         path = filedialog.askdirectory()
         if path: self.source_path.set(path)
@@ -343,22 +427,37 @@ SEGURIDAD:
             return
 
         self.is_running = True
+        self.stop_event.clear()
         self.btn_start.config(state='disabled', bg="#95a5a6") # Gris deshabilitado
         self.btn_stop.config(state='normal', bg="#e74c3c")
         self.btn_open_log.config(state='disabled', bg="#95a5a6")
-        self.progress_bar.start(10)
+        # Los workers publican en el tracker; la UI lo consulta cada 500 ms
+        progress = ProgressTracker()
+        self.progress_bar['value'] = 0
+        self._poll_progress(progress, self.progress_bar, self.progress_label, lambda: self.is_running)
         
         # Limpiar log visual
         self.log_text.config(state='normal')
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state='disabled')
 
+        # Los Tk vars se leen aquí (hilo de la UI), nunca desde el worker
+        scan_workers = self._spin_value(self.scan_workers, DEFAULT_SCAN_WORKERS)
+        date_workers = self._spin_value(self.date_workers, DEFAULT_DATE_WORKERS)
+        mover_workers = self._spin_value(self.mover_workers, DEFAULT_MOVER_WORKERS)
+
         threading.Thread(target=self.run_organization, 
-                         args=(src, dest, self.dry_run.get(), self.classify_by_type.get()), 
+                         args=(src, dest, self.dry_run.get(), self.classify_by_type.get()),
+                         kwargs=dict(date_workers=date_workers, mover_workers=mover_workers,
+                                     verify_copies=self.verify_copies.get(), scan_workers=scan_workers,
+                                     incremental=self.incremental.get(), full_rescan=self.full_rescan.get(),
+                                     watch_mode=self.watch_mode.get(), progress=progress,
+                                     collect_metrics=self.collect_metrics.get(), profile_run=self.profile_run.get()),
                          daemon=True).start()
 
     def stop_process(self):
         self.is_running = False
+        self.stop_event.set()
         self.log_message("!!! DETENIENDO PROCESO... Espera a que termine la tarea actual.", 'organizer')
         self.btn_stop.config(state='disabled', bg="#95a5a6")
 
@@ -374,16 +473,57 @@ SEGURIDAD:
         else:
             messagebox.showinfo("Info", "No hay log disponible reciente.")
 
-    def run_organization(self, src_path, dest_path, dry_run, classify_by_type):
+    def start_undo(self):
+        """Elige el diario de una ejecución y devuelve sus archivos al origen."""
+        initial_dir = self.dest_path.get() or (os.path.dirname(self.last_log_file) if self.last_log_file else None)
+        path = filedialog.askopenfilename(title="Diario de la ejecución a deshacer", initialdir=initial_dir,
+                                          filetypes=[("Diario de operaciones", "*.jsonl")])
+        if not path:
+            return
+        if not messagebox.askyesno("Deshacer", f"¿Devolver al origen los archivos movidos en esta ejecución?\n\n{path}"):
+            return
+
+        self.is_running = True
+        self.stop_event.clear()
+        self.btn_start.config(state='disabled', bg="#95a5a6")
+        self.btn_undo.config(state='disabled', bg="#95a5a6")
+        self.btn_stop.config(state='normal', bg="#e74c3c")
+        threading.Thread(target=self.run_undo, args=(path,), daemon=True).start()
+
+    def run_undo(self, path):
+        self.log_message(f"--- Deshaciendo: {path} ---", 'organizer')
+        counts = {STATUS_SUCCESS: 0, STATUS_SKIPPED: 0, STATUS_ERROR: 0}
+        try:
+            for record, result in undo_journal(Path(path), stop_event=self.stop_event):
+                counts[result.status] = counts.get(result.status, 0) + 1
+                if result.status != STATUS_SUCCESS:
+                    self.log_message(f"{'⏭️' if result.status == STATUS_SKIPPED else '❌'} "
+                                     f"[{Path(record['destination']).name}]: {result.message}", 'organizer')
+            if self.stop_event.is_set():
+                self.log_message(">>> PROCESO DETENIDO POR EL USUARIO <<<", 'organizer')
+            self.log_message(f"--- DESHECHO. Restaurados: {counts[STATUS_SUCCESS]} | Omitidos: {counts[STATUS_SKIPPED]} | "
+                             f"Errores: {counts[STATUS_ERROR]} ---", 'organizer')
+        except JournalError as e:
+            self.log_message(f"⚠️ No se deshace nada. {e}", 'organizer')
+        except Exception as e:
+            self.log_message(f"ERROR CRITICO: {str(e)}", 'organizer')
+        finally:
+            self.btn_undo.config(state='normal', bg="#8e44ad")
+            self.stop_ui_loading()
+
+    def run_organization(self, src_path, dest_path, dry_run, classify_by_type,
+                         date_workers=DEFAULT_DATE_WORKERS, mover_workers=DEFAULT_MOVER_WORKERS,
+                         verify_copies=True, scan_workers=DEFAULT_SCAN_WORKERS,
+                         incremental=False, full_rescan=False, watch_mode=False, progress=None,
+                         collect_metrics=False, profile_run=False):
         self.log_message(f"--- Iniciando {'SIMULACIÓN' if dry_run else 'PROCESO'} ---", 'organizer')
         self.log_message(f"Origen: {src_path}", 'organizer')
         self.log_message(f"Destino: {dest_path}", 'organizer')
         if classify_by_type:
             self.log_message("Modo: Clasificación por tipo activa (RAW/FOTOS/VIDEOS)", 'organizer')
         
-        # Preparar Log File
-        log_filename = f"operaciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        log_path = Path(dest_path) / log_filename
+        # Diario estructurado de la ejecución (permite deshacerla)
+        log_path = journal_path(Path(dest_path))
         self.last_log_file = str(log_path)
 
         if not dry_run:
@@ -394,27 +534,97 @@ SEGURIDAD:
                  self.stop_ui_loading()
                  return
 
+        # Índice de hashes persistente junto a la biblioteca destino (solo si ya existe)
+        hash_cache = None
+        if Path(dest_path).is_dir():
+            try:
+                hash_cache = HashCache.for_library(Path(dest_path))
+            except Exception as e:
+                self.log_message(f"Aviso: caché de hashes no disponible ({e})", 'organizer')
+
+        # Caché global de fechas: una simulación deja las fechas listas para la ejecución real
+        date_cache = None
         try:
-             with open(log_path, 'w', encoding='utf-8') as log_file:
+            date_cache = DateCache.default()
+        except Exception as e:
+            self.log_message(f"Aviso: caché de fechas no disponible ({e})", 'organizer')
+
+        # Instantánea del origen para escanear solo lo que cambió (nunca en simulación).
+        # En modo vigilancia no hace falta: los cambios llegan como eventos.
+        snapshot = None
+        if incremental and not dry_run and not watch_mode:
+            try:
+                snapshot = DirectorySnapshot.for_source(Path(src_path))
+                if full_rescan:
+                    self.log_message("Modo: Reescaneo completo (se refresca la instantánea)", 'organizer')
+            except Exception as e:
+                self.log_message(f"Aviso: escaneo incremental no disponible ({e})", 'organizer')
+
+        # Punto de control: si la ejecución anterior se interrumpió, se retoma donde quedó
+        checkpoint = None
+        if not dry_run and not watch_mode:
+            try:
+                checkpoint = Checkpoint.for_run(Path(src_path), Path(dest_path))
+                if checkpoint.resumed:
+                    self.log_message(f"Reanudando ejecución interrumpida: {checkpoint.resumed} grupos ya terminados", 'organizer')
+            except Exception as e:
+                self.log_message(f"Aviso: punto de control no disponible ({e})", 'organizer')
+
+        if collect_metrics:
+            metrics.reset()
+            metrics.enable()
+        profiler = None
+
+        try:
+             with OperationJournal(log_path, source=src_path, dest=dest_path, dry_run=dry_run) as journal:
                 def log_both(msg):
                     self.log_message(msg, 'organizer')
-                    log_file.write(msg + "\n")
-                    log_file.flush()
+                    journal.message(msg)
 
                 total_processed = 0
                 errors = 0
+                # Bytes por método de transferencia: lo renombrado es E/S que no se hizo
+                transferred = {TRANSFER_RENAME: [0, 0], TRANSFER_COPY: [0, 0]}
                 
-                for media_group in scan_directory(Path(src_path), set(self.excluded_folders)):
-                    if not self.is_running:
-                        log_both(">>> PROCESO DETENIDO POR EL USUARIO <<<")
-                        break
-                    
+                def run_pipeline(groups=None):
+                    return organize_pipeline(Path(src_path), Path(dest_path), set(self.excluded_folders),
+                                             dry_run=dry_run,
+                                             classify_by_type=classify_by_type,
+                                             duplicate_action='ask',
+                                             hash_cache=hash_cache,
+                                             date_cache=date_cache,
+                                             scan_workers=scan_workers,
+                                             date_workers=date_workers,
+                                             mover_workers=mover_workers,
+                                             verify_copies=verify_copies,
+                                             snapshot=snapshot,
+                                             full_rescan=full_rescan,
+                                             stop_event=self.stop_event,
+                                             groups=groups,
+                                             progress=progress,
+                                             checkpoint=checkpoint)
+
+                def watched():
+                    # Cada lote estable del origen pasa por el mismo pipeline con un índice del destino
+                    # nuevo: en un proceso de larga duración el destino cambia entre lotes
+                    excluded = set(self.excluded_folders)
+                    src_resolved, dest_resolved = Path(src_path).resolve(), Path(dest_path).resolve()
+                    if dest_resolved != src_resolved and src_resolved in dest_resolved.parents:
+                        # Lo que llega al destino no debe volver a entrar como novedad
+                        excluded.add(str(dest_resolved))
+                    log_both("Modo: Vigilancia continua (Detener para salir)")
+                    for batch in watch(Path(src_path), excluded, stop_event=self.stop_event):
+                        log_both(f"👁 Lote detectado: {len(batch)} archivos")
+                        yield from run_pipeline(batch)
+
+                if profile_run:
+                    # Solo este hilo y los del pipeline; el mainloop de Tk queda fuera
+                    profiler = RunProfiler(log_path.with_name(log_path.stem.replace("operaciones", "perfil", 1)))
+                    profiler.start()
+                pipeline = watched() if watch_mode else run_pipeline()
+
+                for media_group, result in pipeline:
                     try:
-                        result = move_media_safe(media_group, Path(dest_path), 
-                                                duplicate_action='ask', 
-                                                dry_run=dry_run,
-                                                classify_by_type=classify_by_type)
-                        
                         icon = "✅"
                         if result.status == STATUS_SKIPPED: icon = "⏭️"
                         if result.status == STATUS_DUPLICATE: icon = "👯"
@@ -422,14 +632,49 @@ SEGURIDAD:
                             icon = "❌"
                             errors += 1
                         
-                        log_both(f"{icon} [{media_group.main_file.name}]: {result.message}")
+                        self.log_message(f"{icon} [{media_group.main_file.name}]: {result.message}", 'organizer')
+                        journal.record(media_group, result)
                         total_processed += 1
+                        if result.transfer in transferred:
+                            transferred[result.transfer][0] += 1
+                            transferred[result.transfer][1] += result.size
                         
                     except Exception as e:
                         log_both(f"❌ Error inesperado con {media_group}: {e}")
                         errors += 1
                 
+                if profiler is not None:
+                    files = profiler.stop()
+                    log_both("Perfil (funciones con más tiempo propio):")
+                    for line in profiler.summary_lines():
+                        log_both(f"  {line}")
+                    log_both(f"Perfil guardado en: {', '.join(path.name for path in files)}")
+
+                if self.stop_event.is_set():
+                    log_both(">>> PROCESO DETENIDO POR EL USUARIO <<<")
+
                 log_both(f"--- FINALIZADO. Total: {total_processed} | Errores: {errors} ---")
+                if checkpoint is not None:
+                    if checkpoint.skipped:
+                        log_both(f"Punto de control: {checkpoint.skipped} grupos ya terminados se saltaron")
+                    if checkpoint.error is not None:
+                        log_both(f"Punto de control desactivado (no se podrá reanudar): {checkpoint.error}")
+                    if not self.stop_event.is_set():
+                        checkpoint.complete()
+                if snapshot is not None:
+                    log_both(f"Escaneo incremental: {snapshot.hits} carpetas sin cambios, {snapshot.misses} listadas")
+                if not dry_run:
+                    renamed, copied = transferred[TRANSFER_RENAME], transferred[TRANSFER_COPY]
+                    log_both(f"Renombrados (sin copia): {renamed[0]} ({renamed[1] / 1024 ** 3:.2f} GB) | "
+                             f"Copiados: {copied[0]} ({copied[1] / 1024 ** 3:.2f} GB)")
+                if collect_metrics:
+                    metrics.disable()
+                    log_both("Tiempo por etapa:")
+                    for line in metrics.summary_lines():
+                        log_both(f"  {line}")
+                    if not dry_run:
+                        metrics_path = metrics.write(log_path.with_name(log_path.stem.replace("operaciones", "metricas", 1) + ".json"))
+                        log_both(f"Métricas guardadas en: {metrics_path.name}")
                 
                 if not dry_run and self.is_running:
                     log_both("Limpiando carpetas vacías en origen...")
@@ -440,12 +685,39 @@ SEGURIDAD:
             self.log_message(f"ERROR CRITICO: {str(e)}", 'organizer')
         
         finally:
+            if hash_cache is not None:
+                hash_cache.close()
+            if date_cache is not None:
+                date_cache.close()
+            if snapshot is not None:
+                snapshot.close()
+            if checkpoint is not None:
+                checkpoint.close()
+            if collect_metrics:
+                metrics.disable()
+            if profiler is not None:
+                profiler.stop()
             self.stop_ui_loading()
             self.btn_open_log.config(state='normal', bg="#3498db")
 
+    def _spin_value(self, variable, default):
+        """Lee un Spinbox numérico; si el valor no es válido usa el por defecto."""
+        try:
+            return max(1, int(variable.get()))
+        except (tk.TclError, ValueError):
+            return default
+
+    def _poll_progress(self, tracker, bar, label, running):
+        """Refleja en la barra la etapa activa del tracker mientras `running()` sea cierto."""
+        event = tracker.current()
+        if event is not None:
+            bar['value'] = event.fraction * 1000
+            label.config(text=format_event(event))
+        if running():
+            self.after(500, self._poll_progress, tracker, bar, label, running)
+
     def stop_ui_loading(self):
         self.is_running = False
-        self.progress_bar.stop()
         self.btn_start.config(state='normal', bg="#00bc8c")
         self.btn_stop.config(state='disabled', bg="#e74c3c")
 
@@ -497,6 +769,19 @@ SEGURIDAD:
             self.update_excluded_listbox()
             self.save_excluded_folders()
     
+    def add_excluded_pattern(self):
+        """Pide un patrón glob de carpetas a excluir (p. ej. **/@eaDir o */.thumbnails)."""
+        pattern = simpledialog.askstring(
+            "Excluir por patrón",
+            "Patrón de carpetas a excluir (relativo al origen):\n"
+            "  **/@eaDir      -> en cualquier nivel\n"
+            "  */.thumbnails  -> solo un nivel por debajo del origen",
+            parent=self)
+        if pattern and pattern.strip() and pattern.strip() not in self.excluded_folders:
+            self.excluded_folders.append(pattern.strip())
+            self.update_excluded_listbox()
+            self.save_excluded_folders()
+    
     def remove_excluded_folders(self):
         """Elimina las carpetas seleccionadas de la lista de exclusiones."""
         selected_indices = self.excluded_listbox.curselection()
@@ -528,28 +813,61 @@ SEGURIDAD:
             return
 
         self.is_dup_running = True
+        self.dup_cancel_event.clear()
         self.btn_find_dups.config(state='disabled', bg="#95a5a6")
-        self.dup_progress.start(10)
+        self.btn_stop_dups.config(state='normal', bg="#e74c3c")
+        progress = ProgressTracker()
+        self.dup_progress['value'] = 0
+        self._poll_progress(progress, self.dup_progress, self.dup_progress_label, lambda: self.is_dup_running)
         
         # Limpiar log visual
         self.dup_log_text.config(state='normal')
         self.dup_log_text.delete(1.0, tk.END)
         self.dup_log_text.config(state='disabled')
         
-        threading.Thread(target=self.run_deduplication, args=(target,), daemon=True).start()
+        workers = self._spin_value(self.dup_workers, DEFAULT_HASH_WORKERS)
+
+        threading.Thread(target=self.run_deduplication, args=(target, workers, self.dup_algorithm.get(), progress),
+                         kwargs=dict(profile_run=self.dup_profile.get()), daemon=True).start()
+
+    def stop_deduplication(self):
+        self.dup_cancel_event.set()
+        self.log_message("!!! DETENIENDO BÚSQUEDA... Esperando a los hilos de hash en curso.", 'duplicates')
+        self.btn_stop_dups.config(state='disabled', bg="#95a5a6")
 
-    def run_deduplication(self, target_path):
+    def run_deduplication(self, target_path, workers=DEFAULT_HASH_WORKERS, algorithm=DEFAULT_ALGORITHM, progress=None,
+                          profile_run=False):
         self.log_message(f"--- Iniciando Búsqueda de Duplicados en: {target_path} ---", 'duplicates')
         
+        hash_cache = None
+        profiler = None
         try:
-            for msg in scan_and_move_duplicates(target_path):
+            hash_cache = HashCache.for_library(Path(target_path))
+            if profile_run:
+                # Fuera de la biblioteca: si no, la próxima búsqueda los trataría como candidatos
+                profiler = RunProfiler(profile_base(prefix="perfil_duplicados"))
+                profiler.start()
+            for msg in scan_and_move_duplicates(target_path, hash_cache=hash_cache,
+                                                hash_workers=workers,
+                                                algorithm=algorithm,
+                                                cancel_event=self.dup_cancel_event,
+                                                progress=progress):
                  self.log_message(msg, 'duplicates')
+            if profiler is not None:
+                files = profiler.stop()
+                for line in profiler.summary_lines():
+                    self.log_message(f"  {line}", 'duplicates')
+                self.log_message(f"Perfil guardado en: {', '.join(str(path) for path in files)}", 'duplicates')
         except Exception as e:
              self.log_message(f"ERROR: {str(e)}", 'duplicates')
         finally:
+            if profiler is not None:
+                profiler.stop()
+            if hash_cache is not None:
+                hash_cache.close()
             self.is_dup_running = False
-            self.dup_progress.stop()
             self.btn_find_dups.config(state='normal', bg="#f39c12")
+            self.btn_stop_dups.config(state='disabled', bg="#95a5a6")
 
 if __name__ == "__main__":
     app = OrganizerApp()
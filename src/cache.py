@@ -0,0 +1,305 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Nombre del índice de hashes que se guarda junto a la biblioteca
+HASH_CACHE_FILENAME = ".ordenafotos_hashes.db"
+
+# Caché de fechas de captura: es global (la clave es la identidad del archivo, no su ruta)
+DEFAULT_DATE_CACHE_PATH = Path.home() / ".ordenafotos" / "dates.db"
+DEFAULT_DATE_CACHE_SIZE = 2_000_000
+
+# Número de escrituras acumuladas antes de hacer commit (evita un fsync por archivo)
+_COMMIT_EVERY = 500
+
+
+def file_identity(st: os.stat_result) -> Optional[tuple]:
+    """
+    Retorna la identidad de un archivo: (dispositivo, inodo, tamaño, mtime_ns).
+    Si el sistema de archivos no expone inodos (st_ino == 0) retorna None y
+    el archivo no se cachea, porque la clave no sería única.
+    """
+    if not st.st_ino:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def is_cache_file(name: str) -> bool:
+    """True si el nombre corresponde al índice de hashes o a sus ficheros auxiliares de SQLite."""
+    return name.startswith(HASH_CACHE_FILENAME)
+
+
+def _identity_of(path) -> Optional[tuple]:
+    try:
+        return file_identity(os.stat(path))
+    except OSError:
+        return None
+
+
+class _SQLiteStore:
+    """
+    Base común de las cachés persistentes: conexión SQLite compartida entre hilos
+    (protegida por un lock) y commits agrupados cada `_COMMIT_EVERY` escrituras.
+    """
+    SCHEMA = ""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(self.SCHEMA)
+        self._conn.commit()
+
+    def _written(self):
+        """Cuenta una escritura y hace commit si hay suficientes pendientes. Llamar con el lock tomado."""
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HashCache(_SQLiteStore):
+    """
+    Índice persistente (SQLite) de hashes de contenido.
+    La clave es (dispositivo, inodo, algoritmo); el tamaño y el mtime_ns se guardan
+    para detectar filas obsoletas: si no coinciden con el stat actual, la fila se invalida.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS hashes ("
+        " dev INTEGER NOT NULL, ino INTEGER NOT NULL, algorithm TEXT NOT NULL,"
+        " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+        " path TEXT NOT NULL, digest TEXT NOT NULL,"
+        " PRIMARY KEY (dev, ino, algorithm))"
+    )
+
+    @classmethod
+    def for_library(cls, root: Path) -> "HashCache":
+        """Abre (o crea) el índice guardado en la raíz de la biblioteca."""
+        return cls(Path(root) / HASH_CACHE_FILENAME)
+
+    def get(self, file_path: Path, st: Optional[os.stat_result] = None, algorithm: str = "sha256") -> Optional[str]:
+        """Busca el hash de un archivo. Retorna None si no está o si la fila quedó obsoleta."""
+        if st is None:
+            st = os.stat(file_path)
+        identity = file_identity(st)
+        if identity is None:
+            self.misses += 1
+            return None
+
+        dev, ino, size, mtime_ns = identity
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, digest FROM hashes WHERE dev=? AND ino=? AND algorithm=?",
+                (dev, ino, algorithm),
+            ).fetchone()
+            if row is not None and (row[0] != size or row[1] != mtime_ns):
+                # El archivo cambió desde que se calculó el hash: invalidar
+                self._conn.execute(
+                    "DELETE FROM hashes WHERE dev=? AND ino=? AND algorithm=?",
+                    (dev, ino, algorithm),
+                )
+                self._written()
+                row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[2]
+
+    def put(self, file_path: Path, digest: str, st: Optional[os.stat_result] = None, algorithm: str = "sha256"):
+        """Guarda (o reemplaza) el hash de un archivo."""
+        if st is None:
+            st = os.stat(file_path)
+        identity = file_identity(st)
+        if identity is None:
+            return
+
+        dev, ino, size, mtime_ns = identity
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hashes (dev, ino, algorithm, size, mtime_ns, path, digest)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (dev, ino, algorithm, size, mtime_ns, str(file_path), digest),
+            )
+            self._written()
+
+    def relocate(self, file_path: Path, st: Optional[os.stat_result] = None):
+        """
+        Actualiza la ruta guardada de un archivo renombrado. La clave (dispositivo, inodo) no
+        cambia al renombrar, pero `prune` comprueba la ruta: sin esto la fila se daría por obsoleta.
+        """
+        if st is None:
+            st = os.stat(file_path)
+        identity = file_identity(st)
+        if identity is None:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE hashes SET path=? WHERE dev=? AND ino=?",
+                               (str(file_path), identity[0], identity[1]))
+            self._written()
+
+    def prune(self, seen: Optional[Dict[Tuple[int, int], Path]] = None) -> int:
+        """
+        Elimina las entradas de archivos que ya no existen (o cuya identidad cambió).
+        Solo hace stat de cada ruta, nunca lee contenido. Retorna el número de filas eliminadas.
+        Con `seen` ((dispositivo, inodo) -> ruta de los archivos encontrados en el escaneo), una
+        fila cuya ruta quedó vieja (archivo renombrado fuera de la aplicación) se conserva si su
+        inodo sigue en el escaneo sin cambios, y se actualiza su ruta.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT dev, ino, algorithm, size, mtime_ns, path FROM hashes").fetchall()
+
+        stale = []
+        moved = []
+        for dev, ino, algorithm, size, mtime_ns, path in rows:
+            expected = (dev, ino, size, mtime_ns)
+            if _identity_of(path) == expected:
+                continue
+            current = None if seen is None else seen.get((dev, ino))
+            if current is not None and _identity_of(current) == expected:
+                moved.append((str(current), dev, ino, algorithm))
+            else:
+                stale.append((dev, ino, algorithm))
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM hashes WHERE dev=? AND ino=? AND algorithm=?", stale)
+            self._conn.executemany("UPDATE hashes SET path=? WHERE dev=? AND ino=? AND algorithm=?", moved)
+            self._conn.commit()
+            self._pending = 0
+        return len(stale)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+
+class DateCache(_SQLiteStore):
+    """
+    Caché persistente de fechas de captura ya resueltas por `get_date_taken`.
+    Guarda la fecha y su origen (EXIF, vídeo o sistema de archivos) por identidad de archivo,
+    así una simulación seguida de la ejecución real solo parsea metadatos una vez.
+    Tamaño acotado con desalojo LRU: cada acierto actualiza un contador de uso.
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS dates ("
+        " dev INTEGER NOT NULL, ino INTEGER NOT NULL,"
+        " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+        " taken TEXT NOT NULL, source TEXT NOT NULL, last_used INTEGER NOT NULL,"
+        " PRIMARY KEY (dev, ino))"
+    )
+
+    def __init__(self, db_path: Path, max_entries: int = DEFAULT_DATE_CACHE_SIZE):
+        super().__init__(db_path)
+        self.max_entries = max_entries
+        self._conn.execute("CREATE INDEX IF NOT EXISTS dates_lru ON dates (last_used)")
+        row = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM dates").fetchone()
+        self._count, self._clock = row
+
+    @classmethod
+    def default(cls) -> "DateCache":
+        """Abre la caché global del usuario (~/.ordenafotos/dates.db)."""
+        DEFAULT_DATE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        return cls(DEFAULT_DATE_CACHE_PATH)
+
+    def get(self, file_path: Path, st: Optional[os.stat_result] = None) -> Optional[Tuple[datetime, str]]:
+        """Retorna (fecha, origen) o None si no está o si el archivo cambió."""
+        if st is None:
+            st = os.stat(file_path)
+        identity = file_identity(st)
+        if identity is None:
+            self.misses += 1
+            return None
+
+        dev, ino, size, mtime_ns = identity
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, taken, source FROM dates WHERE dev=? AND ino=?", (dev, ino)
+            ).fetchone()
+            if row is not None and (row[0] != size or row[1] != mtime_ns):
+                self._conn.execute("DELETE FROM dates WHERE dev=? AND ino=?", (dev, ino))
+                self._count -= 1
+                self._written()
+                row = None
+            if row is not None:
+                self._clock += 1
+                self._conn.execute("UPDATE dates SET last_used=? WHERE dev=? AND ino=?", (self._clock, dev, ino))
+                self._written()
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return datetime.fromisoformat(row[2]), row[3]
+
+    def put(self, file_path: Path, taken: datetime, source: str, st: Optional[os.stat_result] = None):
+        """Guarda la fecha resuelta; si se supera `max_entries` se desaloja el ~10% menos usado."""
+        if st is None:
+            st = os.stat(file_path)
+        identity = file_identity(st)
+        if identity is None:
+            return
+
+        dev, ino, size, mtime_ns = identity
+        with self._lock:
+            self._clock += 1
+            replaced = self._conn.execute("SELECT 1 FROM dates WHERE dev=? AND ino=?", (dev, ino)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dates (dev, ino, size, mtime_ns, taken, source, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (dev, ino, size, mtime_ns, taken.isoformat(), source, self._clock),
+            )
+            if not replaced:
+                self._count += 1
+            self._written()
+
+            if self._count > self.max_entries:
+                evict = self._count - self.max_entries + max(1, self.max_entries // 10)
+                self._conn.execute(
+                    "DELETE FROM dates WHERE rowid IN (SELECT rowid FROM dates ORDER BY last_used LIMIT ?)", (evict,)
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM dates").fetchone()[0]
+                self._conn.commit()
+                self._pending = 0
+
+    def invalidate(self, file_path: Optional[Path] = None):
+        """Olvida la fecha de un archivo, o toda la caché si no se indica ninguno."""
+        with self._lock:
+            if file_path is None:
+                self._conn.execute("DELETE FROM dates")
+                self._count = 0
+            else:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    return
+                cur = self._conn.execute("DELETE FROM dates WHERE dev=? AND ino=?", (st.st_dev, st.st_ino))
+                self._count -= cur.rowcount
+            self._conn.commit()
+            self._pending = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._count
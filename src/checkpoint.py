@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .mover import OperationResult
+from .scanner import MediaGroup
+
+# Puntos de control de las ejecuciones del organizador (uno por pareja origen/destino)
+DEFAULT_CHECKPOINT_DIR = Path.home() / ".ordenafotos" / "checkpoints"
+
+# Cada cuántos registros se fuerza la escritura a disco (fsync)
+_FSYNC_EVERY = 64
+
+
+class Checkpoint:
+    """
+    Diario JSON lines de una ejecución: una línea por grupo terminado con su destino y su
+    estado. Si la ejecución se interrumpe (Detener, suspensión, disco USB desconectado)
+    el archivo queda en disco y la siguiente ejecución con el mismo origen y destino lo retoma:
+    los grupos ya terminados que siguen en el origen sin cambios (omitidos, duplicados...) no se
+    vuelven a procesar ni se vuelve a extraer su fecha. Los que se movieron ya no están en el origen.
+
+    Al terminar una ejecución completa se borra (`complete`). Las líneas incompletas (corte de
+    luz a mitad de escritura) se ignoran al cargar. Si una escritura falla (disco lleno, permisos)
+    el punto de control se desactiva para el resto de la ejecución y el motivo queda en `error`:
+    los archivos se siguen moviendo, solo se pierde la posibilidad de reanudar.
+    """
+
+    def __init__(self, path: Path, source_dir: Optional[Path] = None, dest_dir: Optional[Path] = None):
+        self.path = Path(path)
+        # Grupos terminados que siguen en el origen: ruta del principal -> (tamaño, mtime_ns) al terminar.
+        # Los movidos no se guardan en memoria: ya no pueden volver a aparecer en el escaneo.
+        self._done: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self.skipped = 0
+        self.error: Optional[str] = None
+
+        # Grupos terminados en la ejecución interrumpida
+        self.resumed = self._load() if self.path.exists() else 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not self.resumed:
+            self._write({"type": "run", "source": str(source_dir), "dest": str(dest_dir),
+                         "started": datetime.now().isoformat(timespec="seconds")})
+
+    @staticmethod
+    def path_for(source_dir: Path, dest_dir: Path) -> Path:
+        """Ruta del punto de control de la pareja origen/destino en ~/.ordenafotos/checkpoints."""
+        source, dest = Path(source_dir).resolve(), Path(dest_dir).resolve()
+        key = hashlib.sha1(f"{source}\0{dest}".encode("utf-8")).hexdigest()[:16]
+        return DEFAULT_CHECKPOINT_DIR / f"{key}.jsonl"
+
+    @classmethod
+    def for_run(cls, source_dir: Path, dest_dir: Path, restart: bool = False) -> "Checkpoint":
+        """Abre (o retoma) el punto de control de la pareja. Con `restart` se descarta el anterior."""
+        path = cls.path_for(source_dir, dest_dir)
+        if restart and path.exists():
+            os.remove(path)
+        return cls(path, Path(source_dir).resolve(), Path(dest_dir).resolve())
+
+    def _load(self) -> int:
+        done = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") == "done":
+                    done += 1
+                    if record.get("stat"):
+                        self._done[record["file"]] = tuple(record["stat"])
+        return done
+
+    def is_done(self, media_group: MediaGroup) -> bool:
+        """True si el grupo ya se terminó y su archivo principal no ha cambiado desde entonces."""
+        expected = self._done.get(str(media_group.main_file))
+        if expected is None:
+            return False
+        try:
+            st = os.stat(media_group.main_file)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != expected:
+            return False
+        with self._lock:
+            self.skipped += 1
+        return True
+
+    def record(self, media_group: MediaGroup, result: OperationResult):
+        """Registra un grupo terminado (llamar solo si no fue un error: los errores se reintentan)."""
+        try:
+            st = os.stat(media_group.main_file)
+            stat = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            stat = None  # Movido: ya no está en el origen
+        key = str(media_group.main_file)
+        with self._lock:
+            if self.error is not None:
+                return
+            if stat:
+                self._done[key] = tuple(stat)
+            try:
+                self._write({"type": "done", "file": key, "stat": stat, "status": result.status,
+                             "target": None if result.destination is None else str(result.destination)})
+            except OSError as e:
+                # El grupo ya se movió: perder el punto de control no debe detener la ejecución
+                self.error = str(e)
+
+    def _write(self, record: dict):
+        """Llamar con el lock tomado (o desde el constructor)."""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= _FSYNC_EVERY:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                if self.error is None:
+                    self.error = str(e)
+            finally:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass  # Lo pendiente de escribir ya falló arriba
+
+    def complete(self):
+        """La ejecución terminó entera: el punto de control ya no hace falta."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,424 @@
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Interfaz de línea de comandos (sin ventana) para cron, servidores y scripts.
+#
+# El progreso se escribe en stdout como JSON lines (un objeto por línea con un campo "event").
+# Los módulos de trabajo (pipeline, deduplicador, Pillow...) se importan dentro de cada comando:
+# `--help` y los trabajos pequeños no pagan su carga.
+
+EXIT_OK = 0
+EXIT_ERRORS = 1        # El comando terminó pero algún archivo falló
+EXIT_USAGE = 2         # Argumentos o rutas no válidos (mismo código que usa argparse)
+EXIT_CRASH = 3         # Error inesperado: el comando no llegó a terminar
+EXIT_INTERRUPTED = 130  # Detenido con Ctrl+C / SIGTERM
+
+# Los hilos por defecto no se repiten aquí: las opciones quedan en None y cada comando usa el
+# DEFAULT_* de su módulo al importarlo (el parser se construye sin cargar los módulos de trabajo)
+_MODULE_DEFAULT = "por defecto, el del módulo"
+
+
+_emit_lock = threading.Lock()
+
+
+def emit(event: str, **fields):
+    """Escribe un evento de progreso como una línea JSON (seguro entre hilos)."""
+    line = json.dumps({"event": event, **fields}, ensure_ascii=False, default=str) + "\n"
+    with _emit_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+class _ProgressReporter:
+    """Hilo que emite un evento "progress" por etapa cada `interval` segundos, y otro al terminar."""
+
+    def __init__(self, tracker, interval: float = 1.0):
+        self.tracker = tracker
+        self.interval = interval
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ordenafotos-progress", daemon=True)
+
+    def _report(self):
+        for event in self.tracker.events():
+            emit("progress", **event.as_dict())
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self._report()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self._report()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="ordenafotos",
+        description="Organiza fotos y vídeos por fecha sin interfaz gráfica. El progreso se emite como JSON lines.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMANDO")
+    commands.required = True
+
+    organize = commands.add_parser("organize", help="Mover los archivos del origen al destino por año/mes")
+    organize.add_argument("source", type=Path, help="Carpeta de origen")
+    organize.add_argument("dest", type=Path, help="Carpeta de destino")
+    organize.add_argument("--dry-run", action="store_true", help="Simular sin mover nada")
+    organize.add_argument("--by-type", action="store_true", help="Separar por tipo (RAW/FOTOS/VIDEOS)")
+    organize.add_argument("--skip-duplicates", action="store_true",
+                          help="Omitir los duplicados exactos en lugar de moverlos a _DUPLICADOS_REVISAR")
+    organize.add_argument("--exclude", action="append", default=[], metavar="RUTA_O_PATRÓN",
+                          help="Carpeta o patrón glob a excluir (repetible)")
+    organize.add_argument("--no-verify", action="store_true", help="No verificar por hash las copias entre discos")
+    organize.add_argument("--incremental", action="store_true", help="Escanear solo lo que cambió desde la última vez")
+    organize.add_argument("--full-rescan", action="store_true", help="Con --incremental, recorrer todo y refrescar la instantánea")
+    organize.add_argument("--watch", action="store_true", help="Seguir vigilando el origen hasta Ctrl+C")
+    organize.add_argument("--restart", action="store_true",
+                          help="Ignorar el punto de control de una ejecución interrumpida y empezar de cero")
+    organize.add_argument("--no-clean", action="store_true", help="No borrar las carpetas vacías del origen al terminar")
+    organize.add_argument("--no-cache", action="store_true", help="No usar las cachés de hashes y fechas")
+    organize.add_argument("--journal", type=Path, metavar="ARCHIVO",
+                          help="Diario de operaciones (por defecto <destino>/operaciones_<fecha>.jsonl)")
+    organize.add_argument("--scan-workers", type=_positive_int, help=f"Hilos de listado ({_MODULE_DEFAULT})")
+    organize.add_argument("--date-workers", type=_positive_int, help=f"Hilos de fechas ({_MODULE_DEFAULT})")
+    organize.add_argument("--mover-workers", type=_positive_int, help=f"Hilos de movimiento ({_MODULE_DEFAULT})")
+    _add_metrics_argument(organize)
+    _add_profile_argument(organize)
+    organize.set_defaults(handler=cmd_organize)
+
+    dedupe = commands.add_parser("dedupe", help="Buscar duplicados exactos y moverlos a _DUPLICADOS")
+    dedupe.add_argument("target", type=Path, help="Carpeta a analizar")
+    dedupe.add_argument("--workers", type=_positive_int, help=f"Hilos de hash ({_MODULE_DEFAULT})")
+    dedupe.add_argument("--algorithm", choices=("sha256", "blake2b"), default="sha256")
+    dedupe.add_argument("--no-cache", action="store_true", help="No usar el índice de hashes de la carpeta")
+    _add_metrics_argument(dedupe)
+    _add_profile_argument(dedupe)
+    dedupe.set_defaults(handler=cmd_dedupe)
+
+    undo = commands.add_parser("undo", help="Devolver al origen lo que movió una ejecución (según su diario)")
+    undo.add_argument("journal", type=Path, help="Diario operaciones_*.jsonl de la ejecución")
+    undo.add_argument("--workers", type=_positive_int, help=f"Hilos de movimiento ({_MODULE_DEFAULT})")
+    undo.add_argument("--dry-run", action="store_true", help="Simular sin mover nada")
+    undo.add_argument("--no-verify", action="store_true", help="No verificar por hash las copias entre discos")
+    undo.set_defaults(handler=cmd_undo)
+
+    clean = commands.add_parser("clean", help="Eliminar carpetas vacías")
+    clean.add_argument("target", type=Path, help="Carpeta a limpiar")
+    clean.set_defaults(handler=cmd_clean)
+    return parser
+
+
+def _add_metrics_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--metrics", type=Path, metavar="ARCHIVO",
+                        help="Medir el tiempo por etapa y guardarlo al terminar (.prom: textfile de Prometheus; si no, JSON)")
+
+
+def _add_profile_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfilar la ejecución (cProfile, pilas muestreadas y tracemalloc) junto al "
+                             "diario, o en ~/.ordenafotos/perfiles si no hay diario")
+
+
+def _start_profiler(args, prefix: str, journal=None):
+    """
+    Con --profile, perfila desde aquí. Los archivos van junto al diario; si no hay, a
+    DEFAULT_PROFILE_DIR: dentro de la carpeta analizada acabarían entre los candidatos.
+    """
+    if not args.profile:
+        return None
+    from .profiling import RunProfiler, profile_base
+    if journal is not None:
+        base = journal.path.with_name(journal.path.stem.replace("operaciones", "perfil", 1))
+    else:
+        base = profile_base(prefix=prefix)
+    profiler = RunProfiler(base)
+    profiler.start()
+    return profiler
+
+
+def _finish_profiler(profiler):
+    if profiler is None:
+        return
+    emit("profile", files=profiler.stop(), top=profiler.summary_lines(5))
+
+
+def _start_metrics(args):
+    if args.metrics is None:
+        return
+    from . import metrics
+    metrics.reset()
+    metrics.enable()
+
+
+def _finish_metrics(args):
+    """Guarda el resumen de métricas y lo emite como evento "metrics" (una entrada por etapa)."""
+    if args.metrics is None:
+        return
+    from . import metrics
+    metrics.disable()
+    metrics.write(args.metrics)
+    stages = {name: {key: hist[key] for key in ("count", "sum", "p50", "p99")}
+              for name, hist in metrics.snapshot()["histograms"].items()}
+    emit("metrics", path=args.metrics, stages=stages)
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("debe ser 1 o mayor")
+    return number
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    stop_event = threading.Event()
+    restore = _install_stop_handlers(stop_event)
+    try:
+        return args.handler(args, stop_event)
+    except KeyboardInterrupt:
+        emit("stopped")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        # La traza va a stderr para diagnosticar; stdout sigue siendo solo JSON lines
+        import traceback
+        traceback.print_exc()
+        emit("error", message=str(e), type=type(e).__name__)
+        return EXIT_CRASH
+    finally:
+        restore()
+
+
+def _install_stop_handlers(stop_event: threading.Event):
+    """
+    La primera señal (Ctrl+C / SIGTERM) pide una parada ordenada: los movimientos en curso
+    terminan. La segunda interrumpe de inmediato.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    signals = [signal.SIGINT] + ([signal.SIGTERM] if hasattr(signal, "SIGTERM") else [])
+    previous = {sig: signal.getsignal(sig) for sig in signals}
+
+    def handler(signum, frame):
+        if stop_event.is_set():
+            raise KeyboardInterrupt
+        stop_event.set()
+        emit("stopping", signal=signum)
+
+    for sig in signals:
+        signal.signal(sig, handler)
+
+    def restore():
+        for sig, old in previous.items():
+            signal.signal(sig, old)
+    return restore
+
+
+def _check_dir(path: Path, label: str) -> bool:
+    if not path.is_dir():
+        emit("error", message=f"{label} no existe o no es una carpeta: {path}")
+        return False
+    return True
+
+
+def cmd_organize(args, stop_event: threading.Event) -> int:
+    if not _check_dir(args.source, "El origen"):
+        return EXIT_USAGE
+
+    from .cache import DateCache, HashCache
+    from .mover import STATUS_ERROR, TRANSFER_COPY, TRANSFER_RENAME
+    from .pipeline import DEFAULT_DATE_WORKERS, DEFAULT_MOVER_WORKERS, organize_pipeline
+    from .progress import ProgressTracker
+    from .scanner import DEFAULT_SCAN_WORKERS
+
+    _start_metrics(args)
+    start = time.perf_counter()
+    emit("start", command="organize", source=args.source, dest=args.dest, dry_run=args.dry_run)
+
+    if not args.dry_run:
+        args.dest.mkdir(parents=True, exist_ok=True)
+
+    hash_cache = date_cache = snapshot = checkpoint = journal = None
+    if not args.no_cache:
+        if args.dest.is_dir():
+            hash_cache = HashCache.for_library(args.dest)
+        date_cache = DateCache.default()
+    if args.incremental and not args.dry_run and not args.watch:
+        from .snapshot import DirectorySnapshot
+        snapshot = DirectorySnapshot.for_source(args.source)
+    if not args.dry_run and not args.watch:
+        from .checkpoint import Checkpoint
+        checkpoint = Checkpoint.for_run(args.source, args.dest, restart=args.restart)
+        if checkpoint.resumed:
+            emit("resume", completed=checkpoint.resumed)
+    if not args.dry_run:
+        from .journal import OperationJournal, journal_path
+        journal = OperationJournal(args.journal or journal_path(args.dest), source=args.source, dest=args.dest,
+                                   dry_run=args.dry_run)
+        emit("journal", path=journal.path)
+
+    progress = ProgressTracker()
+    options = dict(dry_run=args.dry_run, classify_by_type=args.by_type,
+                   duplicate_action='skip' if args.skip_duplicates else 'ask',
+                   hash_cache=hash_cache, date_cache=date_cache,
+                   scan_workers=args.scan_workers or DEFAULT_SCAN_WORKERS,
+                   date_workers=args.date_workers or DEFAULT_DATE_WORKERS,
+                   mover_workers=args.mover_workers or DEFAULT_MOVER_WORKERS, verify_copies=not args.no_verify,
+                   snapshot=snapshot, full_rescan=args.full_rescan, stop_event=stop_event,
+                   progress=progress, checkpoint=checkpoint)
+
+    if args.watch:
+        results = _watched(args, options, stop_event)
+    else:
+        results = organize_pipeline(args.source, args.dest, set(args.exclude), **options)
+
+    processed = errors = 0
+    transferred = {TRANSFER_RENAME: 0, TRANSFER_COPY: 0}
+    profiler = _start_profiler(args, "perfil", journal)
+    try:
+        with _ProgressReporter(progress):
+            for media_group, result in results:
+                processed += 1
+                if result.status == STATUS_ERROR:
+                    errors += 1
+                if result.transfer in transferred:
+                    transferred[result.transfer] += result.size
+                if journal is not None:
+                    journal.record(media_group, result)
+                emit("file", file=media_group.main_file, status=result.status, message=result.message,
+                     destination=result.destination, transfer=result.transfer, size=result.size)
+
+        if checkpoint is not None and not stop_event.is_set():
+            checkpoint.complete()
+        if not args.dry_run and not args.no_clean and not stop_event.is_set():
+            from .cleaner import clean_empty_directories
+            clean_empty_directories(args.source)
+    finally:
+        _finish_profiler(profiler)
+        for store in (hash_cache, date_cache, snapshot, checkpoint, journal):
+            if store is not None:
+                store.close()
+
+    if checkpoint is not None and checkpoint.error is not None:
+        emit("checkpoint_error", message=checkpoint.error)
+    _finish_metrics(args)
+    emit("summary", command="organize", processed=processed, errors=errors,
+         resumed_skipped=0 if checkpoint is None else checkpoint.skipped,
+         renamed_bytes=transferred[TRANSFER_RENAME], copied_bytes=transferred[TRANSFER_COPY],
+         seconds=round(time.perf_counter() - start, 3), stopped=stop_event.is_set())
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_ERRORS if errors else EXIT_OK
+
+
+def _watched(args, options, stop_event):
+    """
+    Resultados del modo vigilancia: cada lote estable del origen pasa por el pipeline. Cada lote
+    lista de nuevo el destino (índice propio): el daemon dura horas y otros pueden escribir en él.
+    """
+    from .pipeline import organize_pipeline
+    from .watcher import watch
+
+    excluded = set(args.exclude)
+    source, dest = args.source.resolve(), args.dest.resolve()
+    if dest != source and source in dest.parents:
+        excluded.add(str(dest))
+    for batch in watch(args.source, excluded, stop_event=stop_event):
+        emit("batch", files=len(batch))
+        yield from organize_pipeline(args.source, args.dest, excluded, groups=batch, **options)
+
+
+def cmd_dedupe(args, stop_event: threading.Event) -> int:
+    if not _check_dir(args.target, "La carpeta"):
+        return EXIT_USAGE
+
+    from .cache import HashCache
+    from .deduplicator import DuplicateStats, scan_and_move_duplicates
+    from .hash_engine import DEFAULT_HASH_WORKERS
+    from .progress import ProgressTracker
+
+    _start_metrics(args)
+    start = time.perf_counter()
+    emit("start", command="dedupe", target=args.target)
+    stats = DuplicateStats()
+    tracker = ProgressTracker()
+    hash_cache = None if args.no_cache else HashCache.for_library(args.target)
+    profiler = _start_profiler(args, "perfil_duplicados")
+    try:
+        with _ProgressReporter(tracker):
+            for message in scan_and_move_duplicates(args.target, hash_cache=hash_cache, stats=stats,
+                                                    hash_workers=args.workers or DEFAULT_HASH_WORKERS,
+                                                    algorithm=args.algorithm,
+                                                    cancel_event=stop_event, progress=tracker):
+                emit("message", text=message)
+    finally:
+        _finish_profiler(profiler)
+        if hash_cache is not None:
+            hash_cache.close()
+
+    _finish_metrics(args)
+    emit("summary", command="dedupe", partial_bytes=stats.partial_bytes, full_bytes=stats.full_bytes,
+         errors=stats.errors, seconds=round(time.perf_counter() - start, 3), stopped=stop_event.is_set())
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_ERRORS if stats.errors else EXIT_OK
+
+
+def cmd_undo(args, stop_event: threading.Event) -> int:
+    if not args.journal.is_file():
+        emit("error", message=f"El diario no existe: {args.journal}")
+        return EXIT_USAGE
+
+    from .journal import DEFAULT_UNDO_WORKERS, JournalError, undo_journal
+    from .mover import STATUS_ERROR, STATUS_SKIPPED
+
+    start = time.perf_counter()
+    emit("start", command="undo", journal=args.journal, dry_run=args.dry_run)
+    restored = skipped = errors = 0
+    try:
+        for record, result in undo_journal(args.journal, workers=args.workers or DEFAULT_UNDO_WORKERS, dry_run=args.dry_run,
+                                           verify_copies=not args.no_verify, stop_event=stop_event):
+            if result.status == STATUS_ERROR:
+                errors += 1
+            elif result.status == STATUS_SKIPPED:
+                skipped += 1
+            else:
+                restored += 1
+            emit("file", file=record["destination"], status=result.status, message=result.message,
+                 destination=result.destination, transfer=result.transfer, size=result.size)
+    except JournalError as e:
+        emit("error", message=str(e))
+        return EXIT_USAGE
+
+    emit("summary", command="undo", restored=restored, skipped=skipped, errors=errors,
+         seconds=round(time.perf_counter() - start, 3), stopped=stop_event.is_set())
+    if stop_event.is_set():
+        return EXIT_INTERRUPTED
+    return EXIT_ERRORS if errors else EXIT_OK
+
+
+def cmd_clean(args, stop_event: threading.Event) -> int:
+    if not _check_dir(args.target, "La carpeta"):
+        return EXIT_USAGE
+
+    from .cleaner import clean_empty_directories
+
+    start = time.perf_counter()
+    emit("start", command="clean", target=args.target)
+    clean_empty_directories(args.target)
+    emit("summary", command="clean", seconds=round(time.perf_counter() - start, 3))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
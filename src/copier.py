@@ -0,0 +1,139 @@
+import errno
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from .integrity import DEFAULT_ALGORITHM, DEFAULT_CHUNK_SIZE, calculate_hash, new_hasher
+
+# Motor de copia: una sola lectura del origen por archivo.
+#  - verify=True  -> se hashea cada bloque mientras se escribe y luego se comprueba el destino
+#                    contra ese digest (el origen no se vuelve a leer).
+#  - verify=False -> copia dentro del kernel (copy_file_range / sendfile), sin pasar por Python.
+
+METHOD_VERIFIED = "verified"
+METHOD_COPY_FILE_RANGE = "copy_file_range"
+METHOD_SENDFILE = "sendfile"
+METHOD_USERSPACE = "userspace"
+
+# Errores que indican "esta llamada no sirve para este par de archivos": se prueba la siguiente
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+# Tamaño máximo por llamada al kernel (Linux limita cada copy_file_range/sendfile a ~2 GiB)
+_KERNEL_CHUNK = 1024 * 1024 * 1024
+
+
+class CopyVerificationError(IOError):
+    """El destino no coincide con el contenido leído del origen."""
+
+
+class CopyResult:
+    def __init__(self, size: int, seconds: float, method: str, digest: Optional[str] = None):
+        self.size = size
+        self.seconds = seconds
+        self.method = method
+        # Hash del contenido copiado (solo en copias verificadas)
+        self.digest = digest
+
+    @property
+    def mb_per_s(self) -> float:
+        """Velocidad de la copia en MB/s (0 si fue instantánea)."""
+        return self.size / self.seconds / 1e6 if self.seconds > 0 else 0.0
+
+    def __repr__(self):
+        return f"<CopyResult {self.method} {self.size} bytes {self.mb_per_s:.1f} MB/s>"
+
+
+def copy_file(source: Path, destination: Path, verify: bool = True, algorithm: str = DEFAULT_ALGORITHM,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> CopyResult:
+    """
+    Copia `source` en `destination` preservando metadatos (como shutil.copy2).
+    El destino no debe existir: si existe se lanza FileExistsError sin tocarlo.
+    Con `verify` el contenido del destino se compara con el hash calculado durante la copia;
+    si no coincide se lanza CopyVerificationError. Si la copia falla (disco lleno, error de E/S,
+    verificación...) el destino a medio escribir se borra antes de relanzar el error.
+    """
+    start = time.perf_counter()
+    digest = None
+
+    with open(source, "rb") as src:
+        dst = open(destination, "xb")
+        # A partir de aquí el destino es nuestro: un fallo no debe dejarlo ocupando el nombre
+        try:
+            with dst:
+                if verify:
+                    digest = _copy_hashing(src, dst, algorithm, chunk_size)
+                    method = METHOD_VERIFIED
+                else:
+                    method = _copy_kernel(src, dst, os.fstat(src.fileno()).st_size)
+        except BaseException:
+            _remove_partial(destination)
+            raise
+    try:
+        size = os.stat(destination).st_size
+        if verify and calculate_hash(destination, chunk_size, algorithm=algorithm) != digest:
+            raise CopyVerificationError(f"El contenido copiado no coincide con el origen: {destination}")
+        shutil.copystat(source, destination)
+    except BaseException:
+        _remove_partial(destination)
+        raise
+    return CopyResult(size, time.perf_counter() - start, method, digest)
+
+
+def _remove_partial(destination: Path):
+    try:
+        os.remove(destination)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_hashing(src, dst, algorithm: str, chunk_size: int) -> str:
+    """Lee el origen una vez: cada bloque se pasa al hash y se escribe en el destino."""
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        n = src.readinto(buffer)
+        if not n:
+            break
+        hasher.update(view[:n])
+        dst.write(view[:n])
+    return hasher.hexdigest()
+
+
+def _copy_kernel(src, dst, size: int) -> str:
+    """
+    Copia sin pasar los datos por el espacio de usuario. Prueba copy_file_range (permite reflink
+    y copia en el servidor en NFS/SMB), luego sendfile y por último un bucle en Python.
+    Solo se cambia de método si el anterior falla antes de escribir nada.
+    """
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+
+    if hasattr(os, "copy_file_range"):
+        if _kernel_loop(lambda count: os.copy_file_range(src_fd, dst_fd, count), size):
+            return METHOD_COPY_FILE_RANGE
+
+    # En macOS/BSD sendfile solo escribe en sockets
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        if _kernel_loop(lambda count: os.sendfile(dst_fd, src_fd, None, count), size):
+            return METHOD_SENDFILE
+
+    shutil.copyfileobj(src, dst, DEFAULT_CHUNK_SIZE)
+    return METHOD_USERSPACE
+
+
+def _kernel_loop(call, size: int) -> bool:
+    """Repite `call(n)` hasta EOF. Retorna False si la llamada no está soportada para estos archivos."""
+    copied = 0
+    while True:
+        try:
+            n = call(min(_KERNEL_CHUNK, max(size - copied, DEFAULT_CHUNK_SIZE)))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                return False
+            raise
+        if n == 0:
+            return True
+        copied += n
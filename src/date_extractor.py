@@ -1,10 +1,14 @@
 import os
 import struct
-from datetime import datetime, timedelta
+import zlib
+from datetime import datetime
 from pathlib import Path
-from PIL import Image
-from PIL.ExifTags import TAGS
-import exifread
+from typing import Optional, Tuple
+
+from . import metrics
+from .cache import DateCache
+from .exif_reader import read_exif_date, read_raw_exif_date, ExifFormatError, NATIVE_EXIF_EXTENSIONS, RAW_EXIF_EXTENSIONS
+from .isobmff import read_isobmff_date, IsoBmffError, ISOBMFF_IMAGE_EXTENSIONS, ISOBMFF_VIDEO_EXTENSIONS
 
 # Definición de Extensiones Soportadas según README
 IMG_STANDARD = {
@@ -23,46 +27,116 @@ VIDEO_EXTENSIONS = {
     '.avi', '.mkv', '.wmv'  # Otros
 }
 
-def get_date_taken(file_path: Path) -> datetime:
+# Origen de la fecha resuelta (se guarda junto a la fecha en la caché)
+SOURCE_EXIF = "exif"
+SOURCE_VIDEO = "video"
+SOURCE_CTIME = "ctime"
+SOURCE_MTIME = "mtime"
+SOURCE_NOW = "now"
+
+def get_date_taken(file_path: Path, cache: Optional[DateCache] = None) -> datetime:
     """
     Intenta extraer la fecha de captura/creación del archivo con la siguiente prioridad:
     1. EXIF (para imágenes) o Tags MP4/MOV (para videos)
     2. Sistema de archivos - Fecha de Creación (ctime)
     3. Sistema de archivos - Fecha de Modificación (mtime)
+
+    Si se pasa `cache`, la fecha de un archivo cuyo contenido no ha cambiado
+    se obtiene de la caché sin volver a abrirlo.
     """
+    return get_date_with_source(file_path, cache)[0]
+
+@metrics.timed("date")
+def get_date_with_source(file_path: Path, cache: Optional[DateCache] = None) -> Tuple[datetime, str]:
+    """Igual que `get_date_taken` pero retorna también el origen de la fecha (SOURCE_*)."""
+    st = None
+    if cache is not None:
+        try:
+            st = os.stat(file_path)
+            cached = cache.get(file_path, st)
+            if cached is not None:
+                metrics.count("date.cache_hits")
+                return cached
+        except OSError:
+            st = None
+
+    date, source = _resolve_date(file_path)
+
+    # La fecha "ahora" es un último recurso que no describe al archivo: no se cachea
+    if cache is not None and st is not None and source != SOURCE_NOW:
+        cache.put(file_path, date, source, st)
+    return date, source
+
+def _resolve_date(file_path: Path) -> Tuple[datetime, str]:
     ext = file_path.suffix.lower()
     
     # 1. Prioridad 1: Metadata Interna
-    date_metadata = None
-    
     if ext in IMG_EXTENSIONS:
         date_metadata = _get_exif_date(file_path)
+        if date_metadata:
+            return date_metadata, SOURCE_EXIF
     elif ext in VIDEO_EXTENSIONS:
         date_metadata = _get_video_date(file_path)
+        if date_metadata:
+            return date_metadata, SOURCE_VIDEO
 
-    if date_metadata:
-        return date_metadata
+    return get_filesystem_date(file_path)
 
+def get_filesystem_date(file_path: Path) -> Tuple[datetime, str]:
+    """Fecha del sistema de archivos (creación, luego modificación, luego ahora). Nunca lanza."""
     # 2. Prioridad 2: Sistema de Archivos - Creación
     try:
         # En Windows, st_ctime es la fecha de creación.
         timestamp = os.path.getctime(file_path)
-        return datetime.fromtimestamp(timestamp)
-    except OSError:
+        return datetime.fromtimestamp(timestamp), SOURCE_CTIME
+    except (OSError, ValueError, OverflowError):
         pass
 
     # 3. Prioridad 3: Sistema de Archivos - Modificación
     try:
         timestamp = os.path.getmtime(file_path)
-        return datetime.fromtimestamp(timestamp)
-    except OSError:
+        return datetime.fromtimestamp(timestamp), SOURCE_MTIME
+    except (OSError, ValueError, OverflowError):
         # Fallback final
-        return datetime.now()
+        return datetime.now(), SOURCE_NOW
 
+@metrics.timed("date.exif")
 def _get_exif_date(file_path: Path) -> datetime:
     """Extracción auxiliar de metadatos EXIF para imágenes."""
+    # Intento 0: Lector nativo acotado (JPEG/PNG/WebP). Una apertura y unos pocos KB.
+    # Si el contenedor se interpreta bien, su respuesta es definitiva (Pillow leería el mismo bloque).
+    if file_path.suffix.lower() in NATIVE_EXIF_EXTENSIONS:
+        try:
+            return read_exif_date(file_path)
+        except (ExifFormatError, OSError, struct.error, zlib.error):
+            pass
+    # RAW basados en TIFF y RAF: solo IFD0 -> Exif IFD con lecturas posicionales, sin maker notes
+    elif file_path.suffix.lower() in RAW_EXIF_EXTENSIONS:
+        try:
+            return read_raw_exif_date(file_path)
+        except (ExifFormatError, OSError, struct.error):
+            pass
+    # HEIC/HEIF y CR3 son ISO-BMFF: Pillow no los abre sin plugins y exifread es lento con ellos
+    elif file_path.suffix.lower() in ISOBMFF_IMAGE_EXTENSIONS:
+        try:
+            return read_isobmff_date(file_path)
+        except (IsoBmffError, OSError, struct.error):
+            pass
+
     # Intento 1: Usando Pillow
+    date = _get_exif_date_pillow(file_path)
+    if date:
+        return date
+
+    # Intento 2: Usando ExifRead (Para RAWs y fallbacks)
+    return _get_exif_date_exifread(file_path)
+
+# Pillow y exifread se importan al primer uso: la mayoría de archivos los resuelve el lector
+# nativo, y así la CLI arranca sin cargarlos.
+
+def _get_exif_date_pillow(file_path: Path) -> datetime:
     try:
+        from PIL import Image
         with Image.open(file_path) as img:
             exif_data = img._getexif()
             if exif_data:
@@ -76,9 +150,11 @@ def _get_exif_date(file_path: Path) -> datetime:
                             continue
     except Exception:
         pass
+    return None
 
-    # Intento 2: Usando ExifRead (Para RAWs y fallbacks)
+def _get_exif_date_exifread(file_path: Path) -> datetime:
     try:
+        import exifread
         with open(file_path, 'rb') as f:
             tags = exifread.process_file(f, stop_tag='EXIF DateTimeOriginal', details=False)
             keys = ['EXIF DateTimeOriginal', 'EXIF DateTimeDigitized', 'Image DateTime']
@@ -94,74 +170,15 @@ def _get_exif_date(file_path: Path) -> datetime:
 
     return None
 
+@metrics.timed("date.video")
 def _get_video_date(file_path: Path) -> datetime:
     """
-    Intento básico de extraer fecha de creación de contenedores MP4/MOV.
-    Busca el átomo 'mvhd' dentro de 'moov'.
-    La fecha en MP4 son segundos desde el 1 de Enero de 1904 (UTC).
+    Fecha de creación de contenedores MP4/MOV: `creation_time` del átomo moov/mvhd
+    (segundos desde el 1 de Enero de 1904, UTC), esté donde esté el moov en el archivo.
     """
+    if file_path.suffix.lower() not in ISOBMFF_VIDEO_EXTENSIONS:
+        return None
     try:
-        # Solo intentamos parsear MP4/MOV nativos
-        if file_path.suffix.lower() not in ['.mp4', '.mov']:
-            return None
-
-        with open(file_path, 'rb') as f:
-            while True:
-                # Leer tamaño y tipo de átomo (Header de 8 bytes)
-                atom_header = f.read(8)
-                if len(atom_header) < 8:
-                    break
-                
-                atom_size, atom_type = struct.unpack('>I4s', atom_header)
-                atom_type = atom_type.decode('ascii')
-
-                if atom_type == 'moov':
-                    # Entramos al contenedor moov (sin avanzar, ya estamos dentro lógicamente tras el header)
-                    # Pero 'moov' es un contenedor, así que sus datos son sub-átomos. 
-                    # No saltamos, procesamos el contenido del moov buscando mvhd.
-                    # El contenido del moov es: sub-atoms.
-                    # Leemos sub-atoms hasta encontrar mvhd
-                    end_of_moov = f.tell() + atom_size - 8
-                    
-                    while f.tell() < end_of_moov:
-                        sub_header = f.read(8)
-                        if len(sub_header) < 8:
-                            break
-                        sub_size, sub_type = struct.unpack('>I4s', sub_header)
-                        sub_type = sub_type.decode('ascii')
-                        
-                        if sub_type == 'mvhd':
-                            # Movie Header Atom encontrado
-                            # Estructura v0: 1 byte version, 3 bytes flags, 4 bytes creation_time ...
-                            data = f.read(sub_size - 8)
-                            version = data[0]
-                            
-                            # Creation time está en offsets diferentes según versión
-                            if version == 0:
-                                # Version 0: creation_time está en byte 4 (4 bytes)
-                                # data[0]: version, data[1-3]: flags
-                                # data[4-7]: creation_time
-                                creation_time = struct.unpack('>I', data[4:8])[0]
-                            elif version == 1:
-                                # Version 1 (64-bit): creation_time está en byte 4 (8 bytes)
-                                creation_time = struct.unpack('>Q', data[4:12])[0]
-                            else:
-                                return None
-
-                            # MP4 epoch: 1904-01-01
-                            mp4_epoch = datetime(1904, 1, 1)
-                            return mp4_epoch + timedelta(seconds=creation_time)
-                        else:
-                            # Saltar sub-átomo si no es mvhd
-                            f.seek(sub_size - 8, 1)
-                    break
-                else:
-                    # Saltar átomo si no es moov (mvhd suele estar dentro de moov)
-                    # Si atom_size es 1, es tamaño extendido (no soportado en este script simple por ahora)
-                    if atom_size == 1: 
-                        break 
-                    f.seek(atom_size - 8, 1)
-    except Exception:
-        pass
-    
-    return None
+        return read_isobmff_date(file_path)
+    except (IsoBmffError, OSError, struct.error):
+        return None
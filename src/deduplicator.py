@@ -1,20 +1,108 @@
+import functools
 import os
 import shutil
+import threading
 from pathlib import Path
-from typing import Generator, List, Dict
-from .integrity import calculate_hash
+from typing import Callable, Generator, List, Dict, Optional, Tuple
+from . import metrics
+from .cache import HashCache, is_cache_file
+from .hash_engine import hash_files, DEFAULT_HASH_WORKERS, DEFAULT_MAX_INFLIGHT_BYTES
+from .integrity import (calculate_hash, calculate_partial_hash, partial_read_size, PARTIAL_MIN_SIZE,
+                        DEFAULT_ALGORITHM, DEFAULT_BACKEND)
+from .progress import ProgressTracker, STAGE_SCAN, STAGE_HASH, STAGE_COPY
+
+CANCELLED_MESSAGE = ">>> BÚSQUEDA DETENIDA POR EL USUARIO <<<"
 
 class DuplicateResult:
     def __init__(self, original: Path, duplicates: List[Path]):
         self.original = original
         self.duplicates = duplicates
 
-def scan_and_move_duplicates(root_path: Path) -> Generator[str, None, None]:
+class DuplicateStats:
+    """Contadores de E/S por etapa de la detección de duplicados (y duplicados que no se pudieron mover)."""
+    def __init__(self):
+        self.partial_files = 0
+        self.partial_bytes = 0
+        self.full_files = 0
+        self.full_bytes = 0
+        self.errors = 0
+
+    def __repr__(self):
+        return (f"<DuplicateStats parcial={self.partial_files} ({self.partial_bytes} B) "
+                f"completo={self.full_files} ({self.full_bytes} B)>")
+
+def _format_bytes(num_bytes: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+def _is_cancelled(cancel_event: Optional[threading.Event]) -> bool:
+    return cancel_event is not None and cancel_event.is_set()
+
+def partial_tag(algorithm: str) -> str:
+    """Etiqueta con la que se guardan en el índice las huellas parciales de `algorithm`."""
+    return f"{algorithm}-partial"
+
+def _hash_stage(files: List[Path], tag: str, hasher: Callable[[Path], str], partial: bool,
+                hash_cache: Optional[HashCache], workers: int, max_inflight_bytes: int,
+                cancel_event: Optional[threading.Event]) -> Generator[Tuple[Path, str, int], None, None]:
     """
-    Escanea recursivamente busacndo duplicados exactos (mismo contenido SHA-256).
+    Obtiene la huella de cada archivo: primero desde el índice y, para los que falten,
+    con el pool de hashing. El índice solo se toca desde este hilo; los workers solo leen.
+    Yields (ruta, digest, bytes leídos del disco). Los archivos ilegibles se omiten.
+    """
+    misses: Dict[Path, os.stat_result] = {}
+    for file_path in files:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            continue
+        if hash_cache is not None:
+            digest = hash_cache.get(file_path, st, algorithm=tag)
+            if digest is not None:
+                yield file_path, digest, 0
+                continue
+        misses[file_path] = st
+
+    def weight(st: os.stat_result) -> int:
+        return partial_read_size(st.st_size) if partial else st.st_size
+
+    jobs = ((file_path, weight(st)) for file_path, st in misses.items())
+    for file_path, digest, error in hash_files(jobs, hasher, workers, max_inflight_bytes, cancel_event):
+        if error is not None:
+            continue
+        st = misses[file_path]
+        if hash_cache is not None:
+            hash_cache.put(file_path, digest, st, algorithm=tag)
+        yield file_path, digest, weight(st)
+
+@metrics.timed("dedupe")
+def scan_and_move_duplicates(root_path: Path, hash_cache: Optional[HashCache] = None,
+                             stats: Optional[DuplicateStats] = None,
+                             hash_workers: int = DEFAULT_HASH_WORKERS,
+                             max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+                             cancel_event: Optional[threading.Event] = None,
+                             algorithm: str = DEFAULT_ALGORITHM,
+                             backend: str = DEFAULT_BACKEND,
+                             progress: Optional[ProgressTracker] = None) -> Generator[str, None, None]:
+    """
+    Escanea recursivamente busacndo duplicados exactos (mismo contenido, SHA-256 por defecto).
     Mueve los duplicados a una carpeta _DUPLICADOS en la raíz.
+    Detección en tres etapas: tamaño -> huella parcial -> SHA-256 completo.
+    Si se pasa `hash_cache`, los hashes se reutilizan entre ejecuciones y al final
+    se eliminan del índice las entradas de archivos que ya no existen.
+    Si se pasa `stats`, se rellena con los bytes leídos por cada etapa.
+    El hashing se reparte en `hash_workers` hilos con un tope de `max_inflight_bytes`;
+    activar `cancel_event` detiene la búsqueda antes de mover nada más.
+    `algorithm` y `backend` seleccionan el hash y el método de lectura (ver integrity).
+    Con `progress` se publica el avance de las etapas STAGE_SCAN, STAGE_HASH y STAGE_COPY.
     Yields status messages.
     """
+    if stats is None:
+        stats = DuplicateStats()
+
     root = Path(root_path)
     dup_dest_dir = root / "_DUPLICADOS"
     
@@ -22,6 +110,9 @@ def scan_and_move_duplicates(root_path: Path) -> Generator[str, None, None]:
     
     # 1. Agrupar por tamaño (Optimización inicial)
     size_map: Dict[int, List[Path]] = {}
+    file_sizes: Dict[Path, int] = {}
+    # (dispositivo, inodo) -> ruta: el índice reconoce archivos renombrados desde que se hashearon
+    seen: Dict[Tuple[int, int], Path] = {}
     total_files = 0
     
     for dirpath, _, filenames in os.walk(root):
@@ -30,6 +121,10 @@ def scan_and_move_duplicates(root_path: Path) -> Generator[str, None, None]:
             continue
             
         for f in filenames:
+            # El índice de hashes vive en la propia biblioteca: no es contenido del usuario
+            if is_cache_file(f):
+                continue
+
             file_path = Path(dirpath) / f
             # Opcional: Filtrar solo multimedia? 
             # El usuario dijo "busca duplicados", idealmente de todo, pero para seguridad
@@ -39,86 +134,157 @@ def scan_and_move_duplicates(root_path: Path) -> Generator[str, None, None]:
             # Mejor general, pero ignorando archivos de sistema/ocultos si los hubiera.
             
             try:
-                size = file_path.stat().st_size
+                st = file_path.stat()
+                size = st.st_size
+                if hash_cache is not None:
+                    seen[(st.st_dev, st.st_ino)] = file_path
                 if size > 0: # Ignorar archivos vacíos
                     if size not in size_map:
                         size_map[size] = []
                     size_map[size].append(file_path)
+                    file_sizes[file_path] = size
                     total_files += 1
+                    if progress is not None:
+                        progress.advance(STAGE_SCAN, 1, size)
             except OSError:
                 pass
 
+    if progress is not None:
+        progress.finish(STAGE_SCAN)
     yield f"Total archivos encontrados: {total_files}. Analizando candidatos..."
 
-    # 2. Calcular Hash solo para colisiones de tamaño
+    # 2. Huella parcial y hash completo solo para colisiones de tamaño
     duplicates_found = 0
     moved_count = 0
-    
+
+    # 2.1 Etapa intermedia: huella parcial (cabecera + cola + muestras)
+    # Archivos grandes del mismo tamaño suelen diferir en los primeros KB.
+    # Todas las colisiones de la etapa se envían juntas al pool para aprovechar el paralelismo.
+    full_candidates: List[Path] = []
+    partial_candidates: List[Path] = []
     for size, files in size_map.items():
         if len(files) < 2:
             continue
-            
-        # Agrupar por Hash
-        hash_map: Dict[str, List[Path]] = {}
+        if size > PARTIAL_MIN_SIZE:
+            partial_candidates.extend(files)
+        else:
+            full_candidates.extend(files)
+
+    # El trabajo de hash se mide en bytes a leer (aunque el índice ahorre la lectura)
+    if progress is not None:
+        progress.add_total(STAGE_HASH, len(partial_candidates) + len(full_candidates),
+                           sum(partial_read_size(file_sizes[p]) for p in partial_candidates)
+                           + sum(file_sizes[p] for p in full_candidates))
+
+    partial_map: Dict[Tuple[int, str], List[Path]] = {}
+    partial_hasher = functools.partial(calculate_partial_hash, algorithm=algorithm)
+    for file_path, digest, bytes_read in _hash_stage(partial_candidates, partial_tag(algorithm), partial_hasher, True,
+                                                     hash_cache, hash_workers, max_inflight_bytes, cancel_event):
+        stats.partial_files += 1
+        stats.partial_bytes += bytes_read
+        if progress is not None:
+            progress.advance(STAGE_HASH, 1, partial_read_size(file_sizes[file_path]))
+        partial_map.setdefault((file_sizes[file_path], digest), []).append(file_path)
+
+    if _is_cancelled(cancel_event):
+        yield CANCELLED_MESSAGE
+        return
+
+    for group in partial_map.values():
+        if len(group) > 1:
+            full_candidates.extend(group)
+            if progress is not None:
+                progress.add_total(STAGE_HASH, len(group), sum(file_sizes[p] for p in group))
+    if progress is not None:
+        progress.finish_total(STAGE_HASH)
+
+    # 2.2 Agrupar por Hash completo
+    hash_map: Dict[Tuple[int, str], List[Path]] = {}
+    full_hasher = functools.partial(calculate_hash, algorithm=algorithm, backend=backend)
+    for file_path, file_hash, bytes_read in _hash_stage(full_candidates, algorithm, full_hasher, False,
+                                                        hash_cache, hash_workers, max_inflight_bytes, cancel_event):
+        # Yield para UI responsiveness en archivos grandes
+        if file_sizes[file_path] > 10 * 1024 * 1024:
+            yield f"Hash calculado: {file_path.name}"
+        stats.full_files += 1
+        stats.full_bytes += bytes_read
+        if progress is not None:
+            progress.advance(STAGE_HASH, 1, file_sizes[file_path])
+        hash_map.setdefault((file_sizes[file_path], file_hash), []).append(file_path)
+
+    if _is_cancelled(cancel_event):
+        yield CANCELLED_MESSAGE
+        return
+
+    if progress is not None:
+        progress.finish(STAGE_HASH)
+        for same_content_files in hash_map.values():
+            for dup in same_content_files[1:]:
+                progress.add_total(STAGE_COPY, 1, file_sizes[dup])
+        progress.finish_total(STAGE_COPY)
+
+    # 3. Procesar Duplicados
+    for same_content_files in hash_map.values():
+        if len(same_content_files) > 1:
+            # Tenemos duplicados
+            duplicates_found += len(same_content_files) - 1
         
-        for file_path in files:
-            try:
-                # Yield para UI responsiveness en archivos grandes
-                if size > 10 * 1024 * 1024: 
-                    yield f"Hash calculando: {file_path.name}..."
-                
-                file_hash = calculate_hash(file_path)
-                if file_hash not in hash_map:
-                    hash_map[file_hash] = []
-                hash_map[file_hash].append(file_path)
-            except OSError:
-                continue
+            # Criterio Original: Ruta más corta (menor profundidad)
+            # Si empate, ordenar alfabéticamente
+            same_content_files.sort(key=lambda p: (len(p.parts), p.name))
+        
+            original = same_content_files[0]
+            dupes = same_content_files[1:]
+        
+            # Mover duplicados
+            if not dup_dest_dir.exists():
+                dup_dest_dir.mkdir()
+            
+            for dup in dupes:
+                if _is_cancelled(cancel_event):
+                    yield CANCELLED_MESSAGE
+                    return
 
-        # 3. Procesar Duplicados
-        for file_hash, same_content_files in hash_map.items():
-            if len(same_content_files) > 1:
-                # Tenemos duplicados
-                duplicates_found += len(same_content_files) - 1
+                yield f"Duplicado detectado: {dup.name} (Original: {original.name})"
+            
+                try:
+                    # Calcular destino
+                    dest_path = dup_dest_dir / dup.name
                 
-                # Criterio Original: Ruta más corta (menor profundidad)
-                # Si empate, ordenar alfabéticamente
-                same_content_files.sort(key=lambda p: (len(p.parts), p.name))
+                    # Manejar colisión de nombre en carpeta _DUPLICADOS
+                    if dest_path.exists():
+                        stem = dest_path.stem
+                        suffix = dest_path.suffix
+                        counter = 1
+                        while dest_path.exists():
+                            dest_path = dup_dest_dir / f"{stem}_dup_{counter}{suffix}"
+                            counter += 1
                 
-                original = same_content_files[0]
-                dupes = same_content_files[1:]
+                    # Mover con shutil.move
+                    shutil.move(str(dup), str(dest_path))
+                    moved_count += 1
+                    if progress is not None:
+                        progress.advance(STAGE_COPY, 1, file_sizes[dup])
                 
-                # Mover duplicados
-                if not dup_dest_dir.exists():
-                    dup_dest_dir.mkdir()
-                    
-                for dup in dupes:
-                    yield f"Duplicado detectado: {dup.name} (Original: {original.name})"
-                    
+                    # Intentar limpiar carpeta vacía
                     try:
-                        # Calcular destino
-                        dest_path = dup_dest_dir / dup.name
-                        
-                        # Manejar colisión de nombre en carpeta _DUPLICADOS
-                        if dest_path.exists():
-                            stem = dest_path.stem
-                            suffix = dest_path.suffix
-                            counter = 1
-                            while dest_path.exists():
-                                dest_path = dup_dest_dir / f"{stem}_dup_{counter}{suffix}"
-                                counter += 1
-                        
-                        # Mover con shutil.move
-                        shutil.move(str(dup), str(dest_path))
-                        moved_count += 1
-                        
-                        # Intentar limpiar carpeta vacía
-                        try:
-                            if not any(dup.parent.iterdir()):
-                                dup.parent.rmdir()
-                        except:
-                            pass
-                            
-                    except Exception as e:
-                        yield f"ERROR moviendo {dup.name}: {e}"
+                        if not any(dup.parent.iterdir()):
+                            dup.parent.rmdir()
+                    except:
+                        pass
+                    
+                except Exception as e:
+                    stats.errors += 1
+                    yield f"ERROR moviendo {dup.name}: {e}"
+
+    if progress is not None:
+        progress.finish(STAGE_COPY)
+
+    if hash_cache is not None:
+        evicted = hash_cache.prune(seen)
+        yield f"Caché de hashes: {hash_cache.hits} aciertos, {hash_cache.misses} calculados, {evicted} entradas obsoletas eliminadas."
+
+    yield (f"Lectura por etapa: huella parcial {stats.partial_files} archivos ({_format_bytes(stats.partial_bytes)}), "
+           f"hash completo {stats.full_files} archivos ({_format_bytes(stats.full_bytes)}).")
 
     yield f"Finalizado. {duplicates_found} duplicados detectados. {moved_count} movidos a '_DUPLICADOS'."
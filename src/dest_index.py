@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import HashCache, is_cache_file
+from .integrity import calculate_hash
+
+# Nombres renombrados por colisión: <stem>_dup_<N><sufijo>
+_DUP_PATTERN = re.compile(r"^(.*)_dup_(\d+)$", re.IGNORECASE)
+
+
+def _key(name: str) -> str:
+    """
+    Clave de nombre para las colisiones. Se ignoran mayúsculas: en NTFS/exFAT/APFS 'IMG_1.JPG'
+    e 'img_1.jpg' son el mismo archivo, y tratarlos como colisión en ext4 solo añade un _dup_N.
+    """
+    return name.casefold()
+
+
+class _Folder:
+    """Contenido conocido de una carpeta destino."""
+
+    def __init__(self):
+        # clave -> [nombre real, tamaño, digest o None]
+        self.entries: Dict[str, list] = {}
+        # (stem, sufijo) -> nombres "<stem>_dup_N<sufijo>" presentes
+        self.dup_names: Dict[Tuple[str, str], List[str]] = {}
+        # (stem, sufijo) -> siguiente N a probar
+        self.next_dup: Dict[Tuple[str, str], int] = {}
+
+    def add(self, name: str, size: int, digest: Optional[str] = None):
+        key = _key(name)
+        if key in self.entries:
+            self.entries[key][1:] = [size, digest]
+            return
+        self.entries[key] = [name, size, digest]
+
+        stem, suffix = os.path.splitext(name)
+        match = _DUP_PATTERN.match(stem)
+        if match:
+            family = (_key(match.group(1)), _key(suffix))
+            self.dup_names.setdefault(family, []).append(name)
+            n = int(match.group(2))
+            if n >= self.next_dup.get(family, 1):
+                self.next_dup[family] = n + 1
+
+
+class DestinationIndex:
+    """
+    Índice en memoria de las carpetas destino (nombre, tamaño y hash conocido de cada archivo).
+    Cada carpeta se lista una sola vez, la primera vez que se consulta, y se actualiza a medida que
+    llegan archivos; así las colisiones y el siguiente `_dup_N` libre se resuelven sin stats.
+
+    Supone que nadie más escribe en las carpetas destino mientras dura la ejecución; si un nombre
+    elegido resulta ocupado, `refresh` vuelve a listar la carpeta (los movimientos nunca pisan).
+    Seguro entre hilos: los movers comparten la carpeta de duplicados.
+    """
+
+    def __init__(self, hash_cache: Optional[HashCache] = None):
+        self.hash_cache = hash_cache
+        self._folders: Dict[Path, _Folder] = {}
+        self._lock = threading.Lock()
+
+    def _folder(self, folder: Path) -> _Folder:
+        """Retorna el índice de `folder`, listándola si es la primera consulta. Llamar con el lock tomado."""
+        index = self._folders.get(folder)
+        if index is None:
+            index = _Folder()
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_file(follow_symlinks=False) and not is_cache_file(entry.name):
+                            index.add(entry.name, entry.stat(follow_symlinks=False).st_size)
+            except FileNotFoundError:
+                pass
+            self._folders[folder] = index
+        return index
+
+    def lookup(self, path: Path) -> Optional[Tuple[Path, int]]:
+        """Si el nombre ya está ocupado retorna (ruta real, tamaño); si está libre, None."""
+        with self._lock:
+            entry = self._folder(path.parent).entries.get(_key(path.name))
+        if entry is None:
+            return None
+        return path.parent / entry[0], entry[1]
+
+    def next_free(self, folder: Path, stem: str, suffix: str) -> Path:
+        """Primer nombre libre: `stem+suffix` o, si está ocupado, el siguiente `stem_dup_N+suffix`."""
+        with self._lock:
+            index = self._folder(folder)
+            if _key(stem + suffix) not in index.entries:
+                return folder / f"{stem}{suffix}"
+            family = (_key(stem), _key(suffix))
+            n = index.next_dup.get(family, 1)
+            while _key(f"{stem}_dup_{n}{suffix}") in index.entries:
+                n += 1
+            index.next_dup[family] = n
+            return folder / f"{stem}_dup_{n}{suffix}"
+
+    def renamed_copies(self, folder: Path, stem: str, suffix: str, size: int) -> List[Path]:
+        """Copias renombradas (`stem_dup_N+suffix`) del mismo tamaño: las únicas que pueden ser idénticas."""
+        with self._lock:
+            index = self._folder(folder)
+            names = index.dup_names.get((_key(stem), _key(suffix)), [])
+            entries = [index.entries.get(_key(name)) for name in names]
+            return [folder / entry[0] for entry in entries if entry is not None and entry[1] == size]
+
+    def digest(self, path: Path) -> str:
+        """Hash de un archivo del destino; se calcula (o se lee del índice persistente) una sola vez."""
+        with self._lock:
+            entry = self._folder(path.parent).entries.get(_key(path.name))
+            if entry is not None and entry[2] is not None:
+                return entry[2]
+        # Hashear fuera del lock: los demás movers siguen trabajando
+        digest = calculate_hash(path, cache=self.hash_cache)
+        with self._lock:
+            entry = self._folder(path.parent).entries.get(_key(path.name))
+            if entry is not None:
+                entry[2] = digest
+        return digest
+
+    def add(self, path: Path, size: int, digest: Optional[str] = None):
+        """Registra un archivo que acaba de llegar al destino."""
+        with self._lock:
+            self._folder(path.parent).add(path.name, size, digest)
+
+    def discard(self, path: Path):
+        """Olvida un archivo que ya no está en el destino."""
+        with self._lock:
+            index = self._folders.get(path.parent)
+            if index is not None:
+                index.entries.pop(_key(path.name), None)
+
+    def refresh(self, folder: Path):
+        """Descarta lo conocido de `folder`: la próxima consulta la vuelve a listar."""
+        with self._lock:
+            self._folders.pop(folder, None)
+
+
+class DirectIndex:
+    """
+    Misma interfaz que DestinationIndex pero sin memoria: cada consulta va al disco (un stat por
+    nombre candidato). Para llamadas sueltas a move_media_safe, donde listar la carpeta entera
+    por cada archivo costaría más que las comprobaciones directas.
+    """
+
+    def __init__(self, hash_cache: Optional[HashCache] = None):
+        self.hash_cache = hash_cache
+
+    def lookup(self, path: Path) -> Optional[Tuple[Path, int]]:
+        try:
+            return path, os.stat(path).st_size
+        except FileNotFoundError:
+            return None
+
+    def next_free(self, folder: Path, stem: str, suffix: str) -> Path:
+        candidate = folder / f"{stem}{suffix}"
+        n = 1
+        while os.path.lexists(candidate):
+            candidate = folder / f"{stem}_dup_{n}{suffix}"
+            n += 1
+        return candidate
+
+    def renamed_copies(self, folder: Path, stem: str, suffix: str, size: int) -> List[Path]:
+        copies = []
+        n = 1
+        while True:
+            candidate = folder / f"{stem}_dup_{n}{suffix}"
+            try:
+                if os.stat(candidate).st_size == size:
+                    copies.append(candidate)
+            except FileNotFoundError:
+                return copies
+            n += 1
+
+    def digest(self, path: Path) -> str:
+        return calculate_hash(path, cache=self.hash_cache)
+
+    def add(self, path: Path, size: int, digest: Optional[str] = None):
+        pass
+
+    def discard(self, path: Path):
+        pass
+
+    def refresh(self, folder: Path):
+        pass
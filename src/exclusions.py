@@ -0,0 +1,172 @@
+import fnmatch
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# Caracteres que convierten una regla en patrón glob
+_GLOB_CHARS = set("*?[")
+_ANY_DEPTH = "**"
+
+
+class _Node:
+    """Nodo del trie de rutas absolutas: un hijo por componente."""
+    __slots__ = ("children", "terminal")
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+
+
+# Estado de un directorio ya aceptado: (nodo del trie o None, posiciones activas de los globs).
+# _BELOW_EXCLUDED marca que un ancestro de la raíz de escaneo está excluido.
+_BELOW_EXCLUDED = object()
+State = Tuple[object, Tuple[Tuple[int, int], ...]]
+
+
+class ExclusionMatcher:
+    """
+    Reglas de exclusión compiladas una sola vez.
+
+    - Rutas absolutas ("/fotos/privado", "C:\\\\Backup") -> trie de componentes.
+    - Patrones glob ("**/@eaDir", "*/.thumbnails", "Fotos/20*/tmp") y rutas relativas sin
+      comodines ("@eaDir", "Fotos/tmp") -> listas de componentes precompiladas; `**` equivale a
+      cualquier número de carpetas. Lo relativo se ancla en la raíz del escaneo (nunca en el
+      directorio de trabajo); los patrones absolutos, en la raíz del sistema de archivos.
+
+    El recorrido avanza un componente cada vez (`descend`), así que comprobar un directorio
+    cuesta lo mismo sea cual sea el número de reglas absolutas, y `is_excluded` es proporcional
+    a la profundidad de la ruta.
+    """
+
+    def __init__(self, rules: Iterable[str] = (), case_insensitive: Optional[bool] = None):
+        if case_insensitive is None:
+            # Igual que las rutas del sistema: en Windows no se distinguen mayúsculas
+            case_insensitive = os.name == 'nt'
+        self.case_insensitive = case_insensitive
+        self._trie = _Node()
+        self._relative: List[list] = []
+        self._absolute: List[list] = []
+        self._patterns: List[list] = []
+        self.rules: List[str] = []
+
+        for rule in rules:
+            self.add(rule)
+
+    def _key(self, name: str) -> str:
+        return name.casefold() if self.case_insensitive else name
+
+    def add(self, rule: str):
+        """Añade una regla (ruta de carpeta o patrón glob)."""
+        rule = str(rule).strip()
+        if not rule:
+            return
+        self.rules.append(rule)
+
+        is_absolute = Path(rule).is_absolute()
+        if not is_absolute:
+            # Relativa (con o sin comodines): se ancla en la raíz del escaneo
+            parts = [p for p in re.split(r"[\\/]+", rule) if p and p != "."]
+            if parts:
+                self._relative.append(self._compile_parts(parts))
+                self._patterns = self._absolute + self._relative
+            return
+        if any(c in _GLOB_CHARS for c in rule):
+            # Patrón absoluto: el primer componente es la raíz (o la unidad) y se compara tal cual
+            anchor, *parts = Path(rule).parts
+            self._absolute.append([self._key(anchor)] + self._compile_parts(parts))
+            self._patterns = self._absolute + self._relative
+            return
+
+        node = self._trie
+        for part in Path(rule).resolve().parts:
+            node = node.children.setdefault(self._key(part), _Node())
+        node.terminal = True
+
+    def _compile_parts(self, parts: List[str]) -> list:
+        flags = re.IGNORECASE if self.case_insensitive else 0
+        return [_ANY_DEPTH if part == _ANY_DEPTH else re.compile(fnmatch.translate(part), flags) for part in parts]
+
+    # --- Recorrido incremental -----------------------------------------------------------
+
+    def start(self, root: Path) -> Optional[State]:
+        """
+        Estado para la raíz del escaneo (ya resuelta). None si la propia raíz está excluida.
+        Si lo está un ancestro, la raíz se escanea pero ninguna subcarpeta.
+        """
+        node = self._trie
+        abs_positions = self._closure(((i, 0) for i in range(len(self._absolute))), self._absolute)
+        parts = Path(root).parts
+        for depth, part in enumerate(parts):
+            node = node.children.get(self._key(part)) if node is not None else None
+            abs_positions, matched = self._advance(abs_positions, self._absolute, part, depth == 0)
+            if (node is not None and node.terminal) or matched:
+                if depth == len(parts) - 1:
+                    return None
+                return _BELOW_EXCLUDED, ()
+
+        rel_positions = self._closure(((i, 0) for i in range(len(self._relative))), self._relative)
+        # Las posiciones absolutas y relativas se guardan juntas: las relativas con índice desplazado
+        offset = len(self._absolute)
+        return node, abs_positions + tuple((offset + g, p) for g, p in rel_positions)
+
+    def descend(self, state: State, name: str) -> Optional[State]:
+        """Estado de la subcarpeta `name`, o None si está excluida."""
+        node, positions = state
+        if node is _BELOW_EXCLUDED:
+            return None
+        if node is not None:
+            node = node.children.get(self._key(name))
+            if node is not None and node.terminal:
+                return None
+        if positions:
+            positions, matched = self._advance(positions, self._patterns, name, False)
+            if matched:
+                return None
+        return node, positions
+
+    def is_excluded(self, path: Path, root: Path) -> bool:
+        """True si `path` (dentro de `root`) queda excluida. Coste proporcional a la profundidad."""
+        state = self.start(root)
+        if state is None:
+            return True
+        for part in Path(path).relative_to(root).parts:
+            state = self.descend(state, part)
+            if state is None:
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    # --- Autómata de los globs ------------------------------------------------------------
+
+    @staticmethod
+    def _closure(positions, patterns) -> Tuple[Tuple[int, int], ...]:
+        """Añade las posiciones alcanzables saltando `**` (que también puede no consumir nada)."""
+        result = []
+        for g, p in positions:
+            result.append((g, p))
+            while p < len(patterns[g]) and patterns[g][p] is _ANY_DEPTH:
+                p += 1
+                result.append((g, p))
+        return tuple(dict.fromkeys(result))
+
+    def _advance(self, positions, patterns, name: str, is_anchor: bool):
+        """Consume un componente. Retorna (nuevas posiciones, algún patrón completo)."""
+        following = []
+        for g, p in positions:
+            pattern = patterns[g]
+            if p >= len(pattern):
+                continue
+            component = pattern[p]
+            if component is _ANY_DEPTH:
+                following.append((g, p))
+            elif is_anchor and isinstance(component, str):
+                if component == self._key(name):
+                    following.append((g, p + 1))
+            elif not isinstance(component, str) and component.match(name):
+                following.append((g, p + 1))
+        following = self._closure(following, patterns)
+        matched = any(p == len(patterns[g]) for g, p in following)
+        return following, matched
@@ -0,0 +1,357 @@
+import os
+import struct
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Optional, Set, Tuple
+
+# Lector EXIF nativo y acotado: localiza el bloque EXIF (TIFF) dentro del contenedor,
+# recorre IFD0 -> Exif IFD hasta DateTimeOriginal y se detiene. Nunca decodifica
+# la imagen ni parsea maker notes; lee unos pocos KB por archivo.
+
+# Extensiones cuyo contenedor sabe recorrer este módulo
+NATIVE_EXIF_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+# RAW basados en TIFF (IFD0 -> Exif IFD) y RAF (TIFF dentro del JPEG embebido)
+RAW_EXIF_EXTENSIONS = {'.dng', '.cr2', '.nef', '.arw', '.orf', '.pef', '.raf'}
+
+# Tags TIFF/EXIF relevantes
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TAG_SUBSEC_TIME = 0x9290
+TAG_SUBSEC_TIME_ORIGINAL = 0x9291
+TAG_SUBSEC_TIME_DIGITIZED = 0x9292
+
+# Cada fecha con su etiqueta de fracciones de segundo
+_DATE_TAGS = ((TAG_DATETIME_ORIGINAL, TAG_SUBSEC_TIME_ORIGINAL), (TAG_DATETIME_DIGITIZED, TAG_SUBSEC_TIME_DIGITIZED),
+              (TAG_DATETIME, TAG_SUBSEC_TIME))
+_EXIF_IFD_TAGS = {TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED, TAG_SUBSEC_TIME_ORIGINAL, TAG_SUBSEC_TIME_DIGITIZED,
+                  TAG_SUBSEC_TIME}
+
+# Límites de seguridad frente a archivos corruptos
+_MAX_IFD_ENTRIES = 1024
+_MAX_EXIF_CHUNK = 1024 * 1024
+
+# Primera lectura de un RAW: cabecera, IFD0 y casi siempre el Exif IFD (los datos del sensor van detrás)
+_RAW_HEAD = 16 * 1024
+# RAF: cabecera de Fujifilm con la posición y el tamaño del JPEG embebido en el byte 84
+_RAF_MAGIC = b'FUJIFILMCCD-RAW'
+_RAF_JPEG_POINTER = 84
+_HAS_PREAD = hasattr(os, 'pread')
+
+_TIFF_TYPE_ASCII = 2
+_TIFF_TYPE_LONG = 4
+_TIFF_TYPE_IFD = 13
+
+
+class ExifFormatError(ValueError):
+    """El contenedor o la estructura TIFF no se pudieron interpretar."""
+
+
+def read_exif_date(file_path: Path) -> Optional[datetime]:
+    """
+    Lee la fecha de captura EXIF de un JPEG, PNG o WebP con una sola apertura.
+    Prioridad: DateTimeOriginal, DateTimeDigitized, DateTime (igual que con Pillow).
+
+    Retorna None si el archivo es válido pero no tiene fecha EXIF.
+    Lanza ExifFormatError si el formato no es reconocido o está dañado,
+    para que el llamador pueda recurrir a un lector más tolerante.
+    """
+    with open(file_path, 'rb') as f:
+        return read_exif_date_from_file(f)
+
+
+def read_exif_date_from_file(f: BinaryIO) -> Optional[datetime]:
+    """Igual que `read_exif_date` pero sobre un archivo binario ya abierto (posición 0)."""
+    head = f.read(12)
+    if head[:2] == b'\xff\xd8':
+        location = _find_jpeg_exif(f)
+    elif head[:8] == b'\x89PNG\r\n\x1a\n':
+        f.seek(8)
+        location = _find_png_exif(f)
+    elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        location = _find_webp_exif(f)
+    else:
+        raise ExifFormatError("Contenedor no soportado")
+
+    if location is None:
+        return None
+    if isinstance(location, bytes):
+        # Perfil EXIF embebido como texto (ya decodificado en memoria)
+        return parse_tiff_date(lambda offset, size: location[offset:offset + size])
+
+    start, length = location
+    f.seek(start)
+    if f.read(6) == b'Exif\x00\x00':
+        start, length = start + 6, length - 6
+    return parse_tiff_date(bounded_reader(f, start, length))
+
+
+def bounded_reader(f: BinaryIO, start: int, length: int) -> Callable[[int, int], bytes]:
+    """
+    Crea un `read_at(offset, size)` sobre un bloque [start, start + length) del archivo.
+    Solo se leen los bytes pedidos (entradas de IFD y cadenas de fecha), nunca el bloque entero.
+    """
+    def read_at(offset: int, size: int) -> bytes:
+        if offset < 0 or offset >= length:
+            return b''
+        f.seek(start + offset)
+        return f.read(min(size, length - offset))
+    return read_at
+
+
+def parse_exif_datetime(value: str) -> Optional[datetime]:
+    """
+    Convierte 'YYYY:MM:DD HH:MM:SS' (con posibles nulos/espacios) a datetime.
+    Se parsea por posiciones: strptime es varias veces más lento y domina el coste por archivo.
+    """
+    value = value.strip('\x00 ')
+    if len(value) != 19 or value[4] != ':' or value[7] != ':' or value[13] != ':' or value[16] != ':':
+        return None
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+        return None
+
+
+def parse_tiff_date(read_at: Callable[[int, int], bytes], flat: bool = False) -> Optional[datetime]:
+    """
+    Recorre una estructura TIFF buscando la fecha de captura.
+    `read_at(offset, size)` devuelve bytes relativos al inicio de la cabecera TIFF,
+    lo que permite usarlo tanto sobre un buffer en memoria como sobre lecturas puntuales del archivo.
+    Con `flat`, las etiquetas del Exif IFD están directamente en el IFD0 (CMT2 de los CR3).
+    """
+    header = read_at(0, 8)
+    if len(header) < 8:
+        raise ExifFormatError("Cabecera TIFF truncada")
+    if header[:2] == b'II':
+        endian = '<'
+    elif header[:2] == b'MM':
+        endian = '>'
+    else:
+        raise ExifFormatError("Orden de bytes TIFF desconocido")
+
+    ifd0_offset = struct.unpack(endian + 'I', header[4:8])[0]
+    if flat:
+        ifd0 = _read_ifd(read_at, endian, ifd0_offset, _EXIF_IFD_TAGS)
+    else:
+        ifd0 = _read_ifd(read_at, endian, ifd0_offset, {TAG_DATETIME, TAG_EXIF_IFD})
+
+    exif_ifd = ifd0 if flat else {}
+    if isinstance(ifd0.get(TAG_EXIF_IFD), int):
+        exif_ifd = _read_ifd(read_at, endian, ifd0[TAG_EXIF_IFD], _EXIF_IFD_TAGS)
+
+    for date_tag, subsec_tag in _DATE_TAGS:
+        value = (ifd0 if date_tag == TAG_DATETIME else exif_ifd).get(date_tag)
+        if isinstance(value, str):
+            date = parse_exif_datetime(value)
+            if date:
+                return _with_subsec(date, exif_ifd.get(subsec_tag))
+    return None
+
+
+def _with_subsec(date: datetime, subsec) -> datetime:
+    """Aplica SubSecTime* ('45' = 0,45 s). Valores vacíos o no numéricos se ignoran."""
+    if not isinstance(subsec, str):
+        return date
+    digits = subsec.strip('\x00 ')
+    if not digits.isdigit():
+        return date
+    return date.replace(microsecond=int(digits[:6].ljust(6, '0')))
+
+
+def read_raw_exif_date(file_path: Path) -> Optional[datetime]:
+    """
+    Fecha de captura de un RAW basado en TIFF (CR2, NEF, ARW, DNG, ORF, PEF) o de un RAF.
+    Sigue solo IFD0 -> Exif IFD (nunca las maker notes) con lecturas posicionales (pread):
+    normalmente una de 16 KB; dos en los RAF. El tamaño del archivo no influye.
+
+    Lanza ExifFormatError si la estructura no se reconoce (el llamador puede probar otro lector).
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        head = _pread(f, min(_RAW_HEAD, size), 0)
+        if head.startswith(_RAF_MAGIC):
+            return _raf_exif_date(f, head, size)
+        return parse_tiff_date(_pread_reader(f, 0, size, head))
+
+
+def _raf_exif_date(f, head: bytes, size: int) -> Optional[datetime]:
+    """RAF: el EXIF está en el APP1 del JPEG de vista previa, cuya posición da la cabecera."""
+    if len(head) < _RAF_JPEG_POINTER + 8:
+        raise ExifFormatError("Cabecera RAF truncada")
+    jpeg_offset, jpeg_length = struct.unpack('>II', head[_RAF_JPEG_POINTER:_RAF_JPEG_POINTER + 8])
+    if jpeg_offset + jpeg_length > size:
+        raise ExifFormatError("JPEG embebido fuera del archivo")
+    jpeg = _pread(f, min(_RAW_HEAD, jpeg_length), jpeg_offset)
+    start, length = _find_jpeg_exif_in_buffer(jpeg)
+    # El bloque TIFF empieza tras "Exif\0\0"; lo ya leído se reutiliza
+    return parse_tiff_date(_pread_reader(f, jpeg_offset + start + 6, length - 6, jpeg[start + 6:]))
+
+
+def _find_jpeg_exif_in_buffer(data: bytes) -> Tuple[int, int]:
+    """Como `_find_jpeg_exif` pero sobre el principio del JPEG ya leído. Retorna (offset, longitud) del APP1."""
+    if data[:2] != b'\xff\xd8':
+        raise ExifFormatError("JPEG embebido inválido")
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise ExifFormatError("Marcador JPEG inválido")
+        code = data[position + 1]
+        if code in (0xD9, 0xDA):
+            break
+        length = struct.unpack_from('>H', data, position + 2)[0]
+        if code == 0xE1 and data[position + 4:position + 10] == b'Exif\x00\x00':
+            return position + 4, length - 2
+        position += 2 + length
+    raise ExifFormatError("APP1 Exif no encontrado en el JPEG embebido")
+
+
+def _pread(f, size: int, offset: int) -> bytes:
+    """Lectura posicional: sin seek en sistemas con pread (Windows no lo tiene)."""
+    if _HAS_PREAD:
+        return os.pread(f.fileno(), size, offset)
+    f.seek(offset)
+    return f.read(size)
+
+
+def _pread_reader(f, start: int, length: int, head: bytes = b'') -> Callable[[int, int], bytes]:
+    """`read_at` sobre [start, start + length): sirve desde `head` (ya leído) y el resto con pread."""
+    def read_at(offset: int, size: int) -> bytes:
+        if offset < 0 or offset >= length:
+            return b''
+        size = min(size, length - offset)
+        if offset + size <= len(head):
+            return head[offset:offset + size]
+        return _pread(f, size, start + offset)
+    return read_at
+
+
+def _read_ifd(read_at: Callable[[int, int], bytes], endian: str, offset: int, wanted: Set[int]) -> Dict[int, object]:
+    """Lee de un IFD solo los tags pedidos (ASCII como str, LONG/IFD como int)."""
+    raw_count = read_at(offset, 2)
+    if len(raw_count) < 2:
+        raise ExifFormatError("IFD fuera de rango")
+    count = struct.unpack(endian + 'H', raw_count)[0]
+    if count > _MAX_IFD_ENTRIES:
+        raise ExifFormatError("IFD con demasiadas entradas")
+
+    entries = read_at(offset + 2, count * 12)
+    values: Dict[int, object] = {}
+    for i in range(len(entries) // 12):
+        tag, tag_type, value_count = struct.unpack(endian + 'HHI', entries[i * 12:i * 12 + 8])
+        if tag not in wanted:
+            continue
+        value_field = entries[i * 12 + 8:i * 12 + 12]
+
+        if tag_type == _TIFF_TYPE_ASCII:
+            if value_count <= 4:
+                data = value_field[:value_count]
+            else:
+                data = read_at(struct.unpack(endian + 'I', value_field)[0], min(value_count, 64))
+            values[tag] = data.decode('ascii', errors='replace')
+        elif tag_type in (_TIFF_TYPE_LONG, _TIFF_TYPE_IFD):
+            values[tag] = struct.unpack(endian + 'I', value_field)[0]
+
+        if len(values) == len(wanted):
+            break
+    return values
+
+
+def _find_jpeg_exif(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    Recorre los segmentos JPEG hasta el APP1 'Exif' (o hasta el inicio de la imagen).
+    Retorna (offset, longitud) del contenido del segmento.
+    """
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ExifFormatError("Marcador JPEG inválido")
+        code = marker[1]
+        if code == 0xFF:
+            # Relleno entre marcadores
+            f.seek(-1, 1)
+            continue
+        if code in (0xD9, 0xDA):
+            # Fin de imagen o inicio de datos comprimidos: ya no habrá EXIF
+            return None
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue
+
+        length_raw = f.read(2)
+        if len(length_raw) < 2:
+            raise ExifFormatError("Segmento JPEG truncado")
+        length = struct.unpack('>H', length_raw)[0]
+        if length < 2:
+            raise ExifFormatError("Longitud de segmento JPEG inválida")
+
+        if code == 0xE1:
+            start = f.tell()
+            if f.read(6) == b'Exif\x00\x00':
+                return start, length - 2
+            # APP1 de XMP u otro: seguir buscando
+            f.seek(start + length - 2)
+            continue
+        f.seek(length - 2, 1)
+
+
+def _find_png_exif(f: BinaryIO):
+    """
+    Busca el chunk eXIf (retorna su (offset, longitud)) o el perfil EXIF en hexadecimal
+    que escribe ImageMagick en tEXt/zTXt (retorna los bytes TIFF ya decodificados).
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type == b'IEND':
+            return None
+
+        if chunk_type == b'eXIf':
+            return f.tell(), length
+
+        if chunk_type in (b'tEXt', b'zTXt') and length <= _MAX_EXIF_CHUNK:
+            data = f.read(length)
+            f.seek(4, 1)  # CRC
+            keyword, _, text = data.partition(b'\x00')
+            if keyword.lower() in (b'raw profile type exif', b'raw profile type app1'):
+                if chunk_type == b'zTXt':
+                    text = zlib.decompress(text[1:])
+                exif = _decode_raw_profile(text)
+                if exif is not None:
+                    return exif
+            continue
+
+        # Saltar datos + CRC (IDAT incluido: seek no lee)
+        f.seek(length + 4, 1)
+
+
+def _decode_raw_profile(text: bytes) -> Optional[bytes]:
+    """Decodifica el formato 'Raw profile type exif' (nombre, longitud y volcado hexadecimal)."""
+    parts = text.split(b'\n', 3)
+    if len(parts) < 4:
+        return None
+    try:
+        data = bytes.fromhex(parts[3].decode('ascii').replace('\n', '').strip())
+    except ValueError:
+        return None
+    return data[6:] if data[:6] == b'Exif\x00\x00' else data
+
+
+def _find_webp_exif(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """Recorre los chunks RIFF de un WebP hasta el chunk EXIF y retorna su (offset, longitud)."""
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        fourcc, size = struct.unpack('<4sI', header)
+        if fourcc == b'EXIF':
+            return f.tell(), size
+        # Los chunks RIFF se alinean a tamaño par
+        f.seek(size + (size & 1), 1)
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Generator, Iterable, Optional, Tuple
+
+# hashlib libera el GIL al procesar bloques grandes, así que varios hilos
+# leen y hashean en paralelo. Más allá de ~8 lectores el disco suele saturarse.
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 2)
+
+# Tope de bytes (suma de tamaños) con trabajo en curso o encolado
+DEFAULT_MAX_INFLIGHT_BYTES = 512 * 1024 * 1024
+
+# Cada cuánto se revisa la señal de cancelación mientras se espera un resultado
+_CANCEL_POLL_SECONDS = 0.1
+
+
+def hash_files(jobs: Iterable[Tuple[Path, int]], hasher: Callable[[Path], str],
+               workers: int = DEFAULT_HASH_WORKERS,
+               max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+               cancel_event: Optional[threading.Event] = None) -> Generator[Tuple[Path, Optional[str], Optional[OSError]], None, None]:
+    """
+    Calcula hashes en un pool de hilos y devuelve los resultados en el MISMO orden
+    en que llegaron los trabajos.
+
+    Args:
+        jobs: Iterable de (ruta, peso en bytes). El peso cuenta contra `max_inflight_bytes`.
+        hasher: Función que recibe una ruta y retorna su digest.
+        workers: Número de hilos lectores.
+        max_inflight_bytes: Tope de bytes en curso; siempre se admite al menos un trabajo.
+        cancel_event: Si se activa, se dejan de encolar trabajos y el generador termina.
+
+    Yields:
+        (ruta, digest, None) o (ruta, None, error) si el archivo no se pudo leer.
+    """
+    workers = max(1, workers)
+    jobs = iter(jobs)
+    pending = deque()
+    inflight_bytes = 0
+    exhausted = False
+
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ordenafotos-hash")
+    try:
+        while True:
+            # 1. Rellenar la cola respetando el tope de bytes y de trabajos en vuelo
+            while (not exhausted and not cancelled() and len(pending) < workers * 4
+                   and (not pending or inflight_bytes < max_inflight_bytes)):
+                try:
+                    path, weight = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((path, weight, pool.submit(hasher, path)))
+                inflight_bytes += weight
+
+            if not pending or cancelled():
+                return
+
+            # 2. Esperar al trabajo más antiguo (orden estable), atentos a la cancelación
+            path, weight, future = pending[0]
+            while True:
+                try:
+                    digest = future.result(timeout=_CANCEL_POLL_SECONDS)
+                    error = None
+                    break
+                except FutureTimeoutError:
+                    if cancelled():
+                        return
+                except OSError as e:
+                    digest = None
+                    error = e
+                    break
+
+            pending.popleft()
+            inflight_bytes -= weight
+            yield path, digest, error
+    finally:
+        # Cancelación o cierre del generador: descartar lo encolado sin esperar
+        for _, _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
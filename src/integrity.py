@@ -1,30 +1,148 @@
 import hashlib
+import mmap
+import os
 from pathlib import Path
+from typing import Optional
+
+from . import metrics
+from .cache import HashCache
+
+# Algoritmos disponibles. BLAKE2b es notablemente más rápido que SHA-256 en CPUs sin SHA-NI.
+ALGORITHMS = ("sha256", "blake2b")
+DEFAULT_ALGORITHM = "sha256"
+
+# Backends de lectura:
+#   readinto    -> buffer grande reutilizable, sin crear un objeto bytes por bloque
+#   file_digest -> hashlib.file_digest (Python 3.11+), el bucle corre en C
+#   mmap        -> el archivo mapeado en memoria se pasa al hash sin copias
+BACKENDS = ("readinto", "file_digest", "mmap")
+DEFAULT_BACKEND = "readinto"
+
+# Tamaño de bloque: con 1 MiB el coste por llamada es despreciable frente al hash
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# En mmap se hashea por ventanas para que hashlib libere el GIL en tramos acotados
+_MMAP_WINDOW = 64 * 1024 * 1024
+
+# Huella parcial: cabecera, cola y varias muestras a offsets fijos
+PARTIAL_BLOCK_SIZE = 4096
+PARTIAL_SAMPLES = 4
+# Por debajo de este tamaño la huella parcial leería casi todo el archivo: se hashea completo
+PARTIAL_MIN_SIZE = 64 * 1024
+
+def new_hasher(algorithm: str = DEFAULT_ALGORITHM):
+    """Crea el objeto hash para `algorithm` (ver ALGORITHMS)."""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo de hash no soportado: {algorithm}")
+    return hashlib.new(algorithm)
+
+@metrics.timed("hash")
+def calculate_hash(file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE, cache: Optional[HashCache] = None,
+                   algorithm: str = DEFAULT_ALGORITHM, backend: str = DEFAULT_BACKEND) -> str:
+    """
+    Calcula el hash de un archivo de manera eficiente (por chunks). Por defecto SHA-256.
+    Si se pasa un `cache`, primero se consulta el índice persistente y el resultado
+    nuevo se guarda en él, de modo que un archivo sin cambios no se vuelve a leer.
+    Los digests se guardan etiquetados con `algorithm`: nunca se comparan hashes de algoritmos distintos.
+    """
+    st = None
+    if cache is not None:
+        st = os.stat(file_path)
+        cached = cache.get(file_path, st, algorithm=algorithm)
+        if cached is not None:
+            return cached
+
+    hasher = new_hasher(algorithm)
 
-def calculate_hash(file_path: Path, chunk_size: int = 8192) -> str:
-    """Calcula el hash SHA-256 de un archivo de manera eficiente (por chunks)."""
-    sha256_hash = hashlib.sha256()
-    
     with open(file_path, "rb") as f:
         # Leer el archivo por bloques para no saturar la memoria con archivos grandes (videos)
-        for byte_block in iter(lambda: f.read(chunk_size), b""):
-            sha256_hash.update(byte_block)
-            
-    return sha256_hash.hexdigest()
+        if backend == "readinto":
+            _hash_readinto(f, hasher, chunk_size)
+        elif backend == "file_digest":
+            if hasattr(hashlib, "file_digest"):
+                hasher = hashlib.file_digest(f, lambda: new_hasher(algorithm))
+            else:
+                _hash_readinto(f, hasher, chunk_size)
+        elif backend == "mmap":
+            _hash_mmap(f, hasher)
+        else:
+            raise ValueError(f"Backend de hash no soportado: {backend}")
+
+    digest = hasher.hexdigest()
+    if cache is not None:
+        cache.put(file_path, digest, st, algorithm=algorithm)
+    return digest
+
+def _hash_readinto(f, hasher, chunk_size: int):
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        n = f.readinto(buffer)
+        if not n:
+            break
+        hasher.update(view[:n])
 
-def check_duplicate(file_a: Path, file_b: Path) -> bool:
+def _hash_mmap(f, hasher):
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        # mmap no admite archivos vacíos
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, size, _MMAP_WINDOW):
+                hasher.update(view[offset:offset + _MMAP_WINDOW])
+        finally:
+            view.release()
+
+def partial_read_size(size: int, block_size: int = PARTIAL_BLOCK_SIZE, samples: int = PARTIAL_SAMPLES) -> int:
+    """Bytes que lee `calculate_partial_hash` para un archivo de `size` bytes."""
+    return min(size, block_size * (samples + 2))
+
+@metrics.timed("hash.partial")
+def calculate_partial_hash(file_path: Path, block_size: int = PARTIAL_BLOCK_SIZE, samples: int = PARTIAL_SAMPLES,
+                           algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    Calcula una huella barata (SHA-256 por defecto): primeros `block_size` bytes, últimos `block_size`
+    y `samples` bloques a offsets equiespaciados. Archivos con distinta huella parcial
+    tienen contenido distinto; si coincide, hace falta el hash completo para confirmarlo.
+    """
+    hasher = new_hasher(algorithm)
+
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # El tamaño forma parte de la huella: archivos de distinto tamaño nunca coinciden
+        hasher.update(size.to_bytes(8, "little"))
+
+        if size <= block_size * (samples + 2):
+            hasher.update(f.read())
+            return hasher.hexdigest()
+
+        offsets = [0]
+        step = size // (samples + 1)
+        offsets.extend(step * i for i in range(1, samples + 1))
+        offsets.append(size - block_size)
+
+        for offset in offsets:
+            f.seek(offset)
+            hasher.update(f.read(block_size))
+
+    return hasher.hexdigest()
+
+def check_duplicate(file_a: Path, file_b: Path, cache: Optional[HashCache] = None,
+                    algorithm: str = DEFAULT_ALGORITHM) -> bool:
     """
     Compara dos archivos calculando sus hashes.
     Retorna True si son idénticos (duplicados exactos), False si no.
     """
     if not file_a.exists() or not file_b.exists():
         raise FileNotFoundError("Uno o ambos archivos no existen.")
-    
+
     # Optimización rápida: Si los tamaños son diferentes, no son el mismo archivo.
     if file_a.stat().st_size != file_b.stat().st_size:
         return False
 
-    hash_a = calculate_hash(file_a)
-    hash_b = calculate_hash(file_b)
-    
+    hash_a = calculate_hash(file_a, cache=cache, algorithm=algorithm)
+    hash_b = calculate_hash(file_b, cache=cache, algorithm=algorithm)
+
     return hash_a == hash_b
@@ -0,0 +1,336 @@
+import os
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .exif_reader import ExifFormatError, bounded_reader, parse_tiff_date
+
+# Lector acotado de contenedores ISO-BMFF (MP4, MOV, HEIC/HEIF, CR3).
+#
+# Solo se leen cabeceras de cajas y unos pocos cuerpos pequeños (mvhd, iinf, iloc, CMTn):
+# el resto se salta con seek, esté donde esté (moov al final tras un mdat de varios GB,
+# tamaños extendidos de 64 bits, cajas de tamaño 0 que llegan hasta el final del archivo).
+
+ISOBMFF_VIDEO_EXTENSIONS = {'.mp4', '.mov'}
+ISOBMFF_IMAGE_EXTENSIONS = {'.heic', '.heif', '.cr3'}
+ISOBMFF_EXTENSIONS = ISOBMFF_VIDEO_EXTENSIONS | ISOBMFF_IMAGE_EXTENSIONS
+
+# Marcas (ftyp) de imágenes HEIF y de los RAW de Canon
+_HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1', b'avif'}
+_CR3_BRAND = b'crx '
+# Caja uuid de Canon dentro de moov que contiene las CMT1..CMT4 (TIFF con los metadatos)
+_CANON_UUID = bytes.fromhex('85c0b687820f11e08111f4ce462b6a48')
+
+# Cajas de primer nivel que puede tener un MOV antiguo sin ftyp
+_QUICKTIME_TOP = {b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot', b'junk'}
+
+_MP4_EPOCH = datetime(1904, 1, 1)
+
+# Límites de seguridad frente a archivos corruptos
+_MAX_BOXES = 4096           # Cajas por nivel
+_MAX_BODY = 64 * 1024       # Mayor cuerpo que se lee entero (iinf/iloc de HEIC con cientos de teselas)
+
+
+class IsoBmffError(ValueError):
+    """El archivo no es un contenedor ISO-BMFF válido o está dañado."""
+
+
+class Box:
+    """Cabecera de una caja: tipo, posición, tamaño total y tamaño de la cabecera."""
+
+    __slots__ = ("type", "start", "size", "header_size")
+
+    def __init__(self, box_type: bytes, start: int, size: int, header_size: int):
+        self.type = box_type
+        self.start = start
+        self.size = size
+        self.header_size = header_size
+
+    @property
+    def body_start(self) -> int:
+        return self.start + self.header_size
+
+    @property
+    def body_size(self) -> int:
+        return self.size - self.header_size
+
+    @property
+    def end(self) -> int:
+        return self.start + self.size
+
+    def __repr__(self):
+        return f"<Box {self.type!r} @{self.start} size={self.size}>"
+
+
+def iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Box]:
+    """
+    Cajas hermanas entre [start, end). Lee solo las cabeceras (8, 16 o 24 bytes con uuid);
+    el llamador decide en qué cajas entrar.
+    """
+    position = start
+    for _ in range(_MAX_BOXES):
+        if position + 8 > end:
+            return
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            # Tamaño extendido de 64 bits (mdat de más de 4 GB)
+            large = f.read(8)
+            if len(large) < 8:
+                raise IsoBmffError("Cabecera de tamaño extendido truncada")
+            size = struct.unpack('>Q', large)[0]
+            header_size = 16
+        elif size == 0:
+            # La caja llega hasta el final del contenedor
+            size = end - position
+        if box_type == b'uuid':
+            header_size += 16
+        if size < header_size or position + size > end:
+            raise IsoBmffError(f"Tamaño de caja inválido: {box_type!r}")
+        yield Box(box_type, position, size, header_size)
+        position += size
+    raise IsoBmffError("Demasiadas cajas")
+
+
+def find_box(f: BinaryIO, start: int, end: int, box_type: bytes) -> Optional[Box]:
+    for box in iter_boxes(f, start, end):
+        if box.type == box_type:
+            return box
+    return None
+
+
+def read_isobmff_date(file_path: Path) -> Optional[datetime]:
+    """
+    Fecha de captura de un MP4/MOV (moov/mvhd), HEIC/HEIF (ítem Exif) o CR3 (CMT2/CMT1, o mvhd).
+
+    Retorna None si el contenedor es válido pero no tiene fecha.
+    Lanza IsoBmffError si no es ISO-BMFF o está dañado (el llamador puede probar otro lector).
+    """
+    with open(file_path, 'rb') as f:
+        return read_isobmff_date_from_file(f, os.fstat(f.fileno()).st_size)
+
+
+def read_isobmff_date_from_file(f: BinaryIO, file_size: int) -> Optional[datetime]:
+    """Igual que `read_isobmff_date` sobre un archivo binario ya abierto de `file_size` bytes."""
+    top = _top_level(f, file_size)
+
+    brands = _brands(f, top.get(b'ftyp'))
+    if brands & _HEIF_BRANDS and b'meta' in top:
+        return _heif_exif_date(f, top[b'meta'])
+
+    moov = top.get(b'moov')
+    if moov is None:
+        return None
+    if _CR3_BRAND in brands:
+        date = _canon_cmt_date(f, moov)
+        if date is not None:
+            return date
+    return _movie_creation_time(f, moov)
+
+
+def _top_level(f: BinaryIO, file_size: int) -> Dict[bytes, Box]:
+    """Cajas de primer nivel (la primera de cada tipo). Se para al encontrar moov o meta útiles."""
+    boxes: Dict[bytes, Box] = {}
+    for index, box in enumerate(iter_boxes(f, 0, file_size)):
+        if index == 0 and box.type != b'ftyp' and box.type not in _QUICKTIME_TOP:
+            raise IsoBmffError("No es un contenedor ISO-BMFF")
+        boxes.setdefault(box.type, box)
+        if box.type == b'moov':
+            break
+    if not boxes:
+        raise IsoBmffError("Archivo vacío")
+    return boxes
+
+
+def _brands(f: BinaryIO, ftyp: Optional[Box]) -> set:
+    """Marca principal y compatibles del ftyp."""
+    if ftyp is None:
+        return set()
+    body = _read_body(f, ftyp)
+    if len(body) < 8:
+        raise IsoBmffError("ftyp truncado")
+    return {body[0:4]} | {body[i:i + 4] for i in range(8, len(body) - 3, 4)}
+
+
+def _read_body(f: BinaryIO, box: Box, limit: int = _MAX_BODY) -> bytes:
+    if box.body_size > limit:
+        raise IsoBmffError(f"Caja {box.type!r} demasiado grande")
+    f.seek(box.body_start)
+    return f.read(box.body_size)
+
+
+def _movie_creation_time(f: BinaryIO, moov: Box) -> Optional[datetime]:
+    """creation_time de moov/mvhd (segundos desde 1904, UTC). 0 significa "sin fecha"."""
+    mvhd = find_box(f, moov.body_start, moov.end, b'mvhd')
+    if mvhd is None:
+        return None
+    f.seek(mvhd.body_start)
+    data = f.read(12)
+    if len(data) < 8:
+        raise IsoBmffError("mvhd truncado")
+    if data[0] == 0:
+        seconds = struct.unpack('>I', data[4:8])[0]
+    elif data[0] == 1:
+        if len(data) < 12:
+            raise IsoBmffError("mvhd truncado")
+        seconds = struct.unpack('>Q', data[4:12])[0]
+    else:
+        return None
+    if seconds == 0:
+        return None
+    try:
+        return _MP4_EPOCH + timedelta(seconds=seconds)
+    except OverflowError:
+        return None
+
+
+def _canon_cmt_date(f: BinaryIO, moov: Box) -> Optional[datetime]:
+    """CR3: DateTimeOriginal de CMT2 (Exif IFD) o, si falta, DateTime de CMT1 (IFD0)."""
+    canon = None
+    for box in iter_boxes(f, moov.body_start, moov.end):
+        if box.type == b'uuid':
+            f.seek(box.start + box.header_size - 16)
+            if f.read(16) == _CANON_UUID:
+                canon = box
+                break
+    if canon is None:
+        return None
+
+    cmt = {box.type: box for box in iter_boxes(f, canon.body_start, canon.end) if box.type in (b'CMT1', b'CMT2')}
+    try:
+        for box_type, flat in ((b'CMT2', True), (b'CMT1', False)):
+            box = cmt.get(box_type)
+            if box is not None:
+                date = parse_tiff_date(bounded_reader(f, box.body_start, box.body_size), flat=flat)
+                if date is not None:
+                    return date
+    except ExifFormatError as e:
+        raise IsoBmffError(str(e))
+    return None
+
+
+def _heif_exif_date(f: BinaryIO, meta: Box) -> Optional[datetime]:
+    """HEIC/HEIF: busca el ítem 'Exif' en meta/iinf, su ubicación en meta/iloc y lee su TIFF."""
+    # meta es una FullBox: 4 bytes de versión y flags antes de las cajas hijas
+    children = {box.type: box for box in iter_boxes(f, meta.body_start + 4, meta.end)
+                if box.type in (b'iinf', b'iloc', b'idat')}
+    if b'iinf' not in children or b'iloc' not in children:
+        return None
+
+    exif_ids = _exif_item_ids(_read_body(f, children[b'iinf']))
+    if not exif_ids:
+        return None
+    locations = _item_locations(_read_body(f, children[b'iloc']), exif_ids)
+
+    for item_id in exif_ids:
+        location = locations.get(item_id)
+        if location is None:
+            continue
+        construction_method, offset, length = location
+        if construction_method == 1:
+            idat = children.get(b'idat')
+            if idat is None:
+                continue
+            offset += idat.body_start
+        elif construction_method != 0:
+            continue
+        date = _exif_item_date(f, offset, length)
+        if date is not None:
+            return date
+    return None
+
+
+def _exif_item_ids(iinf: bytes) -> List[int]:
+    """IDs de los ítems de tipo 'Exif' (cajas infe de versión 2 o 3)."""
+    if len(iinf) < 6:
+        raise IsoBmffError("iinf truncado")
+    position = 6 if iinf[0] == 0 else 8  # versión/flags + número de entradas (16 o 32 bits)
+    ids = []
+    while position + 8 <= len(iinf):
+        size, box_type = struct.unpack_from('>I4s', iinf, position)
+        if size < 8 or position + size > len(iinf):
+            raise IsoBmffError("infe inválido")
+        if box_type == b'infe':
+            version = iinf[position + 8]
+            body = position + 12
+            if version == 2 and size >= 20:
+                item_id = struct.unpack_from('>H', iinf, body)[0]
+                item_type = iinf[body + 4:body + 8]
+            elif version == 3 and size >= 22:
+                item_id = struct.unpack_from('>I', iinf, body)[0]
+                item_type = iinf[body + 6:body + 10]
+            else:
+                item_type = None
+            if item_type == b'Exif':
+                ids.append(item_id)
+        position += size
+    return ids
+
+
+def _item_locations(iloc: bytes, wanted: List[int]) -> Dict[int, Tuple[int, int, int]]:
+    """Ubicación (método de construcción, offset, longitud) del primer extent de cada ítem pedido."""
+    if len(iloc) < 8:
+        raise IsoBmffError("iloc truncado")
+    version = iloc[0]
+    offset_size, length_size = iloc[4] >> 4, iloc[4] & 0x0F
+    base_offset_size = iloc[5] >> 4
+    index_size = iloc[5] & 0x0F if version in (1, 2) else 0
+    if version < 2:
+        count, position = struct.unpack_from('>H', iloc, 6)[0], 8
+    else:
+        count, position = struct.unpack_from('>I', iloc, 6)[0], 10
+
+    def field(size: int) -> int:
+        nonlocal position
+        if size == 0:
+            return 0
+        if size not in (4, 8) or position + size > len(iloc):
+            raise IsoBmffError("iloc inválido")
+        value = struct.unpack_from('>I' if size == 4 else '>Q', iloc, position)[0]
+        position += size
+        return value
+
+    def short() -> int:
+        nonlocal position
+        if position + 2 > len(iloc):
+            raise IsoBmffError("iloc truncado")
+        value = struct.unpack_from('>H', iloc, position)[0]
+        position += 2
+        return value
+
+    locations = {}
+    for _ in range(count):
+        item_id = short() if version < 2 else field(4)
+        construction_method = short() & 0x0F if version in (1, 2) else 0
+        short()  # data_reference_index
+        base_offset = field(base_offset_size)
+        extents = []
+        for _ in range(short()):
+            field(index_size)
+            extents.append((field(offset_size), field(length_size)))
+        if item_id in wanted and extents:
+            offset, length = extents[0]
+            locations[item_id] = (construction_method, base_offset + offset, length)
+            if len(locations) == len(wanted):
+                break
+    return locations
+
+
+def _exif_item_date(f: BinaryIO, offset: int, length: int) -> Optional[datetime]:
+    """El ítem Exif empieza con 4 bytes que indican dónde está la cabecera TIFF ("Exif\\0\\0" antes)."""
+    f.seek(offset)
+    prefix = f.read(4)
+    if len(prefix) < 4:
+        raise IsoBmffError("Ítem Exif truncado")
+    skip = 4 + struct.unpack('>I', prefix)[0]
+    if skip >= length:
+        raise IsoBmffError("Ítem Exif inválido")
+    try:
+        return parse_tiff_date(bounded_reader(f, offset + skip, length - skip))
+    except ExifFormatError as e:
+        raise IsoBmffError(str(e))
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Generator, Iterator, Optional, Tuple
+
+from .mover import OperationResult, STATUS_DUPLICATE, STATUS_ERROR, STATUS_SKIPPED, STATUS_SUCCESS, move_file
+from .scanner import MediaGroup
+
+# Diario estructurado de cada ejecución del organizador (JSON lines en la carpeta destino).
+# Sustituye al antiguo operaciones_*.log de texto libre: se puede leer, filtrar y deshacer.
+
+# Escritura agrupada: se vuelca a disco cada tantos registros o segundos (y siempre al cerrar)
+_FLUSH_EVERY = 256
+_FLUSH_SECONDS = 2.0
+_BUFFER_SIZE = 1024 * 1024
+
+DEFAULT_UNDO_WORKERS = 8
+
+# Estados de un registro cuyos archivos se movieron (y por tanto se pueden devolver)
+_MOVED_STATUSES = (STATUS_SUCCESS, STATUS_DUPLICATE)
+
+
+class JournalError(ValueError):
+    """El diario no describe movimientos reales que se puedan deshacer."""
+
+
+def journal_path(dest_dir: Path, prefix: str = "operaciones") -> Path:
+    """Nombre del diario de una ejecución nueva: <destino>/operaciones_AAAAMMDD_HHMMSS.jsonl"""
+    return Path(dest_dir) / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+class OperationJournal:
+    """
+    Registro JSON lines de una ejecución: una cabecera `run`, un registro `op` por grupo
+    (origen, destino, tamaño, hash, estado, sidecars) y mensajes sueltos (`message`).
+    La escritura pasa por un búfer grande y se vuelca por lotes, no línea a línea.
+    Seguro entre hilos.
+    """
+
+    def __init__(self, path: Path, **run_info):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w", encoding="utf-8", buffering=_BUFFER_SIZE)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self.write("run", started=datetime.now().isoformat(timespec="seconds"), **run_info)
+
+    def write(self, record_type: str, **fields):
+        line = json.dumps({"type": record_type, **fields}, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._unflushed += 1
+            now = time.monotonic()
+            if self._unflushed >= _FLUSH_EVERY or now - self._last_flush >= _FLUSH_SECONDS:
+                self._file.flush()
+                self._unflushed = 0
+                self._last_flush = now
+
+    def record(self, media_group: MediaGroup, result: OperationResult):
+        """Registra el resultado de un grupo."""
+        self.write("op", status=result.status, source=str(media_group.main_file),
+                   destination=None if result.destination is None else str(result.destination),
+                   size=result.size, hash=result.digest, transfer=result.transfer,
+                   sidecars=[[str(src), str(dst)] for src, dst in result.sidecars],
+                   message=result.message)
+
+    def message(self, text: str):
+        self.write("message", text=text)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_journal(path: Path) -> Iterator[dict]:
+    """Registros del diario en orden. Las líneas incompletas o corruptas se ignoran."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def undo_journal(path: Path, workers: int = DEFAULT_UNDO_WORKERS, dry_run: bool = False,
+                 verify_copies: bool = True, stop_event: Optional[threading.Event] = None
+                 ) -> Generator[Tuple[dict, OperationResult], None, None]:
+    """
+    Devuelve a su origen los archivos que movió la ejecución registrada en `path`, en
+    `workers` hilos. En el mismo sistema de archivos cada archivo es un renombrado; entre
+    discos se usa la misma copia verificada que al organizar.
+
+    Un registro se omite si su destino ya no existe, si el tamaño no coincide con el registrado
+    (el archivo cambió después) o si el origen vuelve a estar ocupado. Nunca se sobrescribe nada.
+
+    Lanza JournalError si el diario es de una simulación: sus "destinos" nunca se crearon y
+    deshacerlo movería archivos que no son de esa ejecución.
+
+    Yields:
+        (registro del diario, OperationResult) en orden de finalización; `destination` es la
+        ruta restaurada.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    workers = max(1, workers)
+    header = next(read_journal(path), {})
+    if header.get("type") == "run" and header.get("dry_run"):
+        raise JournalError(f"El diario es de una simulación, no movió ningún archivo: {path}")
+    records = (r for r in read_journal(path) if r.get("type") == "op" and r.get("status") in _MOVED_STATUSES
+               and r.get("destination"))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ordenafotos-undo") as pool:
+        pending = {}
+        for record in records:
+            if stop_event.is_set():
+                break
+            # Ventana acotada: el diario puede tener millones de registros
+            while len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            pending[pool.submit(_undo_record, record, dry_run, verify_copies)] = record
+
+        for future in list(pending):
+            yield pending.pop(future), future.result()
+
+
+def _undo_record(record: dict, dry_run: bool, verify_copies: bool) -> OperationResult:
+    moves = [(Path(record["destination"]), Path(record["source"]))]
+    moves += [(Path(dst), Path(src)) for src, dst in record.get("sidecars", [])]
+
+    try:
+        size = 0
+        for current, original in moves:
+            if not current.exists():
+                return OperationResult(STATUS_SKIPPED, f"Ya no está en el destino: {current.name}")
+            if original.exists():
+                return OperationResult(STATUS_SKIPPED, f"El origen está ocupado: {original}")
+            size += current.stat().st_size
+        if record.get("size") and size != record["size"]:
+            return OperationResult(STATUS_SKIPPED, "Modificado después de organizar (el tamaño no coincide)")
+
+        if dry_run:
+            return OperationResult(STATUS_SUCCESS, f"Se devolvería a: {moves[0][1]} [SIMULACION]",
+                                   destination=moves[0][1])
+
+        transfer = None
+        for current, original in moves:
+            original.parent.mkdir(parents=True, exist_ok=True)
+            method, _ = move_file(current, original, verify_copies)
+            transfer = transfer or method
+        return OperationResult(STATUS_SUCCESS, f"Restaurado [{transfer}]", destination=moves[0][1],
+                               transfer=transfer, size=size)
+    except Exception as e:
+        return OperationResult(STATUS_ERROR, f"Error restaurando: {e}")
@@ -0,0 +1,31 @@
+import queue
+from collections import deque
+from typing import Dict, List
+
+# Vista del registro de actividad en la GUI: el widget solo guarda las últimas líneas
+# (el historial completo va al diario operaciones_*.jsonl).
+DEFAULT_MAX_LINES = 5000
+
+
+def drain_queue(log_queue: "queue.Queue", max_lines: int = DEFAULT_MAX_LINES) -> Dict[str, List[str]]:
+    """
+    Vacía la cola de mensajes (mensaje, área) de una vez y los agrupa por área.
+    De cada área se conservan solo las últimas `max_lines`: lo anterior no llegaría a verse,
+    así que no se inserta en el widget.
+    """
+    batches: Dict[str, deque] = {}
+    while True:
+        try:
+            message, area = log_queue.get_nowait()
+        except queue.Empty:
+            break
+        lines = batches.get(area)
+        if lines is None:
+            lines = batches[area] = deque(maxlen=max_lines)
+        lines.append(message)
+    return {area: list(lines) for area, lines in batches.items()}
+
+
+def lines_to_trim(current_lines: int, max_lines: int = DEFAULT_MAX_LINES) -> int:
+    """Líneas que hay que borrar del principio del widget para quedarse en `max_lines`."""
+    return max(0, current_lines - max_lines)
@@ -0,0 +1,235 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Métricas por etapa (contadores e histogramas de latencia) para saber en qué se va el tiempo
+# de una ejecución: EXIF, átomos de vídeo, hashes, copias, creación de carpetas...
+#
+# Desactivadas por defecto. Las funciones instrumentadas con `timed` solo comprueban un booleano
+# antes de llamar a la original: apagadas no miden, no bloquean y no reservan memoria.
+# Se activan con `enable()` (GUI, `--metrics` de la CLI) o con ORDENAFOTOS_METRICS=1.
+
+# Límites superiores (segundos) de los cubos de latencia: de 10 µs a ~100 s en escala logarítmica
+BUCKETS = tuple(m * 10.0 ** e for e in range(-5, 2) for m in (1, 2.5, 5)) + (100.0,)
+
+_enabled = os.environ.get("ORDENAFOTOS_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_histograms: Dict[str, "Histogram"] = {}
+_counters: Dict[str, float] = {}
+
+
+class Histogram:
+    """Histograma de latencias con cubos fijos. Seguro entre hilos."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts = [0] * (len(BUCKETS) + 1)  # El último cubo es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, fraction: float) -> float:
+        """Estimación del percentil: límite superior del cubo que lo contiene (acotado por el máximo)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = fraction * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    bound = BUCKETS[index] if index < len(BUCKETS) else self.max
+                    return min(bound, self.max)
+            return self.max
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+            low, high = self.min, self.max
+        return {"count": count, "sum": total, "min": low, "max": high,
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99),
+                "buckets": [[bound, n] for bound, n in zip(list(BUCKETS) + ["+Inf"], counts)]}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Borra lo medido (al empezar una ejecución)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def histogram(name: str) -> Histogram:
+    hist = _histograms.get(name)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(name, Histogram(name))
+    return hist
+
+
+def count(name: str, value: float = 1):
+    """Suma `value` al contador `name` (no hace nada si las métricas están apagadas)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+@contextmanager
+def timer(name: str):
+    """Mide el bloque en el histograma `name`."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name).observe(time.perf_counter() - start)
+
+
+def timed(name: str):
+    """
+    Decorador: mide cada llamada en el histograma `name`. En funciones generadoras se mide el
+    tiempo pasado dentro del generador (no el del consumidor) y se cuentan los elementos en
+    el contador `<name>.items`.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return func(*args, **kwargs)
+                return _timed_iter(name, func(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram(name).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _timed_iter(name: str, generator):
+    elapsed, items = 0.0, 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            items += 1
+            yield item
+    finally:
+        generator.close()
+        histogram(name).observe(elapsed)
+        count(f"{name}.items", items)
+
+
+def snapshot() -> dict:
+    with _lock:
+        histograms = dict(_histograms)
+        counters = dict(_counters)
+    return {"histograms": {name: hist.as_dict() for name, hist in sorted(histograms.items())},
+            "counters": dict(sorted(counters.items()))}
+
+
+def summary_lines() -> List[str]:
+    """Desglose corto por etapa para el registro de la GUI, de más a menos tiempo total."""
+    data = snapshot()
+    lines = []
+    for name, hist in sorted(data["histograms"].items(), key=lambda item: -item[1]["sum"]):
+        items = data["counters"].get(f"{name}.items")
+        calls = f"{hist['count']:,} llamadas" + (f", {int(items):,} elementos" if items is not None else "")
+        lines.append(f"{name}: {hist['sum']:.2f} s en {calls} · p50 {_format_seconds(hist['p50'])}"
+                     f" · p99 {_format_seconds(hist['p99'])}")
+    return lines
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if not seconds:
+        return "0"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def write(path: Path) -> Path:
+    """Escribe el resumen: formato textfile de Prometheus si la extensión es .prom, JSON en otro caso."""
+    path = Path(path)
+    data = snapshot()
+    if path.suffix == ".prom":
+        text = to_prometheus(data)
+    else:
+        text = json.dumps(data, indent=1)
+    # Escritura atómica: el recolector de textfiles de node_exporter puede leer en cualquier momento
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def to_prometheus(data: Optional[dict] = None, prefix: str = "ordenafotos") -> str:
+    """Formato de exposición de texto de Prometheus (una familia por histograma y por contador)."""
+    data = snapshot() if data is None else data
+    lines = []
+    if data["histograms"]:
+        metric = f"{prefix}_stage_seconds"
+        lines += [f"# HELP {metric} Latencia por llamada de cada etapa.", f"# TYPE {metric} histogram"]
+        for name, hist in data["histograms"].items():
+            cumulative = 0
+            for bound, n in hist["buckets"]:
+                cumulative += n
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {hist["sum"]}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {hist["count"]}')
+    if data["counters"]:
+        metric = f"{prefix}_events_total"
+        lines += [f"# HELP {metric} Contadores de la ejecución.", f"# TYPE {metric} counter"]
+        for name, value in data["counters"].items():
+            lines.append(f'{metric}{{name="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,18 @@
+import errno
 import os
 import shutil
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 
+from . import metrics
+from .cache import HashCache
+from .copier import CopyResult, copy_file
 from .date_extractor import get_date_taken
-from .integrity import check_duplicate
+from .dest_index import DestinationIndex, DirectIndex
+from .integrity import DEFAULT_ALGORITHM, calculate_hash
 from .scanner import MediaGroup, get_media_type
 
 # Constantes de Resultados
@@ -13,13 +21,51 @@ STATUS_SKIPPED = "SKIPPED"
 STATUS_ERROR = "ERROR"
 STATUS_DUPLICATE = "DUPLICATE_FOUND"
 
+# Cómo llegaron los bytes al destino
+TRANSFER_RENAME = "rename"   # Mismo sistema de archivos: renombrado atómico, sin copia de datos
+TRANSFER_COPY = "copy"       # Distinto dispositivo: copiar -> validar -> borrar
+
+# Nombres de carpeta en español
+MONTH_NAMES = ["00", "01-enero", "02-febrero", "03-marzo", "04-abril", "05-mayo", "06-junio",
+               "07-julio", "08-agosto", "09-septiembre", "10-octubre", "11-noviembre", "12-diciembre"]
+
+# La carpeta _DUPLICADOS_REVISAR es común a todos los meses: si hay varios movers
+# en paralelo, la elección de nombre libre y el movimiento deben ser exclusivos.
+_DUPLICATES_LOCK = threading.Lock()
+
+# Intentos de nombre libre si otro proceso ocupa el elegido entre el listado y el movimiento
+_MAX_NAME_RETRIES = 20
+
 class OperationResult:
-    def __init__(self, status: str, message: str, destination: Optional[Path] = None):
+    def __init__(self, status: str, message: str, destination: Optional[Path] = None,
+                 transfer: Optional[str] = None, size: int = 0, mb_per_s: float = 0.0,
+                 digest: Optional[str] = None, sidecars: Optional[List[Tuple[Path, Path]]] = None):
         self.status = status
         self.message = message
         self.destination = destination
+        # Método usado para mover el archivo principal y bytes movidos (principal + sidecars)
+        self.transfer = transfer
+        self.size = size
+        # Velocidad de la copia del archivo principal (0 en renombrados)
+        self.mb_per_s = mb_per_s
+        # Hash del archivo principal si se llegó a calcular (copia verificada o comprobación de duplicado)
+        self.digest = digest
+        # Sidecars movidos: [(origen, destino)]
+        self.sidecars = sidecars or []
+
+def build_target_dir(date: datetime, base_dest_path: Path, main_file: Path, classify_by_type: bool = False) -> Path:
+    """Calcula la carpeta destino Año/Mes[/Tipo] para una fecha de captura."""
+    folder_year = str(date.year)
+    folder_month = MONTH_NAMES[date.month] if 1 <= date.month <= 12 else "unknown"
 
-def move_media_safe(media_group: MediaGroup, base_dest_path: Path, duplicate_action: str = 'ask', dry_run: bool = False, classify_by_type: bool = False) -> OperationResult:
+    target_dir = base_dest_path / folder_year / folder_month
+
+    # Inyectar subcarpeta de tipo si aplica
+    if classify_by_type:
+        target_dir = target_dir / get_media_type(main_file)
+    return target_dir
+
+def move_media_safe(media_group: MediaGroup, base_dest_path: Path, duplicate_action: str = 'ask', dry_run: bool = False, classify_by_type: bool = False, hash_cache: Optional[HashCache] = None, date_taken: Optional[datetime] = None, verify_copies: bool = True, dest_index: Optional[DestinationIndex] = None) -> OperationResult:
     """
     Mueve un grupo multimedia de forma segura a la estructura organizada por fecha.
     
@@ -29,24 +75,15 @@ def move_media_safe(media_group: MediaGroup, base_dest_path: Path, duplicate_act
         duplicate_action: 'ask', 'overwrite', 'skip', 'delete_original'
         dry_run: Si es True, no mueve ni borra nada, solo simula.
         classify_by_type: Si es True, separa en carpetas RAW/FOTOS/VIDEOS dentro del mes.
+        hash_cache: Índice persistente de hashes para no releer archivos en colisiones de nombre.
+        date_taken: Fecha ya extraída (p. ej. por la etapa de fechas del pipeline); si es None se extrae aquí.
+        verify_copies: En movimientos entre dispositivos, verificar el contenido copiado por hash (no solo el tamaño).
+        dest_index: Índice de las carpetas destino compartido entre llamadas; si es None se consulta el disco directamente.
     """
     try:
         # 1. Determinar Fecha y Ruta Destino
-        date = get_date_taken(media_group.main_file)
-        
-        # Nombres de carpeta en español
-        month_names = ["00", "01-enero", "02-febrero", "03-marzo", "04-abril", "05-mayo", "06-junio", 
-                       "07-julio", "08-agosto", "09-septiembre", "10-octubre", "11-noviembre", "12-diciembre"]
-        
-        folder_year = str(date.year)
-        folder_month = month_names[date.month] if 1 <= date.month <= 12 else "unknown"
-        
-        target_dir = base_dest_path / folder_year / folder_month
-
-        # 1.2 Inyectar subcarpeta de tipo si aplica
-        if classify_by_type:
-            media_type = get_media_type(media_group.main_file)
-            target_dir = target_dir / media_type
+        date = date_taken if date_taken is not None else get_date_taken(media_group.main_file)
+        target_dir = build_target_dir(date, base_dest_path, media_group.main_file, classify_by_type)
         
         # 1.5. Verificar IDEMPOTENCIA
         target_main_path = target_dir / media_group.main_file.name
@@ -58,13 +95,25 @@ def move_media_safe(media_group: MediaGroup, base_dest_path: Path, duplicate_act
             if str(media_group.main_file.absolute()) == str(target_main_path.absolute()):
                  return OperationResult(STATUS_SKIPPED, "Archivo ya organizado (Misma ruta)")
 
-        # 2. Verificar Colisiones
-        created_by_dry_run = False # Flag para saber si simulamos que existe
+        # 2. Verificar Colisiones (índice en memoria compartido o, en llamadas sueltas, stats directos)
+        index = dest_index if dest_index is not None else DirectIndex(hash_cache)
+        stem = media_group.main_file.stem
+        suffix = media_group.main_file.suffix
+        source_size = media_group.main_file.stat().st_size
+        source_digest = None
+
+        def same_content(candidate: Path, candidate_size: int) -> bool:
+            # Solo se hashea si los tamaños coinciden; el hash del origen se calcula una vez
+            nonlocal source_digest
+            if candidate_size != source_size:
+                return False
+            if source_digest is None:
+                source_digest = calculate_hash(media_group.main_file, cache=hash_cache)
+            return index.digest(candidate) == source_digest
 
-        if target_main_path.exists():
-            is_exact_dup = check_duplicate(media_group.main_file, target_main_path)
-            
-            if is_exact_dup:
+        existing = index.lookup(target_main_path)
+        if existing is not None:
+            if same_content(*existing):
                 # ---------------------------------------------------------
                 # NUEVA LÓGICA: Mover a carpeta de Revisión de Duplicados
                 # ---------------------------------------------------------
@@ -77,95 +126,194 @@ def move_media_safe(media_group: MediaGroup, base_dest_path: Path, duplicate_act
                 dup_dir = base_dest_path / "_DUPLICADOS_REVISAR"
                 dup_dir.mkdir(parents=True, exist_ok=True)
 
-                # Calcular ruta en carpeta duplicados (manejando colisiones internas)
-                dup_final_path = dup_dir / media_group.main_file.name
-                
-                # Si ya existe un archivo con ese nombre en duplicados, renombramos
-                stem = media_group.main_file.stem
-                suffix = media_group.main_file.suffix
-                counter = 1
-                while dup_final_path.exists():
-                    dup_final_path = dup_dir / f"{stem}_dup_{counter}{suffix}"
-                    counter += 1
-
                 # Mover el grupo (Main + Sidecars) a la carpeta de duplicados
                 # Usamos la misma lógica segura: Copiar -> Validar -> Borrar
                 try:
-                    _copy_validate_delete(media_group.main_file, dup_final_path)
-                    
-                    # Mover sidecars también a la carpeta duplicados
-                    new_dup_stem = dup_final_path.stem
-                    for sidecar in media_group.sidecars:
-                        dup_sidecar_path = dup_dir / f"{new_dup_stem}{sidecar.suffix}"
-                        if dup_sidecar_path.exists(): os.remove(dup_sidecar_path) # Overwrite trash sidecars
-                        _copy_validate_delete(sidecar, dup_sidecar_path)
-
-                    return OperationResult(STATUS_DUPLICATE, f"Duplicado exacto. Movido a: {dup_final_path.name}", destination=dup_final_path)
+                    # Elegir nombre y mover bajo el mismo lock: la carpeta es compartida entre movers
+                    with _DUPLICATES_LOCK:
+                        # Si ya existe un archivo con ese nombre en duplicados, renombramos
+                        dup_final_path = index.next_free(dup_dir, stem, suffix)
+                        dup_final_path, transfer, copied = _move_to_free_name(media_group.main_file, dup_final_path, index,
+                                                                              verify_copies, hash_cache)
+                        index.add(dup_final_path, copied.size, copied.digest or source_digest)
+                        moved_bytes = copied.size
+                        moved_sidecars = []
+
+                        # Mover sidecars también a la carpeta duplicados
+                        new_dup_stem = dup_final_path.stem
+                        for sidecar in media_group.sidecars:
+                            sidecar_dest = dup_dir / f"{new_dup_stem}{sidecar.suffix}"
+                            moved_bytes += _move_sidecar(sidecar, sidecar_dest, index, verify_copies, hash_cache)
+                            moved_sidecars.append((sidecar, sidecar_dest))
+
+                    return OperationResult(STATUS_DUPLICATE,
+                                           f"Duplicado exacto. Movido a: {dup_final_path.name} [{_describe_transfer(transfer, copied)}]",
+                                           destination=dup_final_path, transfer=transfer, size=moved_bytes,
+                                           mb_per_s=copied.mb_per_s if transfer == TRANSFER_COPY else 0.0,
+                                           digest=copied.digest or source_digest, sidecars=moved_sidecars)
                 except Exception as e:
                     return OperationResult(STATUS_ERROR, f"Error moviendo a duplicados: {str(e)}")
 
             else:
                 # Falso duplicado -> Renombrar
-                stem = media_group.main_file.stem
-                suffix = media_group.main_file.suffix
-                counter = 1
-                while True:
-                    new_name = f"{stem}_dup_{counter}{suffix}"
-                    target_main_path = target_dir / new_name
-                    if not target_main_path.exists():
-                        break
-                    if check_duplicate(media_group.main_file, target_main_path):
-                         # Ya existe la copia renombrada igual
-                         if duplicate_action == 'skip':
-                             return OperationResult(STATUS_SKIPPED, f"Omitido, ya existe como {new_name}")
-                    counter += 1
+                if duplicate_action == 'skip':
+                    for candidate in index.renamed_copies(target_dir, stem, suffix, source_size):
+                        if same_content(candidate, source_size):
+                            # Ya existe la copia renombrada igual
+                            return OperationResult(STATUS_SKIPPED, f"Omitido, ya existe como {candidate.name}")
+                target_main_path = index.next_free(target_dir, stem, suffix)
 
         # 3. Ejecución del Movimiento
         if dry_run:
             return OperationResult(STATUS_SUCCESS, f"Se movería a: {target_main_path} [SIMULACION]", destination=target_main_path)
 
         # Crear directorio
-        target_dir.mkdir(parents=True, exist_ok=True)
+        with metrics.timer("mkdir"):
+            target_dir.mkdir(parents=True, exist_ok=True)
         
         # Mover Main
-        _copy_validate_delete(media_group.main_file, target_main_path)
+        target_main_path, transfer, copied = _move_to_free_name(media_group.main_file, target_main_path, index,
+                                                                verify_copies, hash_cache)
+        index.add(target_main_path, copied.size, copied.digest or source_digest)
+        moved_bytes = copied.size
+        moved_sidecars = []
         
         # Mover Sidecars
         new_stem = target_main_path.stem 
         for sidecar in media_group.sidecars:
-            dest_sidecar_name = f"{new_stem}{sidecar.suffix}"
-            dest_sidecar_path = target_dir / dest_sidecar_name
-            if dest_sidecar_path.exists():
-                os.remove(dest_sidecar_path)
-            _copy_validate_delete(sidecar, dest_sidecar_path)
+            sidecar_dest = target_dir / f"{new_stem}{sidecar.suffix}"
+            moved_bytes += _move_sidecar(sidecar, sidecar_dest, index, verify_copies, hash_cache)
+            moved_sidecars.append((sidecar, sidecar_dest))
 
-        return OperationResult(STATUS_SUCCESS, "Movido correctamente", destination=target_main_path)
+        return OperationResult(STATUS_SUCCESS, f"Movido correctamente [{_describe_transfer(transfer, copied)}]",
+                               destination=target_main_path, transfer=transfer, size=moved_bytes,
+                               mb_per_s=copied.mb_per_s if transfer == TRANSFER_COPY else 0.0,
+                               digest=copied.digest or source_digest, sidecars=moved_sidecars)
 
     except Exception as e:
         return OperationResult(STATUS_ERROR, f"Error critico: {str(e)}")
 
-def _copy_validate_delete(source: Path, destination: Path):
+def move_file(source: Path, destination: Path, verify: bool = True,
+              hash_cache: Optional[HashCache] = None) -> Tuple[str, CopyResult]:
+    """
+    Mueve un archivo suelto con las mismas garantías que el organizador: renombrado si comparten
+    dispositivo, copia verificada si no, y nunca pisa un destino existente (FileExistsError).
+    Retorna (método, CopyResult).
+    """
+    return _copy_validate_delete(source, destination, verify, hash_cache)
+
+@metrics.timed("copy")
+def _copy_validate_delete(source: Path, destination: Path, verify: bool = True,
+                          hash_cache: Optional[HashCache] = None) -> Tuple[str, CopyResult]:
     """
-    Realiza la operación atómica simulada: Copiar -> Verificar Tamaño -> Borrar Origen.
-    Garantiza que no se pierdan datos.
+    Mueve un archivo sin riesgo de pérdida de datos. Retorna (método, CopyResult).
+    - Mismo dispositivo: renombrado sin copiar ningún byte.
+    - Distinto dispositivo: Copiar -> Verificar -> Borrar Origen. Con `verify` el origen se
+      hashea mientras se copia y el destino se comprueba contra ese hash; sin él, la copia
+      se hace dentro del kernel y solo se valida el tamaño.
+    Nunca pisa un archivo existente: si `destination` ya existe lanza FileExistsError.
     """
-    # 1. Copiar preservando metadatos (shutil.copy2)
-    shutil.copy2(source, destination)
+    start = time.perf_counter()
+    src_stat = source.stat()
+    try:
+        same_device = src_stat.st_dev == destination.parent.stat().st_dev
+    except OSError:
+        same_device = False
+
+    if same_device:
+        try:
+            _rename_no_clobber(source, destination)
+            if hash_cache is not None:
+                # Mismo inodo con otra ruta: el hash ya calculado sigue valiendo
+                hash_cache.relocate(destination, src_stat)
+            return TRANSFER_RENAME, CopyResult(src_stat.st_size, time.perf_counter() - start, TRANSFER_RENAME)
+        except FileExistsError:
+            raise
+        except OSError as e:
+            # Bind mounts y similares comparten st_dev pero no admiten rename: copiar
+            if e.errno != errno.EXDEV:
+                raise
+
+    # 1. Copiar preservando metadatos (y verificando contenido si se pidió)
+    copied = copy_file(source, destination, verify=verify)
     
     # 2. Validar Existencia y Tamaño
     if not destination.exists():
         raise IOError(f"El archivo destino no se creó: {destination}")
     
-    src_size = source.stat().st_size
+    src_size = src_stat.st_size
     dst_size = destination.stat().st_size
     
     if src_size != dst_size:
         # Fallo de integridad. Intentar limpiar destino sucio y abortar.
         os.remove(destination)
         raise IOError(f"Error de integridad. Tamaños difieren ({src_size} vs {dst_size})")
+
+    # El hash calculado durante la copia sirve para el destino: la biblioteca no se relee al deduplicar
+    if hash_cache is not None and copied.digest is not None:
+        hash_cache.put(destination, copied.digest, algorithm=DEFAULT_ALGORITHM)
     
     # 3. Borrar Origen (Solo si validación pasó)
     os.remove(source)
+    return TRANSFER_COPY, copied
+
+def _rename_no_clobber(source: Path, destination: Path):
+    """
+    Renombrado que falla con FileExistsError si el destino existe (os.replace lo pisaría).
+    Enlace duro + borrado del origen: si se corta entre ambos, el archivo queda en los dos sitios.
+    """
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        # Sistemas sin enlaces duros (FAT/exFAT, algunos SMB): comprobar justo antes de renombrar.
+        # En Windows os.rename tampoco pisa un archivo existente.
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, "El destino ya existe", str(destination))
+        os.rename(source, destination)
+        return
+    os.unlink(source)
+
+def _move_to_free_name(source: Path, destination: Path, index, verify: bool,
+                       hash_cache: Optional[HashCache]) -> Tuple[Path, str, CopyResult]:
+    """
+    Mueve `source` a `destination`; si el nombre se ocupó después de listar la carpeta (otro
+    proceso escribiendo en el destino), relista la carpeta y prueba el siguiente `_dup_N` libre.
+    Retorna (ruta final, método, CopyResult).
+    """
+    for _ in range(_MAX_NAME_RETRIES):
+        try:
+            transfer, copied = _copy_validate_delete(source, destination, verify, hash_cache)
+            return destination, transfer, copied
+        except FileExistsError:
+            index.refresh(destination.parent)
+            destination = index.next_free(destination.parent, source.stem, source.suffix)
+    raise FileExistsError(errno.EEXIST, "No se encontró un nombre libre en el destino", str(destination))
+
+def _move_sidecar(sidecar: Path, destination: Path, index, verify: bool,
+                  hash_cache: Optional[HashCache]) -> int:
+    """Mueve un sidecar junto a su archivo principal, reemplazando el que hubiera. Retorna los bytes movidos."""
+    existing = index.lookup(destination)
+    if existing is not None:
+        os.remove(existing[0])
+        index.discard(existing[0])
+    try:
+        copied = _copy_validate_delete(sidecar, destination, verify, hash_cache)[1]
+    except FileExistsError:
+        # Sidecar huérfano aparecido después de listar: se reemplaza, como los ya conocidos
+        os.remove(destination)
+        copied = _copy_validate_delete(sidecar, destination, verify, hash_cache)[1]
+    index.add(destination, copied.size, copied.digest)
+    return copied.size
+
+def _describe_transfer(transfer: str, copied: CopyResult) -> str:
+    """Texto para el log: 'rename' o 'copy 85.3 MB/s'."""
+    if transfer == TRANSFER_COPY:
+        return f"{transfer} {copied.mb_per_s:.1f} MB/s"
+    return transfer
 
 def _safe_delete_group(media_group: MediaGroup):
     """Borra el grupo de archivos de origen (usado cuando se decide borrar duplicado)."""
@@ -0,0 +1,284 @@
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Generator, Iterable, Optional, Set, Tuple
+
+from .cache import HashCache, DateCache
+from .checkpoint import Checkpoint
+from .date_extractor import get_date_taken, get_filesystem_date
+from .dest_index import DestinationIndex
+from .mover import move_media_safe, build_target_dir, OperationResult, STATUS_ERROR
+from .progress import ProgressTracker, STAGE_SCAN, STAGE_COPY
+from .scanner import scan_directory, MediaGroup, DEFAULT_SCAN_WORKERS
+from .snapshot import DirectorySnapshot
+
+# Paralelismo por defecto de cada etapa
+DEFAULT_DATE_WORKERS = 4
+DEFAULT_MOVER_WORKERS = 1
+# Capacidad de cada cola entre etapas: limita la memoria aunque el origen tenga millones de archivos
+DEFAULT_QUEUE_SIZE = 256
+
+# Marca de fin de flujo entre etapas
+_END = object()
+
+
+def organize_pipeline(source_dir: Path, dest_dir: Path, excluded_folders: Optional[Set[str]] = None,
+                      dry_run: bool = False, classify_by_type: bool = False,
+                      duplicate_action: str = 'ask', hash_cache: Optional[HashCache] = None,
+                      date_cache: Optional[DateCache] = None,
+                      scan_workers: int = DEFAULT_SCAN_WORKERS,
+                      date_workers: int = DEFAULT_DATE_WORKERS,
+                      mover_workers: int = DEFAULT_MOVER_WORKERS,
+                      queue_size: int = DEFAULT_QUEUE_SIZE,
+                      verify_copies: bool = True,
+                      snapshot: Optional[DirectorySnapshot] = None,
+                      full_rescan: bool = False,
+                      stop_event: Optional[threading.Event] = None,
+                      groups: Optional[Iterable[MediaGroup]] = None,
+                      dest_index: Optional[DestinationIndex] = None,
+                      progress: Optional[ProgressTracker] = None,
+                      checkpoint: Optional[Checkpoint] = None) -> Generator[Tuple[MediaGroup, OperationResult], None, None]:
+    """
+    Organiza `source_dir` en `dest_dir` con tres etapas concurrentes unidas por colas acotadas:
+
+        escáner (`scan_workers` hilos de listado) -> extracción de fechas (`date_workers` hilos) -> movimiento (`mover_workers` hilos)
+
+    Así el disco no espera a Pillow/exifread ni al revés. Las colas llenas bloquean a la etapa
+    anterior (backpressure), por lo que la memoria no crece con el tamaño del origen.
+    Cada mover atiende siempre las mismas carpetas destino (reparto por carpeta), de modo que las
+    colisiones de nombre dentro de un mes se resuelven en serie aunque haya varios movers.
+
+    Con `date_cache`, las fechas ya resueltas en ejecuciones anteriores (p. ej. una simulación)
+    no se vuelven a extraer. `verify_copies` se pasa a `move_media_safe` (verificación por hash
+    de las copias entre dispositivos).
+
+    Con `snapshot` el escaneo es incremental (solo archivos nuevos o modificados; `full_rescan`
+    fuerza el recorrido completo). Los grupos que fallan o se descartan se olvidan en la
+    instantánea para que la siguiente ejecución los vuelva a intentar. En simulación no se usa:
+    una simulación no debe consumir los cambios pendientes.
+
+    Con `groups` no se escanea `source_dir`: se organizan esos grupos (p. ej. un lote del modo
+    vigilancia). `dest_index` permite compartir el índice del destino entre varias ejecuciones
+    seguidas del mismo proceso (no en procesos de larga duración: el destino cambia entre medias).
+
+    Con `progress` cada etapa publica su avance (etapas STAGE_SCAN y STAGE_COPY). Si se recorre
+    el origen completo, un hilo aparte cuenta antes los archivos y bytes para que el total sea
+    real desde el principio; si no (escaneo incremental, lotes), el total se estima sobre la marcha.
+
+    Con `checkpoint` los grupos terminados se anotan en el punto de control, y los que ya
+    figuran en él (de una ejecución interrumpida) se saltan sin extraer su fecha. Tampoco se usa
+    en simulación.
+
+    Si se activa `stop_event` se deja de escanear y los elementos pendientes se descartan;
+    los movimientos ya en curso terminan y se reportan.
+
+    Yields:
+        (MediaGroup, OperationResult) en orden de finalización.
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    # Un solo índice del destino para toda la ejecución: cada carpeta mes se lista una vez
+    if dest_index is None:
+        dest_index = DestinationIndex(hash_cache)
+    if dry_run:
+        snapshot = None
+        checkpoint = None
+
+    def discard(media_group: MediaGroup):
+        """El grupo no llegó a moverse: que el próximo escaneo incremental lo vuelva a emitir."""
+        if snapshot is not None:
+            snapshot.forget(media_group.main_file)
+    date_workers = max(1, date_workers)
+    mover_workers = max(1, mover_workers)
+
+    date_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    move_queues = [queue.Queue(maxsize=queue_size) for _ in range(mover_workers)]
+    result_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+
+    # Conteo previo solo si se va a emitir todo el origen; si no, el escáner estima el total
+    precount = progress is not None and groups is None and (snapshot is None or full_rescan)
+    count_stop = threading.Event()
+
+    def counter():
+        try:
+            for media_group in scan_directory(Path(source_dir), excluded_folders, workers=scan_workers):
+                if count_stop.is_set() or stop_event.is_set():
+                    return
+                progress.add_total(STAGE_SCAN, 1)
+                progress.add_total(STAGE_COPY, 1, _group_size(media_group))
+            progress.finish_total(STAGE_SCAN)
+            progress.finish_total(STAGE_COPY)
+        except Exception:
+            # El conteo es orientativo: un fallo no debe afectar a la organización
+            pass
+
+    errors = []
+    date_workers_left = [date_workers]
+    date_workers_lock = threading.Lock()
+
+    def walker():
+        try:
+            if groups is None:
+                source = scan_directory(Path(source_dir), excluded_folders, workers=scan_workers,
+                                        snapshot=snapshot, full_rescan=full_rescan)
+            else:
+                source = groups
+            for media_group in source:
+                if stop_event.is_set():
+                    discard(media_group)
+                    break
+                if checkpoint is not None and checkpoint.is_done(media_group):
+                    # Terminado en una ejecución anterior: ya cuenta como hecho
+                    if progress is not None:
+                        progress.advance(STAGE_SCAN)
+                        if precount:
+                            progress.advance(STAGE_COPY, 1, _group_size(media_group))
+                    continue
+                if progress is not None:
+                    if not precount:
+                        progress.add_total(STAGE_SCAN, 1)
+                        progress.add_total(STAGE_COPY, 1)
+                    progress.advance(STAGE_SCAN)
+                date_queue.put(media_group)
+            if progress is not None and not stop_event.is_set():
+                progress.finish(STAGE_SCAN)
+                if not precount:
+                    progress.finish_total(STAGE_COPY)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(date_workers):
+                date_queue.put(_END)
+
+    def fail(e: Exception, own_queue: "queue.Queue"):
+        """
+        Error inesperado en un hilo: se guarda para relanzarlo en el consumidor, se detiene la
+        ejecución y se vacía la cola propia hasta su fin para no bloquear al productor.
+        """
+        errors.append(e)
+        stop_event.set()
+        while True:
+            item = own_queue.get()
+            if item is _END:
+                return
+            try:
+                discard(item if isinstance(item, MediaGroup) else item[0])
+            except Exception:
+                pass  # Ya hay un error que relanzar
+
+    def date_worker():
+        try:
+            while True:
+                media_group = date_queue.get()
+                if media_group is _END:
+                    break
+                if stop_event.is_set():
+                    discard(media_group)
+                    continue  # Drenar sin procesar
+
+                size = 0
+                if progress is not None:
+                    size = _group_size(media_group)
+                    if not precount:
+                        progress.add_total(STAGE_COPY, 0, size)
+
+                try:
+                    date = get_date_taken(media_group.main_file, cache=date_cache)
+                except Exception:
+                    # Misma fecha de respaldo que daría el extractor sin metadatos. El mover la recibe
+                    # tal cual, así su carpeta destino (y el mover que le toca) es la calculada aquí.
+                    date = get_filesystem_date(media_group.main_file)[0]
+                try:
+                    target_dir = build_target_dir(date, Path(dest_dir), media_group.main_file, classify_by_type)
+                    shard = hash(str(target_dir)) % mover_workers
+                except Exception:
+                    # Sin carpeta destino el mover falla igual al calcularla y no escribe nada
+                    shard = 0
+                move_queues[shard].put((media_group, date, size))
+        except Exception as e:
+            fail(e, date_queue)
+        finally:
+            # El último worker de fechas cierra las colas de los movers
+            with date_workers_lock:
+                date_workers_left[0] -= 1
+                last = date_workers_left[0] == 0
+            if last:
+                for move_queue in move_queues:
+                    move_queue.put(_END)
+
+    def mover(move_queue):
+        try:
+            while True:
+                item = move_queue.get()
+                if item is _END:
+                    break
+                media_group, date, size = item
+                if stop_event.is_set():
+                    discard(media_group)
+                    continue
+
+                result = move_media_safe(media_group, Path(dest_dir),
+                                         duplicate_action=duplicate_action,
+                                         dry_run=dry_run,
+                                         classify_by_type=classify_by_type,
+                                         hash_cache=hash_cache,
+                                         verify_copies=verify_copies,
+                                         dest_index=dest_index,
+                                         date_taken=date)
+                if result.status == STATUS_ERROR:
+                    discard(media_group)
+                elif checkpoint is not None:
+                    checkpoint.record(media_group, result)
+                if progress is not None:
+                    progress.advance(STAGE_COPY, 1, size)
+                result_queue.put((media_group, result))
+        except Exception as e:
+            fail(e, move_queue)
+        finally:
+            result_queue.put(_END)
+
+    threads = [threading.Thread(target=walker, name="ordenafotos-scan", daemon=True)]
+    if precount:
+        threads.append(threading.Thread(target=counter, name="ordenafotos-count", daemon=True))
+    threads += [threading.Thread(target=date_worker, name=f"ordenafotos-date-{i}", daemon=True)
+                for i in range(date_workers)]
+    threads += [threading.Thread(target=mover, args=(move_queues[i],), name=f"ordenafotos-move-{i}", daemon=True)
+                for i in range(mover_workers)]
+    for thread in threads:
+        thread.start()
+
+    movers_left = mover_workers
+    try:
+        while movers_left:
+            item = result_queue.get()
+            if item is _END:
+                movers_left -= 1
+                continue
+            yield item
+    finally:
+        # Si el consumidor abandona el generador, detener y drenar para liberar los hilos
+        if movers_left:
+            stop_event.set()
+            while movers_left:
+                if result_queue.get() is _END:
+                    movers_left -= 1
+        count_stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    if progress is not None and not stop_event.is_set():
+        progress.finish(STAGE_COPY)
+
+
+def _group_size(media_group: MediaGroup) -> int:
+    """Bytes del archivo principal y sus sidecars (0 los que no se puedan leer)."""
+    size = 0
+    for path in [media_group.main_file] + media_group.sidecars:
+        try:
+            size += os.stat(path).st_size
+        except OSError:
+            pass
+    return size
@@ -0,0 +1,238 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# Modo perfilado de una ejecución (organizador o duplicados), opcional.
+#
+# Solo se perfila el hilo que arranca el perfilador (el worker de la GUI o el hilo principal de
+# la CLI) y los hilos "ordenafotos-*" que se creen mientras está activo: el mainloop de Tk y
+# cualquier otro hilo quedan fuera. Se guardan tres archivos junto al diario de operaciones
+# (o, si no hay diario, en DEFAULT_PROFILE_DIR, fuera de la carpeta analizada):
+#   <base>.pstats        cProfile combinado de todos los hilos perfilados (snakeviz, pstats)
+#   <base>.folded        pilas muestreadas en formato "collapsed" (flamegraph.pl, speedscope)
+#   <base>_memoria.txt   tracemalloc: pico, mayores asignaciones y crecimiento durante la ejecución
+#
+# Desde Python 3.12 cProfile usa sys.monitoring: solo puede haber un perfilador activo en todo el
+# proceso y registra todos los hilos. Ahí se usa un único cProfile global (incluye también al
+# resto de hilos) y la atribución por hilo queda en las pilas muestreadas (.folded).
+
+THREAD_PREFIX = "ordenafotos-"
+# Perfiles de ejecuciones sin diario (duplicados): nunca dentro del árbol que se analiza
+DEFAULT_PROFILE_DIR = Path.home() / ".ordenafotos" / "perfiles"
+DEFAULT_SAMPLE_INTERVAL = 0.01   # Segundos entre muestras de pilas
+DEFAULT_MEMORY_INTERVAL = 5.0    # Segundos entre instantáneas de tracemalloc
+_MEMORY_TOP = 25
+
+# cProfile por hilo solo antes de 3.12 (después es global al proceso)
+_PER_THREAD_PROFILE = sys.version_info < (3, 12)
+
+# Sufijo numérico de los hilos de un mismo pool ("ordenafotos-date-3", "ordenafotos-hash_0")
+_THREAD_NUMBER = re.compile(r"[-_]\d+$")
+
+
+def profile_base(folder: Optional[Path] = None, prefix: str = "perfil") -> Path:
+    """Ruta base de los archivos de perfil de una ejecución nueva: <carpeta>/perfil_AAAAMMDD_HHMMSS"""
+    folder = DEFAULT_PROFILE_DIR if folder is None else Path(folder)
+    return folder / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+class RunProfiler:
+    """
+    Perfilador de una ejecución. Usar como context manager desde el hilo que hace el trabajo:
+
+        with RunProfiler(base) as profiler:
+            for result in organize_pipeline(...):
+                ...
+        profiler.files  # rutas escritas
+
+    Combina tres técnicas: cProfile por hilo (tiempos exactos por función), un muestreador de
+    pilas cada `sample_interval` s (dónde se está realmente, incluidas las esperas) y
+    tracemalloc cada `memory_interval` s. tracemalloc es global: cuenta la memoria de todo el
+    proceso, no solo la de los hilos perfilados.
+    """
+
+    def __init__(self, base_path: Path, sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 memory_interval: float = DEFAULT_MEMORY_INTERVAL, trace_memory: bool = True,
+                 thread_prefix: str = THREAD_PREFIX):
+        self.base_path = Path(base_path)
+        self.sample_interval = sample_interval
+        self.memory_interval = memory_interval
+        self.trace_memory = trace_memory
+        self.thread_prefix = thread_prefix
+        self.files: List[Path] = []
+        self.samples = 0
+
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._owner: Optional[int] = None
+        self._previous_hook = None
+        self._first_snapshot = None
+        self._last_snapshot = None
+        self._started_tracemalloc = False
+        self._stats: Optional[pstats.Stats] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._owner = threading.get_ident()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if tracemalloc.is_tracing():
+            self._first_snapshot = tracemalloc.take_snapshot()
+
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"{self.thread_prefix}profiler", daemon=True)
+        self._sampler.start()
+
+        if _PER_THREAD_PROFILE:
+            # Los hilos nuevos llaman a este gancho al arrancar: los "ordenafotos-*" activan su propio cProfile
+            self._previous_hook = threading.getprofile()
+            threading.setprofile(self._thread_hook)
+        self._enable_profile()
+
+    def stop(self) -> List[Path]:
+        """Detiene la captura y escribe los archivos. Devuelve sus rutas (también en `files`)."""
+        if self._sampler is None:
+            return self.files
+        if _PER_THREAD_PROFILE:
+            threading.setprofile(self._previous_hook)
+        # El perfil de este hilo se desactiva primero: create_stats() desactiva el del hilo que llama
+        for profile in self._profiles:
+            profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+
+        if tracemalloc.is_tracing():
+            self._last_snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        else:
+            current = peak = None
+
+        self.base_path.parent.mkdir(parents=True, exist_ok=True)
+        self._stats = self._merged_stats()
+        if self._stats is not None:
+            path = self.base_path.with_name(self.base_path.name + ".pstats")
+            self._stats.dump_stats(path)
+            self.files.append(path)
+
+        path = self.base_path.with_name(self.base_path.name + ".folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+        self.files.append(path)
+
+        if self._last_snapshot is not None:
+            path = self.base_path.with_name(self.base_path.name + "_memoria.txt")
+            path.write_text(self._memory_report(current, peak), encoding="utf-8")
+            self.files.append(path)
+        return self.files
+
+    def summary_lines(self, limit: int = 10) -> List[str]:
+        """Funciones con más tiempo propio (cProfile), para el registro de la GUI."""
+        if self._stats is None:
+            return []
+        rows = sorted(self._stats.stats.items(), key=lambda item: -item[1][2])[:limit]
+        lines = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows:
+            where = "" if filename == "~" else f" ({os.path.basename(filename)}:{line})"  # "~": función nativa
+            lines.append(f"{tottime:7.2f} s propios, {cumtime:7.2f} s acumulados, {calls:>8,} llamadas · {name}{where}")
+        return lines
+
+    # --- cProfile por hilo ---
+
+    def _enable_profile(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Otro perfilador ya activo (3.12+): nos quedamos con el muestreo, sin tumbar el hilo
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def _thread_hook(self, frame, event, arg):
+        # Se ejecuta una vez, en la primera llamada del hilo nuevo
+        sys.setprofile(None)
+        if threading.current_thread().name.startswith(self.thread_prefix) and not self._stop.is_set():
+            self._enable_profile()
+
+    def _merged_stats(self) -> Optional[pstats.Stats]:
+        stats = None
+        for profile in self._profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile, stream=io.StringIO())
+                else:
+                    stats.add(profile)
+            except TypeError:
+                continue  # Hilo sin ninguna llamada registrada
+        return stats
+
+    # --- Muestreo de pilas y memoria ---
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        next_memory = time.monotonic() + self.memory_interval
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident, "")
+                if ident == self._owner:
+                    root = "worker"
+                elif name.startswith(self.thread_prefix):
+                    root = _THREAD_NUMBER.sub("", name)
+                else:
+                    continue
+                self._stacks[_collapse(root, frame)] += 1
+            self.samples += 1
+
+            if tracemalloc.is_tracing() and time.monotonic() >= next_memory:
+                self._last_snapshot = tracemalloc.take_snapshot()
+                next_memory = time.monotonic() + self.memory_interval
+
+    def _memory_report(self, current: Optional[int], peak: Optional[int]) -> str:
+        out = io.StringIO()
+        if current is not None:
+            out.write(f"Memoria trazada al terminar: {current / 1e6:.1f} MB · pico: {peak / 1e6:.1f} MB\n")
+        out.write(f"\nMayores asignaciones vivas al terminar (top {_MEMORY_TOP}):\n")
+        for stat in self._last_snapshot.statistics("lineno")[:_MEMORY_TOP]:
+            out.write(f"  {stat}\n")
+        if self._first_snapshot is not None:
+            out.write(f"\nCrecimiento desde el inicio (top {_MEMORY_TOP}):\n")
+            for stat in self._last_snapshot.compare_to(self._first_snapshot, "lineno")[:_MEMORY_TOP]:
+                out.write(f"  {stat}\n")
+        return out.getvalue()
+
+
+def _collapse(root: str, frame) -> str:
+    """Pila en formato collapsed: raíz;llamador;...;función (sin espacios ni ';' en los nombres)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name}({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(name.replace(" ", "_").replace(";", ":") for name in reversed(names))
@@ -0,0 +1,183 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Etapas publicadas por los workers
+STAGE_SCAN = "scan"    # Descubrimiento de archivos
+STAGE_HASH = "hash"    # Huellas y hashes (buscador de duplicados)
+STAGE_COPY = "copy"    # Movimiento / copia al destino
+
+STAGE_LABELS = {STAGE_SCAN: "Escaneo", STAGE_HASH: "Hash", STAGE_COPY: "Copia"}
+
+
+class ProgressEvent:
+    """Estado de una etapa en un instante: contadores, totales y ritmos derivados."""
+
+    def __init__(self, stage: str, files_done: int, files_total: int, bytes_done: int, bytes_total: int,
+                 elapsed: float, total_final: bool, finished: bool):
+        self.stage = stage
+        self.files_done = files_done
+        self.files_total = files_total
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.elapsed = elapsed
+        # False mientras el total es una estimación que aún puede crecer
+        self.total_final = total_final
+        self.finished = finished
+
+    @property
+    def fraction(self) -> float:
+        """Avance de 0 a 1; por bytes si se conocen (el coste es proporcional a los bytes)."""
+        if self.finished:
+            return 1.0
+        if self.bytes_total > 0:
+            return min(1.0, self.bytes_done / self.bytes_total)
+        if self.files_total > 0:
+            return min(1.0, self.files_done / self.files_total)
+        return 0.0
+
+    @property
+    def files_per_s(self) -> float:
+        return self.files_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes_done / self.elapsed / 1e6 if self.elapsed > 0 else 0.0
+
+    @property
+    def bytes_remaining(self) -> int:
+        return max(0, self.bytes_total - self.bytes_done)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Segundos restantes al ritmo medio de la etapa; None si aún no hay ritmo ni total."""
+        if self.finished:
+            return 0.0
+        if self.bytes_total > 0 and self.bytes_done > 0:
+            return self.bytes_remaining / (self.bytes_done / self.elapsed) if self.elapsed > 0 else None
+        if self.files_total > 0 and self.files_done > 0:
+            return max(0, self.files_total - self.files_done) / self.files_per_s if self.elapsed > 0 else None
+        return None
+
+    def as_dict(self) -> dict:
+        eta = self.eta
+        return {
+            "stage": self.stage, "files_done": self.files_done, "files_total": self.files_total,
+            "bytes_done": self.bytes_done, "bytes_total": self.bytes_total,
+            "files_per_s": round(self.files_per_s, 1), "mb_per_s": round(self.mb_per_s, 1),
+            "bytes_remaining": self.bytes_remaining, "eta_s": None if eta is None else round(eta, 1),
+            "total_final": self.total_final, "finished": self.finished,
+        }
+
+    def __repr__(self):
+        return f"<ProgressEvent {self.stage} {self.files_done}/{self.files_total} {self.fraction:.0%}>"
+
+
+class _Stage:
+    __slots__ = ("files_done", "files_total", "bytes_done", "bytes_total", "started", "ended",
+                 "total_final", "finished")
+
+    def __init__(self):
+        self.files_done = self.files_total = self.bytes_done = self.bytes_total = 0
+        self.started = None
+        self.ended = None
+        self.total_final = False
+        self.finished = False
+
+
+class ProgressTracker:
+    """
+    Contadores por etapa compartidos entre hilos. Los workers publican con `add_total` y
+    `advance`; la interfaz (o la CLI) lee eventos con `event`/`events` cuando quiera, sin
+    que los workers esperen por ella.
+
+    Los totales pueden llegar poco a poco (conteo previo en paralelo o estimación sobre la
+    marcha); `finish_total` indica que ya no crecerán.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, _Stage] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> _Stage:
+        """Llamar con el lock tomado."""
+        state = self._stages.get(stage)
+        if state is None:
+            state = self._stages[stage] = _Stage()
+        return state
+
+    def add_total(self, stage: str, files: int = 0, nbytes: int = 0):
+        with self._lock:
+            state = self._stage(stage)
+            state.files_total += files
+            state.bytes_total += nbytes
+
+    def finish_total(self, stage: str):
+        """El total de `stage` es definitivo."""
+        with self._lock:
+            self._stage(stage).total_final = True
+
+    def advance(self, stage: str, files: int = 1, nbytes: int = 0):
+        with self._lock:
+            state = self._stage(stage)
+            if state.started is None:
+                state.started = time.monotonic()
+            state.files_done += files
+            state.bytes_done += nbytes
+
+    def finish(self, stage: str):
+        """La etapa terminó: lo hecho pasa a ser el total (archivos ilegibles, parada...)."""
+        with self._lock:
+            state = self._stage(stage)
+            state.files_total = state.files_done
+            state.bytes_total = state.bytes_done
+            state.total_final = state.finished = True
+            state.ended = time.monotonic()
+
+    def event(self, stage: str) -> ProgressEvent:
+        with self._lock:
+            state = self._stage(stage)
+            if state.started is None:
+                elapsed = 0.0
+            else:
+                elapsed = (state.ended or time.monotonic()) - state.started
+            return ProgressEvent(stage, state.files_done, state.files_total, state.bytes_done,
+                                 state.bytes_total, elapsed, state.total_final, state.finished)
+
+    def events(self) -> List[ProgressEvent]:
+        with self._lock:
+            stages = list(self._stages)
+        return [self.event(stage) for stage in stages]
+
+    def current(self) -> Optional[ProgressEvent]:
+        """
+        Etapa que conviene mostrar en la barra: la última en empezar que aún no ha terminado
+        (mientras se copia, el escaneo sigue avanzando pero no es lo que marca el ritmo).
+        """
+        with self._lock:
+            started = sorted((state.started, name) for name, state in self._stages.items()
+                             if state.started is not None)
+            running = [name for _, name in started if not self._stages[name].finished]
+            stage = running[-1] if running else (started[-1][1] if started else None)
+        return None if stage is None else self.event(stage)
+
+
+def format_event(event: ProgressEvent) -> str:
+    """Resumen de una línea para la interfaz."""
+    label = STAGE_LABELS.get(event.stage, event.stage)
+    total = f"{event.files_total:,}" if event.total_final else f"~{event.files_total:,}"
+    parts = [f"{label}: {event.files_done:,}/{total} archivos ({event.fraction:.0%})",
+             f"{event.files_per_s:.0f} arch/s", f"{event.mb_per_s:.1f} MB/s"]
+    if event.bytes_total:
+        parts.append(f"quedan {event.bytes_remaining / 1024 ** 3:.2f} GB")
+    eta = event.eta
+    if eta is not None and not event.finished:
+        parts.append(f"ETA {format_duration(eta)}")
+    return " · ".join(parts)
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
@@ -1,6 +1,13 @@
+import functools
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Generator, List, Set
+from typing import Generator, List, Optional, Set, Tuple, Union
+
+from . import metrics
+from .exclusions import ExclusionMatcher
+from .snapshot import DirectorySnapshot
 
 # Definición de extensiones que consideramos "Multimedia"
 # (Sincronizado con date_extractor y README)
@@ -22,6 +29,9 @@ SIDECAR_EXTENSIONS = {'.aae', '.xmp', '.thm'}
 
 ALL_MEDIA_EXTENSIONS = IMG_STANDARD.union(IMG_RAW).union(VIDEO_EXTENSIONS)
 
+# Hilos de listado por defecto: en discos locales uno basta; en red conviene subirlo
+DEFAULT_SCAN_WORKERS = 1
+
 class MediaGroup:
     """
     Representa un archivo multimedia principal y sus archivos auxiliares (sidecars).
@@ -37,81 +47,196 @@ class MediaGroup:
     def __repr__(self):
         return f"<MediaGroup main={self.main_file.name} sidecars={len(self.sidecars)}>"
 
-def scan_directory(source_dir: Path, excluded_folders: Set[str] = None) -> Generator[MediaGroup, None, None]:
+@metrics.timed("scan")
+def scan_directory(source_dir: Path, excluded_folders: Union[Set[str], ExclusionMatcher, None] = None,
+                   workers: int = DEFAULT_SCAN_WORKERS, snapshot: Optional[DirectorySnapshot] = None,
+                   full_rescan: bool = False) -> Generator[MediaGroup, None, None]:
     """
     Recorre recursivamente el directorio buscando archivos multimedia validos.
     Agrupa automáticamente los archivos sidecar (.xmp, .aae) con su archivo principal
     si comparten el mismo nombre base.
+
+    Se usa os.scandir: el tipo de cada entrada viene del propio listado, así que un archivo
+    normal no cuesta ninguna llamada extra al sistema (importante en NAS/SMB). La raíz se
+    resuelve una sola vez y los directorios ya visitados se recuerdan por (dispositivo, inodo).
+    Los enlaces simbólicos a carpetas no se siguen (igual que os.walk).
     
     Args:
         source_dir: Directorio raíz a escanear
-        excluded_folders: Set de rutas absolutas de carpetas a excluir del escaneo
+        excluded_folders: Rutas absolutas de carpetas y/o patrones glob ("**/@eaDir") a excluir,
+            o un ExclusionMatcher ya compilado (p. ej. para no distinguir mayúsculas)
+        workers: Hilos que listan carpetas a la vez. Con 1 el orden es el de os.walk; con más,
+            cada carpeta se emite en cuanto termina su listado (útil en SMB/NFS o lectores USB lentos)
+        snapshot: Instantánea del escaneo anterior. Si se pasa, solo se listan las carpetas cuyo
+            mtime cambió y solo se emiten grupos con archivos nuevos o modificados.
+        full_rescan: Con `snapshot`, relistar y emitir todo (y refrescar la instantánea).
     
     Yields:
         MediaGroup: Grupo de archivos multimedia (principal + sidecars)
     """
     source_path = Path(source_dir).resolve()
     
-    # Normalizar carpetas excluidas a rutas absolutas
-    if excluded_folders is None:
-        excluded_folders = set()
+    # Compilar las exclusiones una sola vez (rutas absolutas y patrones glob)
+    if isinstance(excluded_folders, ExclusionMatcher):
+        matcher = excluded_folders
     else:
-        # Convertir a rutas absolutas y normalizar
-        excluded_folders = {Path(folder).resolve() for folder in excluded_folders}
+        matcher = ExclusionMatcher(excluded_folders or ())
     
     # Check if the source directory itself is excluded
-    if source_path in excluded_folders:
+    root_state = matcher.start(source_path)
+    if root_state is None:
         return
-    
-    for root, dirs, files in os.walk(source_path):
-        root_path = Path(root).resolve()
-        
-        # Filtrar subdirectorios excluidos ANTES de que os.walk los procese
-        # Modificamos dirs in-place para que os.walk no entre en ellos
-        dirs_to_remove = []
-        for dir_name in dirs:
-            dir_path = (root_path / dir_name).resolve()
-            # Verificar si este directorio o algún padre está en la lista de excluidos
-            if dir_path in excluded_folders or any(dir_path == excluded or dir_path.is_relative_to(excluded) for excluded in excluded_folders):
-                dirs_to_remove.append(dir_name)
-        
-        for dir_name in dirs_to_remove:
-            dirs.remove(dir_name)
-        
-        # Set de nombres de archivo (minusculas) en el directorio actual para búsqueda rápida
-        # Guardamos el nombre real para poder reconstruir el path con el casing correcto
-        file_map = {f.lower(): f for f in files}
-        
-        for filename in files:
-            file_path = root_path / filename
-            
-            # Verificar que el archivo existe (evitar archivos "fantasma")
-            if not file_path.exists():
-                continue
+
+    try:
+        root_stat = os.stat(source_path)
+    except OSError:
+        # Origen inexistente o inaccesible: nada que escanear (como os.walk)
+        return
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+
+    if snapshot is None:
+        lister = _list_directory
+    else:
+        lister = functools.partial(snapshot.list_directory, full_rescan=full_rescan)
+
+    if workers > 1:
+        yield from _scan_parallel(source_path, root_state, matcher, visited, workers, lister, snapshot)
+    else:
+        # Pila de directorios pendientes; se apilan en orden inverso para recorrer como os.walk
+        pending = [(source_path, root_state)]
+        while pending:
+            root_path, state = pending.pop()
+            files, subdirs, fresh = lister(root_path)
+
+            yield from _fresh_groups(root_path, files, fresh)
+            if snapshot is not None:
+                snapshot.confirm(root_path)
+
+            pending.extend(reversed(_accept_subdirs(root_path, state, subdirs, matcher, visited)))
+
+    if snapshot is not None:
+        # Recorrido completo: olvidar las carpetas que ya no existen
+        snapshot.prune(source_path)
+        snapshot.commit()
+
+def _scan_parallel(source_path: Path, root_state, matcher: ExclusionMatcher, visited: set,
+                   workers: int, lister, snapshot: Optional[DirectorySnapshot]) -> Generator[MediaGroup, None, None]:
+    """
+    Variante concurrente: los listados se reparten entre `workers` hilos desde una cola de trabajo
+    y cada directorio se agrupa y se emite en cuanto termina su listado. Las subcarpetas se
+    encolan antes de emitir, así los hilos siguen listando mientras el consumidor procesa.
+    La poda de exclusiones y el control de visitados se hacen en este hilo (sin locks).
+    """
+    done: "queue.Queue" = queue.Queue()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ordenafotos-scan")
+    outstanding = 0
+
+    def submit(path: Path, state):
+        nonlocal outstanding
+        future = pool.submit(lister, path)
+        future.add_done_callback(lambda f, path=path, state=state: done.put((path, state, f)))
+        outstanding += 1
+
+    try:
+        submit(source_path, root_state)
+        while outstanding:
+            root_path, state, future = done.get()
+            outstanding -= 1
+            files, subdirs, fresh = future.result()
+            for dir_path, dir_state in _accept_subdirs(root_path, state, subdirs, matcher, visited):
+                submit(dir_path, dir_state)
+            yield from _fresh_groups(root_path, files, fresh)
+            if snapshot is not None:
+                snapshot.confirm(root_path)
+    finally:
+        # Si el consumidor deja de iterar, no seguir listando
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _accept_subdirs(root_path: Path, state, subdirs: List[Tuple[str, tuple]], matcher: ExclusionMatcher,
+                    visited: set) -> List[Tuple[Path, object]]:
+    """Filtra las subcarpetas excluidas o ya visitadas. Retorna [(ruta, estado del matcher)]."""
+    accepted = []
+    for dir_name, key in subdirs:
+        # Cada subcarpeta se comprueba avanzando un componente desde el estado del padre
+        dir_state = matcher.descend(state, dir_name)
+        if dir_state is None:
+            continue
+        if key[1] and key in visited:
+            continue
+        visited.add(key)
+        accepted.append((root_path / dir_name, dir_state))
+    return accepted
+
+def _fresh_groups(root_path: Path, files: List[str], fresh: Optional[Set[str]]) -> Generator[MediaGroup, None, None]:
+    """Grupos de la carpeta; con `fresh` (escaneo incremental) solo los que tienen algún archivo nuevo o modificado."""
+    if fresh is None:
+        yield from group_directory(root_path, files)
+    elif fresh:
+        for group in group_directory(root_path, files):
+            if group.main_file.name in fresh or any(s.name in fresh for s in group.sidecars):
+                yield group
+
+def _list_directory(root_path: Path) -> Tuple[List[str], List[Tuple[str, tuple]], None]:
+    """
+    Lista un directorio con una sola llamada a scandir.
+    Retorna (archivos, [(subcarpeta, (dev, inodo))], None); el None indica que todos los archivos cuentan.
+    Solo se hace stat de los subdirectorios (para el control de bucles) y de los enlaces
+    simbólicos (para descartar los rotos); los archivos normales no cuestan ninguna llamada.
+    """
+    files: List[str] = []
+    subdirs: List[Tuple[str, tuple]] = []
+    try:
+        with os.scandir(root_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_symlink():
+                        # Enlace a archivo: se incluye solo si el destino existe. A carpeta: no se sigue.
+                        if not entry.is_dir():
+                            entry.stat()
+                            files.append(entry.name)
+                    elif entry.is_dir():
+                        st = entry.stat(follow_symlinks=False)
+                        subdirs.append((entry.name, (st.st_dev, st.st_ino)))
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    # Archivo "fantasma" o enlace roto
+                    continue
+    except OSError:
+        # Sin permisos o directorio desaparecido: se ignora como hacía os.walk
+        pass
+    return files, subdirs, None
+
+def group_directory(root_path: Path, files: List[str]) -> Generator[MediaGroup, None, None]:
+    """
+    Agrupa los archivos de un mismo directorio: cada archivo multimedia con sus sidecars.
+    Solo trabaja con los nombres ya listados, sin tocar el disco.
+    """
+    # Set de nombres de archivo (minusculas) en el directorio actual para búsqueda rápida
+    # Guardamos el nombre real para poder reconstruir el path con el casing correcto
+    file_map = {f.lower(): f for f in files}
+
+    for filename in files:
+        stem, suffix = os.path.splitext(filename)
+
+        # Solo procesamos si es una extensión multimedia válida (Main File)
+        if suffix.lower() in ALL_MEDIA_EXTENSIONS:
+            media_group = MediaGroup(root_path / filename)
             
-            suffix = file_path.suffix.lower()
+            # Buscar posibles sidecars asociados a este archivo
+            # Nota: A veces el sidecar es nombrefichero.ext.xmp o nombrefichero.xmp
+            # Probamos ambas posibilidades para cada extensión de sidecar
+            for sidecar_ext in SIDECAR_EXTENSIONS:
+                possible_sidecar_names = [
+                    f"{stem}{sidecar_ext}".lower(),
+                    f"{filename}{sidecar_ext}".lower()
+                ]
+
+                for candidate_name_lower in possible_sidecar_names:
+                    if candidate_name_lower in file_map:
+                        media_group.add_sidecar(root_path / file_map[candidate_name_lower])
             
-            # Solo procesamos si es una extensión multimedia válida (Main File)
-            if suffix in ALL_MEDIA_EXTENSIONS:
-                media_group = MediaGroup(file_path)
-                
-                # Buscar posibles sidecars asociados a este archivo
-                # Nota: A veces el sidecar es nombrefichero.ext.xmp o nombrefichero.xmp
-                # Probamos ambas posibilidades para cada extensión de sidecar
-                for sidecar_ext in SIDECAR_EXTENSIONS:
-                    possible_sidecar_names = [
-                        f"{file_path.stem}{sidecar_ext}".lower(),
-                        f"{file_path.name}{sidecar_ext}".lower()
-                    ]
-
-                    for candidate_name_lower in possible_sidecar_names:
-                        if candidate_name_lower in file_map:
-                            real_sidecar_name = file_map[candidate_name_lower]
-                            sidecar_path = root_path / real_sidecar_name
-                            if sidecar_path.exists():
-                                media_group.add_sidecar(sidecar_path)
-                
-                yield media_group
+            yield media_group
 
 def get_media_type(file_path: Path) -> str:
     """
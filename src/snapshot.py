@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from .cache import _SQLiteStore
+
+# Instantáneas de carpetas de origen (una base de datos por origen)
+DEFAULT_SNAPSHOT_DIR = Path.home() / ".ordenafotos" / "snapshots"
+
+# Una carpeta modificada hace menos de esto puede cambiar otra vez sin que cambie su mtime
+# (resolución del reloj del sistema de archivos): no se da por estable y se relista la próxima vez.
+_MTIME_GRACE_NS = 2_000_000_000
+_UNSTABLE = -1
+
+
+class DirectorySnapshot(_SQLiteStore):
+    """
+    Diario de escaneos: por cada carpeta guarda su mtime, sus archivos (tamaño, mtime) y sus
+    subcarpetas. En el siguiente escaneo una carpeta con el mismo mtime no se lista: solo se
+    hace stat de ella para comprobarlo y se pasa a sus subcarpetas conocidas (el mtime de una
+    carpeta no cambia cuando cambia algo más abajo). Solo se emiten archivos nuevos o modificados.
+
+    Los cambios de una carpeta se guardan con `confirm` cuando ya se emitieron todos sus grupos;
+    si el escaneo se interrumpe antes, la carpeta se vuelve a listar en la próxima ejecución.
+
+    Limitación: un archivo reescrito en su sitio sin cambiar el contenido de su carpeta no se
+    detecta; para eso está el reescaneo completo (`full_rescan`).
+    """
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS dirs ("
+        " path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,"
+        " files TEXT NOT NULL, subdirs TEXT NOT NULL)"
+    )
+
+    def __init__(self, db_path: Path):
+        super().__init__(db_path)
+        self._seen: Set[str] = set()
+        # Listados pendientes de confirmar: ruta -> (mtime_ns, archivos, subcarpetas)
+        self._unconfirmed = {}
+        # Archivos que deben volver a emitirse aunque su carpeta se confirme después
+        self._forgotten: Set[str] = set()
+
+    @classmethod
+    def for_source(cls, source_dir: Path) -> "DirectorySnapshot":
+        """Abre (o crea) la instantánea de un origen en ~/.ordenafotos/snapshots."""
+        DEFAULT_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+        key = hashlib.sha1(str(Path(source_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+        return cls(DEFAULT_SNAPSHOT_DIR / f"{key}.db")
+
+    def list_directory(self, root_path: Path, full_rescan: bool = False
+                       ) -> Tuple[List[str], List[Tuple[str, tuple]], Optional[Set[str]]]:
+        """
+        Igual que el listado del escáner (archivos, [(subcarpeta, (dev, inodo))]) más el conjunto
+        de archivos nuevos o modificados desde la última vez. Con `full_rescan` se relista todo
+        y el tercer elemento es None (todos cuentan como nuevos).
+        """
+        key = str(root_path)
+        try:
+            st = os.stat(root_path)
+        except OSError:
+            return [], [], set()
+        self._seen.add(key)
+
+        with self._lock:
+            row = self._conn.execute("SELECT mtime_ns, files, subdirs FROM dirs WHERE path=?", (key,)).fetchone()
+
+        if row is not None and not full_rescan and row[0] == st.st_mtime_ns:
+            self.hits += 1
+            files = json.loads(row[1])
+            subdirs = [(name, (dev, ino)) for name, dev, ino in json.loads(row[2])]
+            return list(files), subdirs, set()
+
+        self.misses += 1
+        previous = json.loads(row[1]) if row is not None else {}
+        files, subdirs = _list_with_stats(root_path)
+
+        fresh = {name for name, info in files.items() if previous.get(name) != info}
+        mtime_ns = st.st_mtime_ns if time.time_ns() - st.st_mtime_ns > _MTIME_GRACE_NS else _UNSTABLE
+        with self._lock:
+            self._unconfirmed[key] = (mtime_ns, files, subdirs)
+        return list(files), subdirs, None if full_rescan else fresh
+
+    def confirm(self, root_path: Path):
+        """Guarda el listado de `root_path` una vez emitidos todos sus grupos."""
+        key = str(root_path)
+        with self._lock:
+            pending = self._unconfirmed.pop(key, None)
+            if pending is None:
+                return
+            mtime_ns, files, subdirs = pending
+            for name in list(files):
+                if os.path.join(key, name) in self._forgotten:
+                    del files[name]
+                    mtime_ns = _UNSTABLE
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?)",
+                (key, mtime_ns, json.dumps(files), json.dumps([[name, dev, ino] for name, (dev, ino) in subdirs])),
+            )
+            self._written()
+
+    def forget(self, file_path: Path):
+        """
+        Hace que `file_path` vuelva a emitirse en el próximo escaneo (p. ej. si no se pudo mover):
+        se quita de su carpeta y la carpeta se marca para relistar.
+        """
+        key = str(Path(file_path).parent)
+        with self._lock:
+            self._forgotten.add(str(file_path))
+            row = self._conn.execute("SELECT files FROM dirs WHERE path=?", (key,)).fetchone()
+            if row is None:
+                return
+            files = json.loads(row[0])
+            files.pop(Path(file_path).name, None)
+            self._conn.execute("UPDATE dirs SET mtime_ns=?, files=? WHERE path=?", (_UNSTABLE, json.dumps(files), key))
+            self._written()
+
+    def prune(self, root_path: Path) -> int:
+        """
+        Elimina las carpetas bajo `root_path` que no se visitaron en el último escaneo completo
+        del árbol (borradas o excluidas). Retorna el número de filas eliminadas.
+        """
+        prefix = str(root_path)
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM dirs").fetchall()
+            stale = [(path,) for (path,) in rows
+                     if path not in self._seen and (path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep))]
+            self._conn.executemany("DELETE FROM dirs WHERE path=?", stale)
+            self._conn.commit()
+            self._pending = 0
+        self._seen.clear()
+        self._forgotten.clear()
+        return len(stale)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+
+
+def _list_with_stats(root_path: Path):
+    """Lista una carpeta con tamaño y mtime de cada archivo: {nombre: [tamaño, mtime_ns]}, subcarpetas."""
+    files = {}
+    subdirs = []
+    try:
+        with os.scandir(root_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        # Los enlaces a carpetas no se siguen (igual que el escáner)
+                        if not entry.is_symlink():
+                            st = entry.stat(follow_symlinks=False)
+                            subdirs.append((entry.name, (st.st_dev, st.st_ino)))
+                    else:
+                        st = entry.stat()
+                        files[entry.name] = [st.st_size, st.st_mtime_ns]
+                except OSError:
+                    # Archivo "fantasma" o enlace roto
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
@@ -0,0 +1,298 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Generator, List, Optional, Set, Tuple, Union
+
+from .exclusions import ExclusionMatcher
+from .scanner import (ALL_MEDIA_EXTENSIONS, SIDECAR_EXTENSIONS, MediaGroup, group_directory,
+                      scan_directory)
+from .snapshot import DirectorySnapshot
+
+# Modo vigilancia: detecta archivos nuevos en el origen, espera a que dejen de crecer y los
+# entrega agrupados por lotes. Con inotify (Linux) el kernel avisa de los cambios; en otros
+# sistemas, o si inotify no está disponible, se sondea el árbol cada `poll_interval` segundos.
+
+DEFAULT_DEBOUNCE = 2.0       # Segundos sin eventos nuevos antes de cerrar un lote
+DEFAULT_SETTLE = 2.0         # Segundos que un archivo debe mantener tamaño y mtime
+DEFAULT_MAX_LATENCY = 30.0   # Un volcado largo se entrega por tramos aunque no haya silencio
+DEFAULT_POLL_INTERVAL = 5.0
+
+_WATCHED_EXTENSIONS = ALL_MEDIA_EXTENSIONS | SIDECAR_EXTENSIONS
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifySource:
+    """Vigilancia recursiva con inotify (vía ctypes, sin dependencias)."""
+
+    def __init__(self, root: Path, matcher: ExclusionMatcher):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        self.root = root
+        self.matcher = matcher
+        # wd -> (carpeta, estado del matcher)
+        self._watches: Dict[int, Tuple[Path, object]] = {}
+
+    def add_tree(self, folder: Path, state) -> List[Path]:
+        """Vigila `folder` y sus subcarpetas. Retorna los archivos ya presentes (pudieron llegar antes del watch)."""
+        found = []
+        pending = [(folder, state)]
+        while pending:
+            current, current_state = pending.pop()
+            wd = self._add_watch(self._fd, os.fsencode(current), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == 28:  # ENOSPC: límite fs.inotify.max_user_watches
+                    raise OSError(err, "Límite de watches de inotify alcanzado")
+                continue
+            self._watches[wd] = (current, current_state)
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            child_state = self.matcher.descend(current_state, entry.name)
+                            if child_state is not None:
+                                pending.append((Path(entry.path), child_state))
+                        else:
+                            found.append(Path(entry.path))
+            except OSError:
+                continue
+        return found
+
+    def read(self, timeout: float) -> Tuple[List[Path], bool]:
+        """Espera eventos hasta `timeout`. Retorna (archivos tocados, hubo desbordamiento)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return [], False
+
+        changed: List[Path] = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                watched = self._watches.get(wd)
+                if watched is None or not name:
+                    continue
+                folder, state = watched
+                path = folder / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        child_state = self.matcher.descend(state, path.name)
+                        if child_state is not None:
+                            changed.extend(self.add_tree(path, child_state))
+                else:
+                    changed.append(path)
+        return changed, overflow
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingSource:
+    """
+    Alternativa sin inotify: cada `poll_interval` segundos se recorre el origen con una instantánea
+    en memoria, así solo se relistan las carpetas cuyo mtime cambió.
+    """
+
+    def __init__(self, root: Path, matcher: ExclusionMatcher, poll_interval: float):
+        self.root = root
+        self.matcher = matcher
+        self.poll_interval = poll_interval
+        self._snapshot = DirectorySnapshot(Path(":memory:"))
+        self._next_poll = 0.0
+        # Primera pasada: registrar el estado actual sin emitir nada
+        for _ in scan_directory(root, matcher, snapshot=self._snapshot):
+            pass
+
+    def read(self, timeout: float) -> Tuple[List[Path], bool]:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return [], False
+        time.sleep(max(0.0, wait))
+        self._next_poll = time.monotonic() + self.poll_interval
+
+        changed: List[Path] = []
+        for group in scan_directory(self.root, self.matcher, snapshot=self._snapshot):
+            changed.append(group.main_file)
+            changed.extend(group.sidecars)
+        return changed, False
+
+    def close(self):
+        self._snapshot.close()
+
+
+def inotify_available() -> bool:
+    return sys.platform.startswith("linux") and bool(ctypes.util.find_library("c") or os.path.exists("/lib/libc.so.6"))
+
+
+def watch(source_dir: Path, excluded_folders: Union[Set[str], ExclusionMatcher, None] = None,
+          stop_event: Optional[threading.Event] = None, initial_scan: bool = True,
+          debounce: float = DEFAULT_DEBOUNCE, settle: float = DEFAULT_SETTLE,
+          max_latency: float = DEFAULT_MAX_LATENCY, poll_interval: float = DEFAULT_POLL_INTERVAL,
+          use_inotify: Optional[bool] = None) -> Generator[List[MediaGroup], None, None]:
+    """
+    Vigila `source_dir` y entrega lotes de MediaGroup listos para organizar.
+
+    Un archivo está listo cuando mantiene tamaño y mtime durante `settle` segundos. Los eventos
+    se acumulan y el lote se cierra tras `debounce` segundos sin eventos nuevos (o, en volcados
+    largos, cada `max_latency` segundos), así que una tarjeta de miles de fotos llega en pocos lotes.
+    Los grupos se forman con `group_directory`, igual que en un escaneo normal.
+
+    Args:
+        initial_scan: Incluir también lo que ya hay en el origen al empezar.
+        use_inotify: None = automático (inotify en Linux, si no sondeo).
+    """
+    if stop_event is None:
+        stop_event = threading.Event()
+    root = Path(source_dir).resolve()
+    matcher = excluded_folders if isinstance(excluded_folders, ExclusionMatcher) else ExclusionMatcher(excluded_folders or ())
+    root_state = matcher.start(root)
+    if root_state is None:
+        return
+
+    # Primero los watches y después el escaneo inicial: lo que llegue entre medias no se pierde
+    source = None
+    if use_inotify is None:
+        use_inotify = inotify_available()
+    if use_inotify:
+        try:
+            source = _InotifySource(root, matcher)
+            source.add_tree(root, root_state)
+        except (OSError, AttributeError):
+            if source is not None:
+                source.close()
+            source = None
+    if source is None:
+        source = _PollingSource(root, matcher, poll_interval)
+
+    # Archivo pendiente -> (tamaño, mtime_ns, momento en que se observó así)
+    pending: Dict[Path, Tuple[int, int, float]] = {}
+    last_event = first_event = 0.0
+    try:
+        if initial_scan:
+            # Lo que ya hay también pasa por la espera de estabilidad (puede estar copiándose)
+            now = time.monotonic()
+            for group in scan_directory(root, matcher):
+                for path in [group.main_file] + group.sidecars:
+                    pending[path] = (-1, -1, now)
+            if pending:
+                last_event = first_event = now - debounce
+
+        while not stop_event.is_set():
+            timeout = min(debounce, settle) if pending else 0.5
+            changed, overflow = source.read(timeout)
+            now = time.monotonic()
+
+            if overflow:
+                # Se perdieron eventos: tratar todo el árbol como candidato
+                changed = [g.main_file for g in scan_directory(root, matcher)]
+            for path in changed:
+                if path.suffix.lower() in _WATCHED_EXTENSIONS and path not in pending:
+                    pending[path] = (-1, -1, now)
+            if changed:
+                if not first_event:
+                    first_event = now
+                last_event = now
+
+            if not pending:
+                continue
+            if now - last_event < debounce and now - first_event < max_latency:
+                continue
+
+            ready = _settled(pending, now, settle)
+            if ready:
+                batch = _group_ready(ready, pending)
+                first_event = now if pending else 0.0
+                if batch:
+                    yield batch
+    finally:
+        source.close()
+
+
+def _settled(pending: Dict[Path, Tuple[int, int, float]], now: float, settle: float) -> Set[Path]:
+    """Actualiza las observaciones y retorna los archivos cuyo tamaño y mtime no cambian desde hace `settle` s."""
+    ready = set()
+    for path, (size, mtime_ns, since) in list(pending.items()):
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Desapareció (renombrado temporal, borrado): olvidarlo
+            del pending[path]
+            continue
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            pending[path] = (st.st_size, st.st_mtime_ns, now)
+        elif now - since >= settle:
+            ready.add(path)
+    return ready
+
+
+def _group_ready(ready: Set[Path], pending: Dict[Path, Tuple[int, int, float]]) -> List[MediaGroup]:
+    """
+    Agrupa los archivos listos por carpeta con `group_directory`. Un grupo sale solo si su
+    archivo principal y todos sus sidecars están estables; si no, espera al siguiente lote.
+    """
+    by_folder: Dict[Path, List[Path]] = {}
+    for path in ready:
+        by_folder.setdefault(path.parent, []).append(path)
+
+    batch: List[MediaGroup] = []
+    for folder, paths in by_folder.items():
+        try:
+            with os.scandir(folder) as it:
+                names = [entry.name for entry in it if not entry.is_dir()]
+        except OSError:
+            continue
+        ready_names = {p.name for p in paths}
+        for group in group_directory(folder, names):
+            members = [group.main_file] + group.sidecars
+            if group.main_file.name not in ready_names or any(m in pending and m not in ready for m in members):
+                continue
+            batch.append(group)
+            for member in members:
+                pending.pop(member, None)
+
+    # Sidecars sueltos cuyo principal ya se organizó: no forman grupo, no se reintentan
+    for path in ready:
+        if path.suffix.lower() in SIDECAR_EXTENSIONS and path in pending:
+            del pending[path]
+    return batch
@@ -0,0 +1,207 @@
+import unittest
+import os
+import shutil
+import tempfile
+import hashlib
+from pathlib import Path
+from unittest import mock
+from datetime import datetime
+from src.cache import HashCache, DateCache, HASH_CACHE_FILENAME
+from src.date_extractor import get_date_taken, get_date_with_source, SOURCE_CTIME
+from src.integrity import calculate_hash, check_duplicate
+from src.deduplicator import scan_and_move_duplicates
+
+class TestHashCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache = HashCache.for_library(self.test_dir)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.test_dir)
+
+    def create_file(self, name, content: bytes) -> Path:
+        path = self.test_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_cached_hash_does_not_read_file(self):
+        f = self.create_file("a.jpg", b"contenido")
+        expected = hashlib.sha256(b"contenido").hexdigest()
+        self.assertEqual(calculate_hash(f, cache=self.cache), expected)
+
+        # Segunda llamada: no debe abrir el archivo
+        with mock.patch("builtins.open", side_effect=AssertionError("no debería leer")):
+            self.assertEqual(calculate_hash(f, cache=self.cache), expected)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_digests_are_tagged_by_algorithm(self):
+        f = self.create_file("a.jpg", b"contenido")
+        calculate_hash(f, cache=self.cache)
+        # Un digest SHA-256 en caché nunca se devuelve como BLAKE2b
+        self.assertEqual(calculate_hash(f, cache=self.cache, algorithm="blake2b"),
+                         hashlib.blake2b(b"contenido").hexdigest())
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_modified_file_invalidates_entry(self):
+        f = self.create_file("a.jpg", b"v1")
+        calculate_hash(f, cache=self.cache)
+
+        with open(f, "wb") as fh:
+            fh.write(b"v2 distinto")
+        st = f.stat()
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        self.assertEqual(calculate_hash(f, cache=self.cache), hashlib.sha256(b"v2 distinto").hexdigest())
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_prune_removes_missing_files(self):
+        f1 = self.create_file("a.jpg", b"uno")
+        f2 = self.create_file("b.jpg", b"dos")
+        calculate_hash(f1, cache=self.cache)
+        calculate_hash(f2, cache=self.cache)
+        self.assertEqual(len(self.cache), 2)
+
+        os.remove(f1)
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_prune_keeps_files_renamed_by_the_mover(self):
+        from src.mover import move_file
+        f = self.create_file("a.jpg", b"renombrado")
+        calculate_hash(f, cache=self.cache)
+
+        moved = self.test_dir / "2024" / "05" / "a.jpg"
+        moved.parent.mkdir(parents=True)
+        move_file(f, moved, hash_cache=self.cache)
+
+        self.assertEqual(self.cache.prune(), 0)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_prune_keeps_renamed_files_seen_in_the_scan(self):
+        f = self.create_file("a.jpg", b"renombrado fuera")
+        calculate_hash(f, cache=self.cache)
+        renamed = self.test_dir / "b.jpg"
+        os.rename(f, renamed)
+        st = renamed.stat()
+
+        self.assertEqual(self.cache.prune({(st.st_dev, st.st_ino): renamed}), 0)
+        # La ruta se actualizó: sin el escaneo la fila ya no parece obsoleta
+        self.assertEqual(self.cache.prune(), 0)
+        with mock.patch("builtins.open", side_effect=AssertionError("no debería leer")):
+            calculate_hash(renamed, cache=self.cache)
+
+    def test_dedup_pass_keeps_hashes_of_renamed_files(self):
+        a = self.create_file("lib/a.jpg", b"A" * 100)
+        self.create_file("lib/b.jpg", b"B" * 100)
+        for _ in scan_and_move_duplicates(self.test_dir, hash_cache=self.cache):
+            pass
+        os.rename(a, self.test_dir / "lib" / "c.jpg")
+
+        messages = list(scan_and_move_duplicates(self.test_dir, hash_cache=self.cache))
+        self.assertIn("0 entradas obsoletas eliminadas", " ".join(messages))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_persistent_between_sessions(self):
+        f = self.create_file("a.jpg", b"persistente")
+        calculate_hash(f, cache=self.cache)
+        self.cache.close()
+
+        self.cache = HashCache.for_library(self.test_dir)
+        with mock.patch("builtins.open", side_effect=AssertionError("no debería leer")):
+            calculate_hash(f, cache=self.cache)
+
+    def test_check_duplicate_with_cache(self):
+        a = self.create_file("a.jpg", b"igual")
+        b = self.create_file("b.jpg", b"igual")
+        self.assertTrue(check_duplicate(a, b, cache=self.cache))
+        self.assertTrue(check_duplicate(a, b, cache=self.cache))
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_second_dedup_pass_reads_nothing(self):
+        self.create_file("lib/a.jpg", b"A" * 100)
+        self.create_file("lib/b.jpg", b"B" * 100)
+        for _ in scan_and_move_duplicates(self.test_dir, hash_cache=self.cache):
+            pass
+        self.assertEqual(self.cache.misses, 2)
+
+        with mock.patch("builtins.open", side_effect=AssertionError("no debería leer")):
+            for _ in scan_and_move_duplicates(self.test_dir, hash_cache=self.cache):
+                pass
+        self.assertEqual(self.cache.hits, 2)
+        # El propio índice nunca se trata como duplicado ni se mueve
+        self.assertTrue((self.test_dir / HASH_CACHE_FILENAME).exists())
+
+class TestDateCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache = DateCache(self.test_dir / "dates.db")
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.test_dir)
+
+    def create_file(self, name, content: bytes = b"foto") -> Path:
+        path = self.test_dir / name
+        path.write_bytes(content)
+        return path
+
+    def test_second_lookup_does_not_parse(self):
+        f = self.create_file("a.jpg")
+        date, source = get_date_with_source(f, cache=self.cache)
+        self.assertEqual(source, SOURCE_CTIME)
+
+        with mock.patch("src.date_extractor._resolve_date", side_effect=AssertionError("no debería parsear")):
+            self.assertEqual(get_date_with_source(f, cache=self.cache), (date, source))
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_modified_file_is_parsed_again(self):
+        f = self.create_file("a.jpg")
+        get_date_taken(f, cache=self.cache)
+        st = f.stat()
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        with mock.patch("src.date_extractor._resolve_date", return_value=(datetime(2001, 1, 1), "exif")) as resolve:
+            self.assertEqual(get_date_taken(f, cache=self.cache), datetime(2001, 1, 1))
+        resolve.assert_called_once()
+
+    def test_lru_eviction_keeps_recent_entries(self):
+        self.cache.close()
+        self.cache = DateCache(self.test_dir / "lru.db", max_entries=10)
+        files = [self.create_file(f"f{i}.jpg") for i in range(10)]
+        for f in files:
+            self.cache.put(f, datetime(2020, 1, 1), "exif")
+
+        # Usar el primero para que sea el más reciente
+        self.assertIsNotNone(self.cache.get(files[0]))
+        self.cache.put(self.create_file("nuevo.jpg"), datetime(2020, 1, 1), "exif")
+
+        self.assertLessEqual(len(self.cache), 10)
+        self.assertIsNotNone(self.cache.get(files[0]))
+        self.assertIsNone(self.cache.get(files[1]))
+
+    def test_invalidate(self):
+        a = self.create_file("a.jpg")
+        b = self.create_file("b.jpg")
+        self.cache.put(a, datetime(2020, 1, 1), "exif")
+        self.cache.put(b, datetime(2020, 1, 1), "exif")
+
+        self.cache.invalidate(a)
+        self.assertIsNone(self.cache.get(a))
+        self.assertIsNotNone(self.cache.get(b))
+
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_persistent_between_sessions(self):
+        f = self.create_file("a.jpg")
+        self.cache.put(f, datetime(2015, 6, 7, 8, 9, 10), "video")
+        self.cache.close()
+
+        self.cache = DateCache(self.test_dir / "dates.db")
+        self.assertEqual(self.cache.get(f), (datetime(2015, 6, 7, 8, 9, 10), "video"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from src.checkpoint import Checkpoint
+from src.mover import STATUS_ERROR, STATUS_SKIPPED, OperationResult
+from src.date_extractor import get_date_taken
+from src.pipeline import organize_pipeline
+from src.scanner import scan_directory
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        self.src = self.root / "src"
+        self.dst = self.root / "dst"
+        for i in range(6):
+            path = self.src / f"card{i % 2}" / f"IMG_{i}.jpg"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(f"foto {i}".encode())
+        self.path = self.root / "run.jsonl"
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def groups(self):
+        return {g.main_file.name: g for g in scan_directory(self.src)}
+
+    def test_records_survive_and_unchanged_groups_are_skipped(self):
+        groups = self.groups()
+        checkpoint = Checkpoint(self.path, self.src, self.dst)
+        checkpoint.record(groups["IMG_0.jpg"], OperationResult(STATUS_SKIPPED, "omitido"))
+        checkpoint.close()
+
+        resumed = Checkpoint(self.path)
+        self.assertEqual(resumed.resumed, 1)
+        self.assertTrue(resumed.is_done(groups["IMG_0.jpg"]))
+        self.assertFalse(resumed.is_done(groups["IMG_1.jpg"]))
+
+        # Si el archivo cambió, se vuelve a procesar
+        groups["IMG_0.jpg"].main_file.write_bytes(b"otro contenido")
+        self.assertFalse(resumed.is_done(groups["IMG_0.jpg"]))
+        resumed.close()
+
+    def test_torn_last_line_is_ignored(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.record(self.groups()["IMG_0.jpg"], OperationResult(STATUS_SKIPPED, "omitido"))
+        checkpoint.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"type": "done", "file": "/x/IMG')
+
+        checkpoint = Checkpoint(self.path)
+        self.assertEqual(checkpoint.resumed, 1)
+        checkpoint.close()
+
+    def test_complete_removes_the_file(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.complete()
+        self.assertFalse(self.path.exists())
+
+    def test_interrupted_run_resumes_without_reextracting_dates(self):
+        # Primera ejecución: todo se omite (duplicados ya presentes) salvo un error
+        def skip_all(media_group, *args, **kwargs):
+            if media_group.main_file.name == "IMG_5.jpg":
+                return OperationResult(STATUS_ERROR, "USB desconectado")
+            return OperationResult(STATUS_SKIPPED, "omitido")
+
+        checkpoint = Checkpoint(self.path)
+        with mock.patch("src.pipeline.move_media_safe", side_effect=skip_all):
+            list(organize_pipeline(self.src, self.dst, checkpoint=checkpoint))
+        checkpoint.close()
+
+        records = [json.loads(line) for line in self.path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(sum(r["type"] == "done" for r in records), 5)
+        self.assertEqual({r["status"] for r in records if r["type"] == "done"}, {STATUS_SKIPPED})
+
+        # Segunda ejecución: solo el grupo que falló vuelve a pasar por fechas y movimiento
+        checkpoint = Checkpoint(self.path)
+        with mock.patch("src.pipeline.get_date_taken", wraps=get_date_taken) as dates:
+            results = list(organize_pipeline(self.src, self.dst, checkpoint=checkpoint))
+        checkpoint.complete()
+
+        self.assertEqual([g.main_file.name for g, _ in results], ["IMG_5.jpg"])
+        self.assertEqual(dates.call_count, 1)
+        self.assertEqual(checkpoint.skipped, 5)
+
+    def test_write_failure_disables_checkpoint_but_files_keep_moving(self):
+        checkpoint = Checkpoint(self.path)
+        with mock.patch.object(checkpoint, "_write", side_effect=OSError(28, "No space left on device")) as write:
+            results = list(organize_pipeline(self.src, self.dst, mover_workers=1, checkpoint=checkpoint))
+        checkpoint.close()
+
+        self.assertEqual(len(results), 6)
+        self.assertFalse(any(result.status == STATUS_ERROR for _, result in results))
+        self.assertEqual(len(list(self.dst.rglob("*.jpg"))), 6)
+        self.assertIn("No space left", checkpoint.error)
+        # Tras el primer fallo no se vuelve a intentar escribir
+        self.assertEqual(write.call_count, 1)
+
+    def test_dry_run_does_not_record(self):
+        checkpoint = Checkpoint(self.path)
+        list(organize_pipeline(self.src, self.dst, dry_run=True, checkpoint=checkpoint))
+        checkpoint.close()
+        self.assertEqual(Checkpoint(self.path).resumed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
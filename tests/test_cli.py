@@ -0,0 +1,216 @@
+import unittest
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+from src import cli
+from src.mover import STATUS_SUCCESS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        self.src = self.root / "src"
+        self.dst = self.root / "dst"
+        for i in range(3):
+            path = self.src / f"card{i}" / f"IMG_{i}.jpg"
+            path.parent.mkdir(parents=True)
+            path.write_bytes(f"foto {i}".encode())
+        # Los puntos de control de la CLI van a la carpeta temporal, no a ~/.ordenafotos
+        patcher = mock.patch("src.checkpoint.DEFAULT_CHECKPOINT_DIR", self.root / "checkpoints")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = cli.main([str(a) for a in argv] + ["--no-cache"] * (argv[0] not in ("clean", "undo")))
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_organize_emits_json_lines(self):
+        code, events = self.run_cli("organize", self.src, self.dst)
+
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual(events[0]["event"], "start")
+        self.assertEqual([e["status"] for e in events if e["event"] == "file"], [STATUS_SUCCESS] * 3)
+        summary = events[-1]
+        self.assertEqual((summary["event"], summary["processed"], summary["errors"]), ("summary", 3, 0))
+        self.assertEqual(len(list(self.dst.rglob("*.jpg"))), 3)
+        copy = [e for e in events if e["event"] == "progress" and e["stage"] == "copy"][-1]
+        self.assertEqual((copy["files_done"], copy["files_total"], copy["finished"]), (3, 3, True))
+        # Las carpetas vacías del origen se limpian al terminar
+        self.assertEqual(list(self.src.iterdir()), [])
+
+    def test_watch_lists_the_destination_again_for_each_batch(self):
+        from src.dest_index import DestinationIndex
+        from src.scanner import MediaGroup
+        first, second = sorted(self.src.rglob("*.jpg"))[:2]
+
+        def batches(*args, **kwargs):
+            yield [MediaGroup(first)]
+            # Entre lotes otro proceso deja en el destino un archivo con el nombre del siguiente
+            landed = next(self.dst.rglob(first.name))
+            (landed.parent / second.name).write_bytes(b"de otro proceso")
+            yield [MediaGroup(second)]
+
+        with mock.patch("src.watcher.watch", batches), \
+             mock.patch.object(DestinationIndex, "refresh", autospec=True) as refresh:
+            code, events = self.run_cli("organize", self.src, self.dst, "--watch")
+
+        self.assertEqual(code, cli.EXIT_OK)
+        destinations = [Path(e["destination"]).name for e in events if e["event"] == "file"]
+        self.assertEqual(destinations, [first.name, second.stem + "_dup_1.jpg"])
+        # El segundo lote ya vio el archivo ajeno al listar: no hizo falta reintentar
+        refresh.assert_not_called()
+
+    def test_metrics_summary(self):
+        code, events = self.run_cli("organize", self.src, self.dst, "--metrics", self.root / "run.prom")
+        self.assertEqual(code, cli.EXIT_OK)
+        stages = [e for e in events if e["event"] == "metrics"][0]["stages"]
+        self.assertEqual(stages["copy"]["count"], 3)
+        self.assertIn("ordenafotos_stage_seconds_count", (self.root / "run.prom").read_text())
+
+    def test_profile_files_next_to_the_journal(self):
+        journal = self.dst / "operaciones_prueba.jsonl"
+        self.dst.mkdir()
+        code, events = self.run_cli("organize", self.src, self.dst, "--journal", journal, "--profile")
+        self.assertEqual(code, cli.EXIT_OK)
+        files = [Path(path) for path in [e for e in events if e["event"] == "profile"][0]["files"]]
+        self.assertIn(self.dst / "perfil_prueba.pstats", files)
+        self.assertTrue(all(path.exists() for path in files))
+
+    def test_dedupe_profile_stays_outside_the_library(self):
+        library = self.src / "card0"
+        with mock.patch("src.profiling.DEFAULT_PROFILE_DIR", self.root / "perfiles"):
+            code, events = self.run_cli("dedupe", library, "--profile")
+        self.assertEqual(code, cli.EXIT_OK)
+        files = [Path(path) for path in [e for e in events if e["event"] == "profile"][0]["files"]]
+        self.assertTrue(files)
+        self.assertTrue(all(path.parent == self.root / "perfiles" and path.exists() for path in files))
+        self.assertEqual([path.name for path in library.iterdir()], ["IMG_0.jpg"])
+
+    def test_dry_run_moves_nothing(self):
+        code, events = self.run_cli("organize", self.src, self.dst, "--dry-run")
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))), 3)
+        self.assertFalse(self.dst.exists())
+
+    def test_failed_files_exit_with_errors(self):
+        from src.mover import OperationResult, STATUS_ERROR
+        with mock.patch("src.pipeline.move_media_safe", return_value=OperationResult(STATUS_ERROR, "fallo")):
+            code, events = self.run_cli("organize", self.src, self.dst)
+        self.assertEqual(code, cli.EXIT_ERRORS)
+        self.assertEqual(events[-1]["errors"], 3)
+
+    def test_interrupted_run_resumes(self):
+        from src.mover import OperationResult, STATUS_SKIPPED
+        with mock.patch("src.pipeline.move_media_safe", return_value=OperationResult(STATUS_SKIPPED, "omitido")), \
+                mock.patch("src.checkpoint.Checkpoint.complete"):
+            self.run_cli("organize", self.src, self.dst)
+
+        code, events = self.run_cli("organize", self.src, self.dst)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual([e["completed"] for e in events if e["event"] == "resume"], [3])
+        self.assertEqual((events[-1]["processed"], events[-1]["resumed_skipped"]), (0, 3))
+        self.assertEqual(list((self.root / "checkpoints").iterdir()), [])
+
+    def test_undo_restores_the_run(self):
+        journal = self.root / "run.jsonl"
+        self.run_cli("organize", self.src, self.dst, "--journal", journal, "--no-clean")
+        self.assertEqual(len(list(self.dst.rglob("*.jpg"))), 3)
+
+        code, events = self.run_cli("undo", journal)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual((events[-1]["restored"], events[-1]["skipped"]), (3, 0))
+        self.assertEqual(sorted(p.name for p in self.src.rglob("*.jpg")), ["IMG_0.jpg", "IMG_1.jpg", "IMG_2.jpg"])
+        self.assertEqual(list(self.dst.rglob("*.jpg")), [])
+
+    def test_missing_source_is_a_usage_error(self):
+        code, events = self.run_cli("organize", self.root / "nope", self.dst)
+        self.assertEqual(code, cli.EXIT_USAGE)
+        self.assertEqual(events[-1]["event"], "error")
+
+    def test_dedupe_and_clean(self):
+        (self.src / "card0" / "copia.jpg").write_bytes(b"foto 0")
+        (self.src / "vacia" / "sub").mkdir(parents=True)
+
+        code, events = self.run_cli("dedupe", self.src)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertEqual(len(list((self.src / "_DUPLICADOS").iterdir())), 1)
+
+        code, events = self.run_cli("clean", self.src)
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertFalse((self.src / "vacia").exists())
+
+    def test_dedupe_move_failure_exits_with_errors(self):
+        (self.src / "card0" / "copia.jpg").write_bytes(b"foto 0")
+        with mock.patch("src.deduplicator.shutil.move", side_effect=PermissionError("solo lectura")):
+            code, events = self.run_cli("dedupe", self.src)
+        self.assertEqual(code, cli.EXIT_ERRORS)
+        self.assertEqual(events[-1]["errors"], 1)
+
+    def test_unexpected_exception_is_a_crash(self):
+        with mock.patch("src.pipeline.organize_pipeline", side_effect=RuntimeError("roto")), \
+                mock.patch("sys.stderr", io.StringIO()) as stderr:
+            code, events = self.run_cli("organize", self.src, self.dst)
+        self.assertEqual(code, cli.EXIT_CRASH)
+        self.assertNotEqual(cli.EXIT_CRASH, cli.EXIT_ERRORS)
+        self.assertEqual((events[-1]["event"], events[-1]["message"], events[-1]["type"]),
+                         ("error", "roto", "RuntimeError"))
+        self.assertIn("Traceback", stderr.getvalue())
+
+    def test_worker_defaults_come_from_the_engine(self):
+        from src.pipeline import DEFAULT_DATE_WORKERS, DEFAULT_MOVER_WORKERS
+        from src.scanner import DEFAULT_SCAN_WORKERS
+        with mock.patch("src.pipeline.organize_pipeline", return_value=iter(())) as pipeline:
+            self.run_cli("organize", self.src, self.dst, "--dry-run", "--date-workers", "7")
+        options = pipeline.call_args.kwargs
+        self.assertEqual((options["scan_workers"], options["date_workers"], options["mover_workers"]),
+                         (DEFAULT_SCAN_WORKERS, 7, DEFAULT_MOVER_WORKERS))
+        self.assertNotEqual(DEFAULT_DATE_WORKERS, 7)
+
+        from src.hash_engine import DEFAULT_HASH_WORKERS
+        with mock.patch("src.deduplicator.scan_and_move_duplicates", return_value=iter(())) as dedupe:
+            self.run_cli("dedupe", self.src)
+        self.assertEqual(dedupe.call_args.kwargs["hash_workers"], DEFAULT_HASH_WORKERS)
+
+
+class TestCliStartup(unittest.TestCase):
+    """El arranque no debe cargar la GUI, Pillow ni exifread."""
+
+    HEAVY = ("PIL", "exifread", "tkinter", "ttkbootstrap", "src.pipeline", "src.deduplicator")
+
+    def test_import_does_not_load_heavy_modules(self):
+        code = ("import sys, src.cli; "
+                f"print([m for m in {self.HEAVY!r} if m in sys.modules])")
+        out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.strip(), "[]")
+
+    def test_import_time(self):
+        # -X importtime: tiempo acumulado de importar src.cli (en microsegundos)
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.cli"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True)
+        cumulative = [int(line.split("|")[1]) for line in proc.stderr.splitlines()
+                      if line.rstrip().endswith("| src.cli")]
+        self.assertEqual(len(cumulative), 1)
+        self.assertLess(cumulative[0], 200_000)
+
+    def test_help_exits_cleanly(self):
+        proc = subprocess.run([sys.executable, "ordenafotos_cli.py", "--help"], cwd=REPO_ROOT,
+                              capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0)
+        self.assertIn("organize", proc.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import errno
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from unittest import mock
+from src.copier import (copy_file, CopyVerificationError, METHOD_VERIFIED, METHOD_COPY_FILE_RANGE,
+                        METHOD_SENDFILE, METHOD_USERSPACE)
+
+class TestCopier(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.source = self.test_dir / "origen.jpg"
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        self.source.write_bytes(self.data)
+        st = self.source.stat()
+        os.utime(self.source, ns=(st.st_atime_ns, 1_500_000_000_000_000_000))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_verified_copy_hashes_while_copying(self):
+        dest = self.test_dir / "destino.jpg"
+        result = copy_file(self.source, dest)
+
+        self.assertEqual(result.method, METHOD_VERIFIED)
+        self.assertEqual(result.digest, hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(result.size, len(self.data))
+        self.assertEqual(dest.read_bytes(), self.data)
+        # Metadatos preservados como en shutil.copy2
+        self.assertEqual(dest.stat().st_mtime_ns, self.source.stat().st_mtime_ns)
+        self.assertGreater(result.mb_per_s, 0)
+
+    def test_corrupted_destination_is_removed(self):
+        dest = self.test_dir / "destino.jpg"
+        with mock.patch("src.copier.calculate_hash", return_value="0" * 64):
+            with self.assertRaises(CopyVerificationError):
+                copy_file(self.source, dest)
+        self.assertFalse(dest.exists())
+        self.assertTrue(self.source.exists())
+
+    def test_unverified_copy_uses_kernel(self):
+        dest = self.test_dir / "destino.jpg"
+        result = copy_file(self.source, dest, verify=False)
+
+        self.assertIn(result.method, (METHOD_COPY_FILE_RANGE, METHOD_SENDFILE, METHOD_USERSPACE))
+        self.assertIsNone(result.digest)
+        self.assertEqual(dest.read_bytes(), self.data)
+
+    def test_unsupported_kernel_copy_falls_back(self):
+        dest = self.test_dir / "destino.jpg"
+        unsupported = OSError(errno.EXDEV, "cross-device")
+        with mock.patch("src.copier.os.copy_file_range", side_effect=unsupported, create=True), \
+             mock.patch("src.copier.os.sendfile", side_effect=unsupported, create=True):
+            result = copy_file(self.source, dest, verify=False)
+
+        self.assertEqual(result.method, METHOD_USERSPACE)
+        self.assertEqual(dest.read_bytes(), self.data)
+
+    def test_failed_write_leaves_no_partial_destination(self):
+        def disk_full(src, dst, *args):
+            dst.write(self.data[:1024])
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+        for verify, copy in ((True, "_copy_hashing"), (False, "_copy_kernel")):
+            with self.subTest(verify=verify):
+                dest = self.test_dir / "destino.jpg"
+                with mock.patch(f"src.copier.{copy}", side_effect=disk_full):
+                    with self.assertRaises(OSError):
+                        copy_file(self.source, dest, verify=verify)
+                self.assertFalse(dest.exists())
+                # El nombre queda libre: un reintento no acaba en _dup_N
+                copy_file(self.source, dest, verify=verify)
+                self.assertEqual(dest.read_bytes(), self.data)
+                dest.unlink()
+
+    def test_failed_copystat_removes_destination(self):
+        dest = self.test_dir / "destino.jpg"
+        with mock.patch("src.copier.shutil.copystat", side_effect=PermissionError("sin permiso")):
+            with self.assertRaises(PermissionError):
+                copy_file(self.source, dest)
+        self.assertFalse(dest.exists())
+
+    def test_existing_destination_is_never_overwritten(self):
+        dest = self.test_dir / "destino.jpg"
+        dest.write_bytes(b"ya estaba")
+        for verify in (True, False):
+            with self.assertRaises(FileExistsError):
+                copy_file(self.source, dest, verify=verify)
+        self.assertEqual(dest.read_bytes(), b"ya estaba")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,26 @@ class TestCoreFunctions(unittest.TestCase):
         expected_hash = hashlib.sha256(b"content_123").hexdigest()
         self.assertEqual(calculate_hash(self.file_a), expected_hash)
 
+    def test_hash_backends_agree(self):
+        big = self.test_dir / "big.mov"
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(big, "wb") as f:
+            f.write(data)
+
+        for backend in ("readinto", "file_digest", "mmap"):
+            self.assertEqual(calculate_hash(big, backend=backend), hashlib.sha256(data).hexdigest(), backend)
+            self.assertEqual(calculate_hash(big, backend=backend, algorithm="blake2b"),
+                             hashlib.blake2b(data).hexdigest(), backend)
+
+    def test_hash_empty_file_mmap(self):
+        empty = self.test_dir / "empty.jpg"
+        empty.touch()
+        self.assertEqual(calculate_hash(empty, backend="mmap"), hashlib.sha256(b"").hexdigest())
+
+    def test_hash_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            calculate_hash(self.file_a, algorithm="md5")
+
     def test_check_duplicate_true(self):
         self.assertTrue(check_duplicate(self.file_a, self.file_b))
 
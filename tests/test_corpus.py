@@ -0,0 +1,70 @@
+import unittest
+import shutil
+import tempfile
+from pathlib import Path
+from benchmarks.bench_suite import compare, percentile
+from benchmarks.corpus import build_corpus, load_manifest
+from src.date_extractor import SOURCE_EXIF, SOURCE_VIDEO, get_date_with_source
+from src.integrity import calculate_hash
+from src.scanner import scan_directory
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_every_format_carries_its_date(self):
+        corpus = build_corpus(self.root, files=60, dirs=3, duplicate_ratio=0.2, payload_size=4096)
+
+        self.assertGreater(len({entry.path.suffix for entry in corpus}), 5)
+        for entry in corpus:
+            date, source = get_date_with_source(entry.path)
+            self.assertEqual(date, entry.expected_date, entry.path.name)
+            self.assertIn(source, (SOURCE_EXIF, SOURCE_VIDEO))
+
+    def test_duplicates_and_sidecars(self):
+        corpus = build_corpus(self.root, files=80, duplicate_ratio=0.25, sidecar_ratio=0.5, payload_size=4096)
+        duplicates = [entry for entry in corpus if entry.duplicate_of]
+        self.assertTrue(duplicates)
+        for entry in duplicates:
+            self.assertEqual(calculate_hash(entry.path), calculate_hash(entry.duplicate_of))
+        uniques = [entry for entry in corpus if not entry.duplicate_of]
+        self.assertEqual(len({calculate_hash(entry.path) for entry in uniques}), len(uniques))
+
+        groups = {group.main_file: group for group in scan_directory(self.root)}
+        self.assertEqual(len(groups), len(corpus))
+        for entry in corpus:
+            if entry.sidecar:
+                self.assertEqual(groups[entry.path].sidecars, [entry.sidecar])
+
+    def test_same_seed_same_bytes_and_manifest(self):
+        first = build_corpus(self.root / "a", files=20, payload_size=1024, seed=7)
+        second = build_corpus(self.root / "b", files=20, payload_size=1024, seed=7)
+        self.assertEqual([e.path.read_bytes() for e in first], [e.path.read_bytes() for e in second])
+
+        loaded = load_manifest(self.root / "a")
+        self.assertEqual([(e.path, e.expected_date, e.duplicate_of) for e in loaded],
+                         [(e.path, e.expected_date, e.duplicate_of) for e in first])
+
+
+class TestBenchSuiteCompare(unittest.TestCase):
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.5), 50)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile([3.0], 0.99), 3.0)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        base = {"results": {"hash": {"files_per_s": 1000, "p50_ms": 1.0, "p99_ms": 2.0}}}
+        slower = {"results": {"hash": {"files_per_s": 800, "p50_ms": 1.05, "p99_ms": 3.0},
+                              "nuevo": {"files_per_s": 1}}}
+
+        regressions = compare(base, slower, 0.15)
+        self.assertEqual([line.split(":")[0] for line in regressions], ["hash.files_per_s", "hash.p99_ms"])
+        self.assertEqual(compare(base, base, 0.15), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import shutil
 import tempfile
 from pathlib import Path
-from src.deduplicator import scan_and_move_duplicates
+from src.deduplicator import scan_and_move_duplicates, DuplicateStats
 
 class TestDeduplicator(unittest.TestCase):
     def setUp(self):
@@ -83,5 +83,48 @@ class TestDeduplicator(unittest.TestCase):
         # La lógica de renombrado añade _dup_N
         self.assertTrue(any("dup_dup_" in n for n in names))
 
+    def test_partial_hash_discards_different_heads(self):
+        # Mismo tamaño (1 MB) pero distinto contenido desde el primer byte:
+        # la huella parcial basta para descartarlos sin hash completo.
+        size = 1024 * 1024
+        f1 = self.root / "a.mov"
+        f2 = self.root / "b.mov"
+        self.create_file(f1, b"A" + b"\x00" * (size - 1))
+        self.create_file(f2, b"B" + b"\x00" * (size - 1))
+
+        stats = DuplicateStats()
+        for _ in scan_and_move_duplicates(self.root, stats=stats):
+            pass
+
+        self.assertTrue(f1.exists())
+        self.assertTrue(f2.exists())
+        self.assertEqual(stats.partial_files, 2)
+        self.assertEqual(stats.full_files, 0)
+        self.assertEqual(stats.full_bytes, 0)
+        self.assertLess(stats.partial_bytes, size)
+
+    def test_partial_collision_confirmed_by_full_hash(self):
+        # Difieren solo en un byte que no cae en ninguna muestra parcial
+        size = 1024 * 1024
+        base = bytearray(b"\x00" * size)
+        other = bytearray(base)
+        other[size // 2 + 10000] = 1
+        f1 = self.root / "a.mov"
+        f2 = self.root / "sub" / "b.mov"
+        f3 = self.root / "sub" / "c.mov"
+        self.create_file(f1, bytes(base))
+        self.create_file(f2, bytes(base))
+        self.create_file(f3, bytes(other))
+
+        stats = DuplicateStats()
+        for _ in scan_and_move_duplicates(self.root, stats=stats):
+            pass
+
+        self.assertTrue(f1.exists())
+        self.assertFalse(f2.exists())
+        self.assertTrue(f3.exists())
+        self.assertEqual(stats.full_files, 3)
+        self.assertEqual(stats.full_bytes, 3 * size)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+from src.dest_index import DestinationIndex
+from src.mover import move_media_safe, STATUS_SUCCESS, STATUS_SKIPPED
+from src.scanner import MediaGroup
+
+class TestDestinationIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.folder = self.test_dir / "2020" / "05-mayo"
+        self.folder.mkdir(parents=True)
+        self.index = DestinationIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_folder_is_listed_once(self):
+        (self.folder / "IMG_0001.JPG").write_bytes(b"a")
+        with mock.patch("src.dest_index.os.scandir", wraps=os.scandir) as scandir:
+            for _ in range(5):
+                self.index.lookup(self.folder / "IMG_0001.JPG")
+                self.index.next_free(self.folder, "IMG_0001", ".JPG")
+        self.assertEqual(scandir.call_count, 1)
+
+    def test_next_free_continues_after_existing_dups(self):
+        for name in ("IMG_0001.JPG", "IMG_0001_dup_1.JPG", "IMG_0001_dup_2.JPG"):
+            (self.folder / name).write_bytes(b"x")
+
+        path = self.index.next_free(self.folder, "IMG_0001", ".JPG")
+        self.assertEqual(path.name, "IMG_0001_dup_3.JPG")
+        self.index.add(path, 1)
+        self.assertEqual(self.index.next_free(self.folder, "IMG_0001", ".JPG").name, "IMG_0001_dup_4.JPG")
+        self.assertEqual(self.index.next_free(self.folder, "IMG_0002", ".JPG").name, "IMG_0002.JPG")
+
+    def test_lookup_ignores_case(self):
+        (self.folder / "img_0001.jpg").write_bytes(b"abc")
+        self.assertEqual(self.index.lookup(self.folder / "IMG_0001.JPG"), (self.folder / "img_0001.jpg", 3))
+        self.assertIsNone(self.index.lookup(self.folder / "IMG_0002.JPG"))
+
+    def test_renamed_copies_filtered_by_size(self):
+        (self.folder / "a_dup_1.jpg").write_bytes(b"12")
+        (self.folder / "a_dup_2.jpg").write_bytes(b"123")
+        self.assertEqual(self.index.renamed_copies(self.folder, "a", ".jpg", 3), [self.folder / "a_dup_2.jpg"])
+
+    def test_digest_is_memoized(self):
+        f = self.folder / "a.jpg"
+        f.write_bytes(b"contenido")
+        first = self.index.digest(f)
+        with mock.patch("builtins.open", side_effect=AssertionError("no debería leer")):
+            self.assertEqual(self.index.digest(f), first)
+
+    def test_many_name_collisions(self):
+        src = self.test_dir / "src"
+        src.mkdir()
+        dest = self.test_dir / "dst"
+        results = []
+        for i in range(5):
+            camera = src / f"card{i}"
+            camera.mkdir()
+            f = camera / "IMG_0001.JPG"
+            f.write_bytes(f"foto {i}".encode())
+            results.append(move_media_safe(MediaGroup(f), dest, date_taken=datetime(2020, 5, 1),
+                                           dest_index=self.index))
+
+        self.assertTrue(all(r.status == STATUS_SUCCESS for r in results))
+        names = sorted(p.name for p in (dest / "2020" / "05-mayo").iterdir())
+        self.assertEqual(names, ["IMG_0001.JPG"] + [f"IMG_0001_dup_{i}.JPG" for i in range(1, 5)])
+
+    def test_skip_existing_renamed_copy(self):
+        dest_folder = self.test_dir / "dst" / "2020" / "05-mayo"
+        dest_folder.mkdir(parents=True)
+        (dest_folder / "IMG_0001.JPG").write_bytes(b"otra foto")
+        (dest_folder / "IMG_0001_dup_1.JPG").write_bytes(b"misma foto")
+        f = self.test_dir / "IMG_0001.JPG"
+        f.write_bytes(b"misma foto")
+
+        result = move_media_safe(MediaGroup(f), self.test_dir / "dst", duplicate_action='skip',
+                                 date_taken=datetime(2020, 5, 1), dest_index=self.index)
+        self.assertEqual(result.status, STATUS_SKIPPED)
+        self.assertTrue(f.exists())
+
+if __name__ == '__main__':
+    unittest.main()
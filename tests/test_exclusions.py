@@ -0,0 +1,80 @@
+import unittest
+import shutil
+import tempfile
+from pathlib import Path
+from src.exclusions import ExclusionMatcher
+from src.scanner import scan_directory
+
+class TestExclusionMatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_absolute_paths_exclude_subtrees(self):
+        matcher = ExclusionMatcher([str(self.root / "privado")])
+        self.assertTrue(matcher.is_excluded(self.root / "privado", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "privado" / "a" / "b", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "privado2", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "publico", self.root))
+
+    def test_any_depth_glob(self):
+        matcher = ExclusionMatcher(["**/@eaDir"])
+        self.assertTrue(matcher.is_excluded(self.root / "@eaDir", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "2020" / "05" / "@eaDir", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "2020" / "eaDir", self.root))
+
+    def test_single_level_glob_is_anchored_at_root(self):
+        matcher = ExclusionMatcher(["*/.thumbnails", "Fotos/20*/tmp"])
+        self.assertTrue(matcher.is_excluded(self.root / "movil" / ".thumbnails", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "movil" / "dcim" / ".thumbnails", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "Fotos" / "2021" / "tmp", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "Fotos" / "tmp", self.root))
+
+    def test_bare_folder_name_is_anchored_at_root(self):
+        matcher = ExclusionMatcher(["@eaDir"])
+        self.assertTrue(matcher.is_excluded(self.root / "@eaDir", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "@eaDir" / "sub", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "2020" / "@eaDir", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "@eaDir2", self.root))
+
+    def test_relative_literal_path_ignores_working_directory(self):
+        matcher = ExclusionMatcher(["Fotos/tmp", "./Otros\\basura"])
+        self.assertTrue(matcher.is_excluded(self.root / "Fotos" / "tmp", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "Fotos" / "tmp" / "a", self.root))
+        self.assertTrue(matcher.is_excluded(self.root / "Otros" / "basura", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "Fotos", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "x" / "Fotos" / "tmp", self.root))
+
+    def test_case_insensitive_option(self):
+        rules = [str(self.root / "Privado"), "**/@EADIR"]
+        strict = ExclusionMatcher(rules, case_insensitive=False)
+        relaxed = ExclusionMatcher(rules, case_insensitive=True)
+        for path in (self.root / "privado", self.root / "x" / "@eaDir"):
+            self.assertFalse(strict.is_excluded(path, self.root))
+            self.assertTrue(relaxed.is_excluded(path, self.root))
+
+    def test_root_itself_and_ancestors(self):
+        self.assertIsNone(ExclusionMatcher([str(self.root)]).start(self.root))
+        # Un ancestro excluido deja escanear la raíz pero no sus subcarpetas (comportamiento histórico)
+        matcher = ExclusionMatcher([str(self.root.parent)])
+        state = matcher.start(self.root)
+        self.assertIsNotNone(state)
+        self.assertIsNone(matcher.descend(state, "sub"))
+
+    def test_scan_directory_with_patterns(self):
+        for rel in ("a.jpg", "@eaDir/a.jpg", "2020/@eaDir/b.jpg", "2020/c.jpg", "movil/.thumbnails/t.jpg"):
+            path = self.root / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        names = sorted(g.main_file.name for g in scan_directory(self.root, {"**/@eaDir", "*/.thumbnails"}))
+        self.assertEqual(names, ["a.jpg", "c.jpg"])
+
+    def test_many_rules(self):
+        matcher = ExclusionMatcher([str(self.root / f"excl_{i}") for i in range(1000)])
+        self.assertTrue(matcher.is_excluded(self.root / "excl_999" / "x", self.root))
+        self.assertFalse(matcher.is_excluded(self.root / "excl_1000", self.root))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import io
+import shutil
+import struct
+import tempfile
+from unittest import mock
+from datetime import datetime
+from pathlib import Path
+from PIL import Image
+from src import exif_reader
+from src.exif_reader import read_exif_date, read_exif_date_from_file, read_raw_exif_date, ExifFormatError
+from src.date_extractor import SOURCE_EXIF, get_date_taken, get_date_with_source
+
+def make_exif(original=None, datetime_tag=None):
+    exif = Image.Exif()
+    if datetime_tag:
+        exif[0x0132] = datetime_tag
+    if original:
+        exif.get_ifd(0x8769)[0x9003] = original
+    return exif
+
+class CountingReader(io.BytesIO):
+    """BytesIO que contabiliza los bytes leídos."""
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+class TestExifReader(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def save_image(self, name, fmt, exif):
+        path = self.test_dir / name
+        Image.new('RGB', (32, 32), 'red').save(path, fmt, exif=exif)
+        return path
+
+    def test_formats_with_datetime_original(self):
+        expected = datetime(2020, 5, 17, 10, 11, 12)
+        for name, fmt in [("a.jpg", "JPEG"), ("a.png", "PNG"), ("a.webp", "WEBP")]:
+            path = self.save_image(name, fmt, make_exif("2020:05:17 10:11:12", "2019:01:01 00:00:00"))
+            self.assertEqual(read_exif_date(path), expected, name)
+            self.assertEqual(get_date_taken(path), expected, name)
+
+    def test_falls_back_to_ifd0_datetime(self):
+        path = self.save_image("a.jpg", "JPEG", make_exif(datetime_tag="2018:03:04 05:06:07"))
+        self.assertEqual(read_exif_date(path), datetime(2018, 3, 4, 5, 6, 7))
+
+    def test_no_exif_returns_none(self):
+        path = self.test_dir / "plain.png"
+        Image.new('RGB', (8, 8)).save(path)
+        self.assertIsNone(read_exif_date(path))
+
+    def test_invalid_date_is_ignored(self):
+        path = self.save_image("a.jpg", "JPEG", make_exif("0000:00:00 00:00:00"))
+        self.assertIsNone(read_exif_date(path))
+
+    def test_unknown_container_raises(self):
+        path = self.test_dir / "fake.jpg"
+        path.write_bytes(b"no soy un jpeg")
+        with self.assertRaises(ExifFormatError):
+            read_exif_date(path)
+
+    def test_big_endian_tiff_block(self):
+        # APP1 construido a mano en Motorola (MM) con DateTimeOriginal en el Exif IFD
+        date = b"2021:12:24 20:00:00\x00"
+        ifd0 = struct.pack('>H', 1) + struct.pack('>HHII', 0x8769, 4, 1, 26) + b"\x00\x00\x00\x00"
+        exif_ifd = struct.pack('>H', 1) + struct.pack('>HHII', 0x9003, 2, len(date), 44) + b"\x00\x00\x00\x00"
+        tiff = b"MM\x00\x2a" + struct.pack('>I', 8) + ifd0 + exif_ifd + date
+        app1 = b"Exif\x00\x00" + tiff
+        jpeg = b"\xff\xd8" + b"\xff\xe1" + struct.pack('>H', len(app1) + 2) + app1 + b"\xff\xda\x00\x02" + b"\x00" * 100
+        self.assertEqual(read_exif_date_from_file(io.BytesIO(jpeg)), datetime(2021, 12, 24, 20, 0, 0))
+
+    def test_reads_only_metadata_segment(self):
+        # Imagen grande con mucho ruido: el lector no debe tocar los datos comprimidos
+        path = self.test_dir / "big.jpg"
+        img = Image.effect_noise((1500, 1500), 100).convert('RGB')
+        img.save(path, "JPEG", exif=make_exif("2020:05:17 10:11:12"), quality=95)
+        data = path.read_bytes()
+        self.assertGreater(len(data), 500 * 1024)
+
+        reader = CountingReader(data)
+        self.assertEqual(read_exif_date_from_file(reader), datetime(2020, 5, 17, 10, 11, 12))
+        self.assertLess(reader.bytes_read, 4096)
+
+def raw_tiff(date, subsec=None, magic=b'*\x00', endian='<'):
+    """RAW basado en TIFF: IFD0 (Make + DateTime de edición) -> Exif IFD (DateTimeOriginal + SubSec)."""
+    tag = lambda code, kind, count, value: struct.pack(endian + 'HHII', code, kind, count, value)
+    original = date.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\x00'
+    edited = b'2030:01:01 00:00:00\x00'
+    entries = [(0x9003, original)] + ([(0x9291, subsec.encode() + b'\x00')] if subsec else [])
+    exif_offset = 8 + 2 + 3 * 12 + 4
+    data_offset = exif_offset + 2 + len(entries) * 12 + 4
+    ifd0 = struct.pack(endian + 'H', 3) + struct.pack(endian + 'HHI', 0x010F, 2, 4) + b'Cam\x00'
+    ifd0 += tag(0x0132, 2, len(edited), data_offset) + tag(0x8769, 4, 1, exif_offset) + b'\x00' * 4
+    values = edited
+    exif_ifd = struct.pack(endian + 'H', len(entries))
+    for code, value in entries:
+        if len(value) <= 4:
+            exif_ifd += struct.pack(endian + 'HHI', code, 2, len(value)) + value.ljust(4, b'\x00')
+        else:
+            exif_ifd += tag(code, 2, len(value), data_offset + len(values))
+            values += value
+    header = (b'II' if endian == '<' else b'MM') + magic + struct.pack(endian + 'I', 8)
+    return header + ifd0 + exif_ifd + b'\x00' * 4 + values
+
+def raf(jpeg, sensor=b''):
+    """RAF: cabecera con la posición del JPEG de vista previa en el byte 84."""
+    header = b'FUJIFILMCCD-RAW 0201FF383501'.ljust(84, b'\x00') + struct.pack('>II', 100, len(jpeg))
+    return header.ljust(100, b'\x00') + jpeg + sensor
+
+class TestRawExifReader(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.date = datetime(2022, 8, 9, 10, 11, 12)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, data):
+        path = self.test_dir / name
+        path.write_bytes(data)
+        return path
+
+    def test_tiff_raws_with_subsec(self):
+        files = {"a.nef": raw_tiff(self.date, subsec='45'),
+                 "a.dng": raw_tiff(self.date, subsec='123456789', endian='>'),
+                 "a.orf": raw_tiff(self.date, subsec='7', magic=b'RO'),
+                 "a.cr2": raw_tiff(self.date)}
+        expected = {"a.nef": 450000, "a.dng": 123456, "a.orf": 700000, "a.cr2": 0}
+        for name, data in files.items():
+            path = self.write(name, data)
+            date = self.date.replace(microsecond=expected[name])
+            self.assertEqual(read_raw_exif_date(path), date, name)
+            self.assertEqual(get_date_with_source(path), (date, SOURCE_EXIF), name)
+
+    def test_raf_embedded_jpeg(self):
+        jpeg = io.BytesIO()
+        Image.new('RGB', (16, 16)).save(jpeg, "JPEG", exif=make_exif("2022:08:09 10:11:12"))
+        path = self.write("a.raf", raf(jpeg.getvalue(), b'\x00' * 4096))
+        self.assertEqual(read_raw_exif_date(path), self.date)
+        self.assertEqual(get_date_with_source(path), (self.date, SOURCE_EXIF))
+
+    def test_large_raw_reads_only_the_header(self):
+        path = self.write("big.arw", raw_tiff(self.date, subsec='5'))
+        with open(path, 'r+b') as f:
+            f.truncate(50 * 1024 * 1024)  # Datos de sensor dispersos: 50 MB sin ocupar disco
+
+        calls = []
+        real_pread = exif_reader._pread
+        def counting_pread(f, size, offset):
+            calls.append(size)
+            return real_pread(f, size, offset)
+        with mock.patch.object(exif_reader, '_pread', counting_pread):
+            self.assertEqual(read_raw_exif_date(path), self.date.replace(microsecond=500000))
+        self.assertEqual(len(calls), 1)
+        self.assertLessEqual(sum(calls), 16 * 1024)
+
+    def test_corrupt_raw_raises(self):
+        for name, data in [("a.nef", b"no soy un tiff" * 10), ("a.raf", b'FUJIFILMCCD-RAW' + b'\xff' * 100)]:
+            with self.assertRaises(ExifFormatError, msg=name):
+                read_raw_exif_date(self.write(name, data))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.hash_engine import hash_files
+from src.deduplicator import scan_and_move_duplicates
+
+class TestHashEngine(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        # Los primeros trabajos son los más lentos: aun así salen primero
+        paths = [Path(f"f{i}") for i in range(20)]
+
+        def slow_hasher(path):
+            time.sleep(0.02 if int(path.name[1:]) < 5 else 0)
+            return path.name.upper()
+
+        results = list(hash_files(((p, 1) for p in paths), slow_hasher, workers=4))
+        self.assertEqual([r[0] for r in results], paths)
+        self.assertEqual([r[1] for r in results], [p.name.upper() for p in paths])
+
+    def test_read_errors_are_reported(self):
+        def failing_hasher(path):
+            if path.name == "bad":
+                raise FileNotFoundError(path)
+            return "ok"
+
+        results = list(hash_files([(Path("good"), 1), (Path("bad"), 1)], failing_hasher, workers=2))
+        self.assertEqual(results[0], (Path("good"), "ok", None))
+        self.assertIsNone(results[1][1])
+        self.assertIsInstance(results[1][2], FileNotFoundError)
+
+    def test_inflight_bytes_cap(self):
+        lock = threading.Lock()
+        current = {"bytes": 0, "max": 0}
+
+        def hasher(path):
+            with lock:
+                current["bytes"] += 100
+                current["max"] = max(current["max"], current["bytes"])
+            time.sleep(0.01)
+            with lock:
+                current["bytes"] -= 100
+            return "x"
+
+        jobs = ((Path(str(i)), 100) for i in range(20))
+        list(hash_files(jobs, hasher, workers=8, max_inflight_bytes=250))
+        self.assertLessEqual(current["max"], 300)
+
+    def test_cancel_stops_submitting(self):
+        cancel = threading.Event()
+        calls = []
+
+        def hasher(path):
+            calls.append(path)
+            return "x"
+
+        results = []
+        for item in hash_files(((Path(str(i)), 1) for i in range(1000)), hasher, workers=2, cancel_event=cancel):
+            results.append(item)
+            if len(results) == 3:
+                cancel.set()
+
+        self.assertEqual(len(results), 3)
+        self.assertLess(len(calls), 1000)
+
+class TestParallelDeduplicator(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parallel_matches_sequential(self):
+        for i in range(10):
+            sub = self.root / f"d{i}"
+            sub.mkdir()
+            (sub / "a.jpg").write_bytes(b"comun" * 10)
+            (sub / f"u{i}.jpg").write_bytes(f"unico{i:02d}".encode() * 10)
+
+        for _ in scan_and_move_duplicates(self.root, hash_workers=4):
+            pass
+
+        self.assertEqual(len(list((self.root / "_DUPLICADOS").iterdir())), 9)
+        self.assertEqual(len(list(self.root.rglob("u*.jpg"))), 10)
+
+    def test_cancel_before_moving(self):
+        (self.root / "a.jpg").write_bytes(b"igual")
+        (self.root / "b.jpg").write_bytes(b"igual")
+        cancel = threading.Event()
+        cancel.set()
+
+        messages = list(scan_and_move_duplicates(self.root, cancel_event=cancel))
+
+        self.assertIn("DETENIDA", messages[-1])
+        self.assertTrue((self.root / "a.jpg").exists())
+        self.assertTrue((self.root / "b.jpg").exists())
+
+if __name__ == '__main__':
+    unittest.main()
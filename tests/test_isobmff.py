@@ -0,0 +1,152 @@
+import unittest
+import io
+import shutil
+import struct
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from src.date_extractor import SOURCE_EXIF, SOURCE_VIDEO, get_date_with_source
+from src.isobmff import IsoBmffError, read_isobmff_date, read_isobmff_date_from_file
+
+MP4_EPOCH = datetime(1904, 1, 1)
+CANON_UUID = bytes.fromhex('85c0b687820f11e08111f4ce462b6a48')
+
+def box(kind, body):
+    return struct.pack('>I4s', 8 + len(body), kind) + body
+
+def full_box(kind, version, body):
+    return box(kind, bytes([version, 0, 0, 0]) + body)
+
+def mvhd(date, version=0):
+    seconds = 0 if date is None else int((date - MP4_EPOCH).total_seconds())
+    if version == 1:
+        return full_box(b'mvhd', 1, struct.pack('>QQIQ', seconds, seconds, 1000, 1000) + b'\x00' * 80)
+    return full_box(b'mvhd', 0, struct.pack('>IIII', seconds, seconds, 1000, 1000) + b'\x00' * 80)
+
+def ftyp(brand, *compatible):
+    return box(b'ftyp', brand + b'\x00\x00\x00\x00' + b''.join(compatible))
+
+def tiff(tag, date, endian='<'):
+    """TIFF mínimo con una sola etiqueta ASCII `tag` en el IFD0."""
+    value = date.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\x00'
+    header = (b'II*\x00' if endian == '<' else b'MM\x00*') + struct.pack(endian + 'I', 8)
+    ifd = struct.pack(endian + 'H', 1) + struct.pack(endian + 'HHII', tag, 2, len(value), 26) + b'\x00' * 4
+    return header + ifd + value
+
+def exif_tiff(date):
+    """TIFF con IFD0 -> Exif IFD -> DateTimeOriginal, como el de una cámara."""
+    value = date.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\x00'
+    ifd0 = struct.pack('>H', 1) + struct.pack('>HHII', 0x8769, 4, 1, 26) + b'\x00' * 4
+    exif_ifd = struct.pack('>H', 1) + struct.pack('>HHII', 0x9003, 2, len(value), 44) + b'\x00' * 4
+    return b'MM\x00*' + struct.pack('>I', 8) + ifd0 + exif_ifd + value
+
+def heic(date, in_idat=False, padding=0):
+    """HEIC con un ítem de imagen y un ítem Exif (en mdat, o en meta/idat con iloc v1)."""
+    item = struct.pack('>I', 6) + b'Exif\x00\x00' + exif_tiff(date)
+    infe = lambda item_id, kind: full_box(b'infe', 2, struct.pack('>HH', item_id, 0) + kind + b'\x00')
+    iinf = full_box(b'iinf', 0, struct.pack('>H', 2) + infe(1, b'hvc1') + infe(2, b'Exif'))
+
+    def iloc(exif_offset):
+        if in_idat:
+            entries = struct.pack('>HHH', 2, 1, 0) + struct.pack('>HII', 1, 0, len(item))
+            return full_box(b'iloc', 1, bytes([0x44, 0x00]) + struct.pack('>H', 1) + entries)
+        entries = (struct.pack('>HH', 1, 0) + struct.pack('>HII', 1, 0, 10) +
+                   struct.pack('>HH', 2, 0) + struct.pack('>HII', 1, exif_offset, len(item)))
+        return full_box(b'iloc', 0, bytes([0x44, 0x00]) + struct.pack('>H', 2) + entries)
+
+    head = ftyp(b'heic', b'mif1', b'heic')
+    extra = box(b'idat', item) if in_idat else b''
+    meta_size = len(full_box(b'meta', 0, box(b'hdlr', b'\x00' * 24) + iinf + iloc(0) + extra))
+    mdat_body = b'\x00' * (10 + padding) + (b'' if in_idat else item)
+    exif_offset = len(head) + meta_size + 8 + 10 + padding
+    meta = full_box(b'meta', 0, box(b'hdlr', b'\x00' * 24) + iinf + iloc(exif_offset) + extra)
+    return head + meta + box(b'mdat', mdat_body)
+
+def cr3(original=None, datetime_tag=None, movie=None):
+    cmts = b''
+    if datetime_tag:
+        cmts += box(b'CMT1', tiff(0x0132, datetime_tag))
+    if original:
+        cmts += box(b'CMT2', tiff(0x9003, original, endian='>'))
+    canon = struct.pack('>I4s', 8 + 16 + len(cmts), b'uuid') + CANON_UUID + cmts
+    return ftyp(b'crx ', b'crx ', b'isom') + box(b'moov', canon + mvhd(movie)) + box(b'mdat', b'\x00' * 512)
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+class TestIsoBmff(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.date = datetime(2021, 7, 8, 9, 10, 11)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def read(self, data):
+        reader = CountingReader(data)
+        return read_isobmff_date_from_file(reader, len(data)), reader.bytes_read
+
+    def test_moov_after_a_large_mdat_reads_only_headers(self):
+        data = ftyp(b'isom', b'mp41') + box(b'mdat', b'\x00' * (2 * 1024 * 1024)) + box(b'moov', mvhd(self.date))
+        date, bytes_read = self.read(data)
+        self.assertEqual(date, self.date)
+        self.assertLess(bytes_read, 256)
+
+    def test_extended_and_open_ended_sizes(self):
+        payload = b'\x00' * 1000
+        large_mdat = struct.pack('>I4sQ', 1, b'mdat', 16 + len(payload)) + payload
+        data = ftyp(b'qt  ') + large_mdat + box(b'moov', mvhd(self.date, version=1))
+        self.assertEqual(self.read(data)[0], self.date)
+
+        # Tamaño 0: el mdat llega hasta el final; el moov va delante
+        data = ftyp(b'isom') + box(b'moov', mvhd(self.date)) + struct.pack('>I4s', 0, b'mdat') + payload
+        self.assertEqual(self.read(data)[0], self.date)
+        data = ftyp(b'isom') + struct.pack('>I4s', 0, b'mdat') + payload
+        self.assertIsNone(self.read(data)[0])
+
+    def test_quicktime_without_ftyp_and_zero_creation_time(self):
+        data = box(b'wide', b'') + box(b'mdat', b'\x00' * 64) + box(b'moov', mvhd(self.date))
+        self.assertEqual(self.read(data)[0], self.date)
+        self.assertIsNone(self.read(ftyp(b'isom') + box(b'moov', mvhd(None)))[0])
+
+    def test_heic_exif_item(self):
+        for in_idat in (False, True):
+            date, bytes_read = self.read(heic(self.date, in_idat=in_idat, padding=512 * 1024))
+            self.assertEqual(date, self.date, in_idat)
+            self.assertLess(bytes_read, 4096)
+
+    def test_cr3_cmt_boxes(self):
+        movie = datetime(2001, 1, 1)
+        self.assertEqual(self.read(cr3(original=self.date, datetime_tag=movie, movie=movie))[0], self.date)
+        self.assertEqual(self.read(cr3(datetime_tag=self.date, movie=movie))[0], self.date)
+        self.assertEqual(self.read(cr3(movie=movie))[0], movie)
+
+    def test_corrupt_containers_raise(self):
+        with self.assertRaises(IsoBmffError):
+            self.read(b'\xff\xd8\xff\xe0 no soy iso-bmff')
+        with self.assertRaises(IsoBmffError):
+            self.read(ftyp(b'isom') + struct.pack('>I4s', 4, b'moov'))
+        with self.assertRaises(IsoBmffError):
+            self.read(ftyp(b'isom') + struct.pack('>I4s', 10 ** 6, b'mdat'))
+
+    def test_date_extractor_uses_the_box_reader(self):
+        files = {"clip.mp4": (box(b'mdat', b'\x00' * 64) + box(b'moov', mvhd(self.date)), SOURCE_VIDEO),
+                 "clip.mov": (ftyp(b'qt  ') + box(b'moov', mvhd(self.date, version=1)), SOURCE_VIDEO),
+                 "foto.heic": (heic(self.date), SOURCE_EXIF),
+                 "raw.cr3": (cr3(original=self.date), SOURCE_EXIF)}
+        for name, (data, source) in files.items():
+            path = self.test_dir / name
+            path.write_bytes(data)
+            self.assertEqual(read_isobmff_date(path), self.date, name)
+            self.assertEqual(get_date_with_source(path), (self.date, source), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
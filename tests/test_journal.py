@@ -0,0 +1,106 @@
+import unittest
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from src.journal import JournalError, OperationJournal, read_journal, undo_journal
+from src.mover import STATUS_ERROR, STATUS_SKIPPED, STATUS_SUCCESS, TRANSFER_RENAME
+from src.pipeline import organize_pipeline
+
+class TestOperationJournal(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        self.src = self.root / "src"
+        self.dst = self.root / "dst"
+        for i in range(4):
+            path = self.src / f"card{i % 2}" / f"IMG_{i}.jpg"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(f"foto {i}".encode())
+        (self.src / "card0" / "IMG_0.xmp").write_text("<xmp/>")
+        self.path = self.root / "operaciones.jsonl"
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def organize(self, dry_run=False):
+        with OperationJournal(self.path, source=self.src, dest=self.dst, dry_run=dry_run) as journal:
+            journal.message("inicio")
+            for media_group, result in organize_pipeline(self.src, self.dst, dry_run=dry_run):
+                journal.record(media_group, result)
+
+    def ops(self):
+        return [r for r in read_journal(self.path) if r["type"] == "op"]
+
+    def test_records_every_group(self):
+        self.organize()
+        records = list(read_journal(self.path))
+        self.assertEqual(records[0]["type"], "run")
+        self.assertEqual(records[0]["source"], str(self.src))
+        self.assertEqual(records[1], {"type": "message", "text": "inicio"})
+
+        ops = {Path(r["source"]).name: r for r in self.ops()}
+        self.assertEqual(sorted(ops), ["IMG_0.jpg", "IMG_1.jpg", "IMG_2.jpg", "IMG_3.jpg"])
+        first = ops["IMG_0.jpg"]
+        self.assertEqual(first["status"], STATUS_SUCCESS)
+        self.assertTrue(Path(first["destination"]).exists())
+        self.assertEqual(first["size"], len(b"foto 0") + len("<xmp/>"))
+        self.assertEqual(first["transfer"], TRANSFER_RENAME)
+        self.assertEqual([Path(src).name for src, dst in first["sidecars"]], ["IMG_0.xmp"])
+
+    def test_torn_line_is_ignored(self):
+        self.organize()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"type": "op", "source": "/x/IMG')
+        self.assertEqual(len(self.ops()), 4)
+
+    def test_undo_moves_files_and_sidecars_back(self):
+        self.organize()
+        results = list(undo_journal(self.path, workers=3))
+
+        self.assertEqual([r.status for _, r in results], [STATUS_SUCCESS] * 4)
+        self.assertEqual({r.transfer for _, r in results}, {TRANSFER_RENAME})
+        self.assertEqual((self.src / "card0" / "IMG_0.jpg").read_bytes(), b"foto 0")
+        self.assertTrue((self.src / "card0" / "IMG_0.xmp").exists())
+        self.assertEqual(list(self.dst.rglob("IMG_*")), [])
+
+    def test_undo_skips_occupied_or_changed_files(self):
+        self.organize()
+        ops = {Path(r["source"]).name: r for r in self.ops()}
+        Path(ops["IMG_1.jpg"]["source"]).write_bytes(b"nuevo")
+        Path(ops["IMG_2.jpg"]["destination"]).write_bytes(b"editada despues")
+
+        results = {Path(record["source"]).name: result for record, result in undo_journal(self.path)}
+
+        self.assertEqual(results["IMG_1.jpg"].status, STATUS_SKIPPED)
+        self.assertEqual(results["IMG_2.jpg"].status, STATUS_SKIPPED)
+        self.assertEqual(results["IMG_3.jpg"].status, STATUS_SUCCESS)
+        # Nada se sobrescribe
+        self.assertEqual(Path(ops["IMG_1.jpg"]["source"]).read_bytes(), b"nuevo")
+        self.assertTrue(Path(ops["IMG_2.jpg"]["destination"]).exists())
+
+    def test_undo_dry_run_moves_nothing(self):
+        self.organize()
+        results = list(undo_journal(self.path, dry_run=True))
+        self.assertEqual([r.status for _, r in results], [STATUS_SUCCESS] * 4)
+        self.assertEqual(len(list(self.dst.rglob("IMG_*.jpg"))), 4)
+
+    def test_simulation_journal_is_refused(self):
+        self.organize(dry_run=True)
+        # Los "destinos" de la simulación existen ahora por otro motivo: no deben tocarse
+        for record in self.ops():
+            Path(record["destination"]).parent.mkdir(parents=True, exist_ok=True)
+            Path(record["destination"]).write_bytes(b"otro")
+        with self.assertRaises(JournalError):
+            list(undo_journal(self.path))
+        self.assertEqual(len(list(self.dst.rglob("IMG_*.jpg"))), 4)
+        self.assertEqual(len(list(self.src.rglob("IMG_*.jpg"))), 4)
+
+    def test_undo_reports_failures(self):
+        self.organize()
+        with mock.patch("src.journal.move_file", side_effect=OSError("disco lleno")):
+            results = list(undo_journal(self.path))
+        self.assertEqual([r.status for _, r in results], [STATUS_ERROR] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
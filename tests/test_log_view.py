@@ -0,0 +1,36 @@
+import unittest
+import queue
+from src.log_view import drain_queue, lines_to_trim
+
+class TestLogView(unittest.TestCase):
+    def test_drain_groups_by_area_in_order(self):
+        q = queue.Queue()
+        for msg, area in [("a1", "organizer"), ("d1", "duplicates"), ("a2", "organizer")]:
+            q.put((msg, area))
+
+        batches = drain_queue(q)
+
+        self.assertEqual(batches, {"organizer": ["a1", "a2"], "duplicates": ["d1"]})
+        self.assertTrue(q.empty())
+
+    def test_drain_keeps_only_the_last_lines(self):
+        q = queue.Queue()
+        for i in range(100_000):
+            q.put((f"linea {i}", "organizer"))
+
+        lines = drain_queue(q, max_lines=5000)["organizer"]
+
+        self.assertEqual(len(lines), 5000)
+        self.assertEqual(lines[0], "linea 95000")
+        self.assertEqual(lines[-1], "linea 99999")
+
+    def test_empty_queue(self):
+        self.assertEqual(drain_queue(queue.Queue()), {})
+
+    def test_lines_to_trim(self):
+        self.assertEqual(lines_to_trim(4000, 5000), 0)
+        self.assertEqual(lines_to_trim(7500, 5000), 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from src import metrics
+from src.pipeline import organize_pipeline
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        metrics.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+        shutil.rmtree(self.root)
+
+    def test_disabled_records_nothing(self):
+        metrics.disable()
+
+        @metrics.timed("apagado")
+        def work(x):
+            return x * 2
+
+        self.assertEqual(work(21), 42)
+        metrics.count("apagado.eventos")
+        with metrics.timer("apagado.bloque"):
+            pass
+        self.assertEqual(metrics.snapshot(), {"histograms": {}, "counters": {}})
+
+    def test_functions_and_generators(self):
+        @metrics.timed("funcion")
+        def fail():
+            raise ValueError("x")
+
+        @metrics.timed("generador")
+        def numbers(n):
+            yield from range(n)
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(list(numbers(5)), [0, 1, 2, 3, 4])
+        self.assertEqual(numbers.__name__, "numbers")
+
+        data = metrics.snapshot()
+        self.assertEqual(data["histograms"]["funcion"]["count"], 1)
+        self.assertEqual(data["histograms"]["generador"]["count"], 1)
+        self.assertEqual(data["counters"]["generador.items"], 5)
+
+    def test_quantiles_come_from_buckets(self):
+        hist = metrics.histogram("latencia")
+        for _ in range(99):
+            hist.observe(0.001)
+        hist.observe(3.0)
+        self.assertEqual(hist.quantile(0.5), 0.001)
+        self.assertEqual(hist.quantile(1.0), 3.0)
+        self.assertEqual(hist.as_dict()["max"], 3.0)
+
+    def test_prometheus_and_json_export(self):
+        hist = metrics.histogram("hash")
+        hist.observe(0.002)
+        hist.observe(0.2)
+        metrics.count("date.cache_hits", 3)
+
+        text = metrics.write(self.root / "run.prom").read_text()
+        self.assertIn("# TYPE ordenafotos_stage_seconds histogram", text)
+        self.assertIn('ordenafotos_stage_seconds_bucket{stage="hash",le="+Inf"} 2', text)
+        self.assertIn('ordenafotos_stage_seconds_count{stage="hash"} 2', text)
+        self.assertIn('ordenafotos_events_total{name="date.cache_hits"} 3', text)
+
+        data = json.loads(metrics.write(self.root / "run.json").read_text())
+        self.assertEqual(data["histograms"]["hash"]["count"], 2)
+        self.assertEqual(list(self.root.glob("*.tmp")), [])
+
+    def test_pipeline_reports_each_stage(self):
+        src, dst = self.root / "src", self.root / "dst"
+        for i in range(3):
+            path = src / f"IMG_{i}.jpg"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(f"foto {i}".encode())
+
+        list(organize_pipeline(src, dst))
+
+        histograms = metrics.snapshot()["histograms"]
+        self.assertEqual(histograms["scan"]["count"], 1)
+        self.assertEqual(histograms["date"]["count"], 3)
+        self.assertEqual(histograms["copy"]["count"], 3)
+        self.assertEqual(histograms["mkdir"]["count"], 3)
+        self.assertTrue(any(line.startswith("copy: ") for line in metrics.summary_lines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
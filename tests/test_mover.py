@@ -1,9 +1,15 @@
 import unittest
 import os
 import shutil
+import errno
+import hashlib
 import tempfile
+from datetime import datetime
 from pathlib import Path
-from src.mover import move_media_safe, STATUS_SUCCESS, STATUS_DUPLICATE, STATUS_SKIPPED
+from unittest import mock
+from src.mover import (move_media_safe, _copy_validate_delete, STATUS_SUCCESS, STATUS_DUPLICATE, STATUS_SKIPPED,
+                       TRANSFER_RENAME, TRANSFER_COPY)
+from src.dest_index import DestinationIndex
 from src.scanner import MediaGroup
 from src.cleaner import clean_empty_directories
 
@@ -119,5 +125,78 @@ class TestMoverAndCleaner(unittest.TestCase):
         with open(renamed_file, "rb") as f:
             self.assertEqual(f.read(), b"CONTENIDO_NUEVO")
 
+    def test_same_device_uses_rename(self):
+        f = self.src_dir / "rename.jpg"
+        f.write_bytes(b"datos")
+        inode = f.stat().st_ino
+        dest = self.dst_dir / "rename.jpg"
+
+        no_copy = AssertionError("no debería copiar")
+        with mock.patch("src.mover.copy_file", side_effect=no_copy), \
+             mock.patch("src.copier._copy_kernel", side_effect=no_copy):
+            transfer, copied = _copy_validate_delete(f, dest)
+        self.assertEqual((transfer, copied.size), (TRANSFER_RENAME, 5))
+        self.assertFalse(f.exists())
+        self.assertEqual(dest.stat().st_ino, inode)
+
+    def test_rename_failure_falls_back_to_copy(self):
+        f = self.src_dir / "cross.jpg"
+        f.write_bytes(b"datos")
+        dest = self.dst_dir / "cross.jpg"
+
+        with mock.patch("src.mover.os.link", side_effect=OSError(errno.EXDEV, "cross-device")):
+            transfer, copied = _copy_validate_delete(f, dest)
+        self.assertEqual((transfer, copied.size), (TRANSFER_COPY, 5))
+        self.assertEqual(copied.digest, hashlib.sha256(b"datos").hexdigest())
+        self.assertFalse(f.exists())
+        self.assertEqual(dest.read_bytes(), b"datos")
+
+    def test_result_records_transfer(self):
+        f = self.src_dir / "foto.jpg"
+        f.write_bytes(b"1234")
+        (self.src_dir / "foto.xmp").write_bytes(b"xmp")
+
+        group = MediaGroup(f)
+        group.add_sidecar(self.src_dir / "foto.xmp")
+        result = move_media_safe(group, self.dst_dir)
+        self.assertEqual(result.transfer, TRANSFER_RENAME)
+        self.assertEqual(result.size, 7)
+        self.assertIn(TRANSFER_RENAME, result.message)
+
+    def test_file_appearing_after_listing_is_not_clobbered(self):
+        # El índice listó la carpeta vacía; luego otro proceso deja un archivo con el mismo nombre
+        index = DestinationIndex()
+        target_dir = self.dst_dir / "2021" / "03-marzo"
+        target_dir.mkdir(parents=True)
+        self.assertIsNone(index.lookup(target_dir / "foto.jpg"))
+        (target_dir / "foto.jpg").write_bytes(b"de otro proceso")
+
+        f = self.src_dir / "foto.jpg"
+        # Con enlaces duros y en sistemas sin ellos (comprobación justo antes de renombrar)
+        for link in (os.link, mock.Mock(side_effect=OSError(errno.EPERM, "sin enlaces duros"))):
+            with self.subTest(link=link):
+                f.write_bytes(b"nuestro")
+                with mock.patch("src.mover.os.link", link):
+                    result = move_media_safe(MediaGroup(f), self.dst_dir, dest_index=index,
+                                             date_taken=datetime(2021, 3, 4))
+                self.assertEqual(result.status, STATUS_SUCCESS, result.message)
+                self.assertEqual((target_dir / "foto.jpg").read_bytes(), b"de otro proceso")
+                self.assertEqual(result.destination.read_bytes(), b"nuestro")
+        self.assertEqual(sorted(p.name for p in target_dir.iterdir()), ["foto.jpg", "foto_dup_1.jpg", "foto_dup_2.jpg"])
+
+    def test_without_index_checks_names_directly(self):
+        target_dir = self.dst_dir / "2021" / "03-marzo"
+        target_dir.mkdir(parents=True)
+        for i in range(50):
+            (target_dir / f"otra_{i}.jpg").write_bytes(b"x")
+        (target_dir / "foto.jpg").write_bytes(b"distinto")
+        f = self.src_dir / "foto.jpg"
+        f.write_bytes(b"nuestro")
+
+        with mock.patch("src.dest_index.os.scandir", side_effect=AssertionError("no debería listar")):
+            result = move_media_safe(MediaGroup(f), self.dst_dir, date_taken=datetime(2021, 3, 4))
+        self.assertEqual(result.status, STATUS_SUCCESS, result.message)
+        self.assertEqual(result.destination, target_dir / "foto_dup_1.jpg")
+
 if __name__ == '__main__':
     unittest.main()
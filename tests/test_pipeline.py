@@ -0,0 +1,170 @@
+import unittest
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from pathlib import Path
+from src.pipeline import organize_pipeline
+from src.mover import STATUS_SUCCESS
+from src.scanner import scan_directory
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.src = self.root / "src"
+        self.dst = self.root / "dst"
+        self.src.mkdir()
+        self.dst.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def create_files(self, count):
+        for i in range(count):
+            folder = self.src / f"card{i % 5}"
+            folder.mkdir(exist_ok=True)
+            (folder / f"IMG_{i:04d}.jpg").write_bytes(f"foto {i}".encode())
+
+    def test_moves_everything_with_parallel_stages(self):
+        self.create_files(60)
+
+        results = list(organize_pipeline(self.src, self.dst, date_workers=4, mover_workers=3, queue_size=4))
+
+        self.assertEqual(len(results), 60)
+        self.assertTrue(all(r.status == STATUS_SUCCESS for _, r in results))
+        self.assertEqual(len(list(self.dst.rglob("*.jpg"))), 60)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))), 0)
+
+    def test_name_collisions_resolved_with_several_movers(self):
+        # Mismo nombre y distinto contenido en varias carpetas: deben acabar como _dup_N
+        for i in range(6):
+            folder = self.src / f"card{i}"
+            folder.mkdir()
+            (folder / "IMG_0001.JPG").write_bytes(f"contenido {i}".encode())
+
+        results = list(organize_pipeline(self.src, self.dst, date_workers=3, mover_workers=3))
+
+        self.assertEqual(len(results), 6)
+        names = sorted(p.name for p in self.dst.rglob("*.JPG"))
+        self.assertEqual(len(names), 6)
+        self.assertIn("IMG_0001.JPG", names)
+        self.assertIn("IMG_0001_dup_5.JPG", names)
+
+    def test_dry_run_moves_nothing(self):
+        self.create_files(10)
+        results = list(organize_pipeline(self.src, self.dst, dry_run=True))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))), 10)
+        self.assertEqual(len(list(self.dst.rglob("*.jpg"))), 0)
+
+    def test_explicit_groups_skip_the_scan(self):
+        # Modo vigilancia: solo se organizan los grupos entregados, no todo el origen
+        self.create_files(10)
+        groups = [g for g in scan_directory(self.src) if g.main_file.parent.name == "card0"]
+
+        results = list(organize_pipeline(self.src, self.dst, groups=groups))
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))), 8)
+
+    def test_stop_event_discards_pending_work(self):
+        self.create_files(200)
+        stop = threading.Event()
+
+        processed = 0
+        for _ in organize_pipeline(self.src, self.dst, queue_size=2, stop_event=stop):
+            processed += 1
+            if processed == 5:
+                stop.set()
+
+        self.assertLess(processed, 200)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))) + len(list(self.dst.rglob("*.jpg"))), 200)
+
+    def test_abandoned_generator_releases_threads(self):
+        self.create_files(50)
+        before = threading.active_count()
+
+        pipeline = organize_pipeline(self.src, self.dst, queue_size=2)
+        next(pipeline)
+        pipeline.close()
+
+        self.assertEqual(threading.active_count(), before)
+
+    def test_failed_date_extraction_keeps_one_mover_per_folder(self):
+        from datetime import datetime
+        from src import pipeline
+        self.create_files(40)
+        now = datetime.now()
+
+        def flaky_date(path, cache=None):
+            # La mitad falla: la fecha de respaldo (ctime) cae en la misma carpeta que el resto
+            if int(path.stem[-4:]) % 2:
+                raise OSError("lectura fallida")
+            return now
+
+        movers_by_folder = {}
+        real_move = pipeline.move_media_safe
+        def recording_move(media_group, *args, **kwargs):
+            result = real_move(media_group, *args, **kwargs)
+            folder = result.destination.parent
+            movers_by_folder.setdefault(folder, set()).add(threading.current_thread().name)
+            return result
+
+        with mock.patch("src.pipeline.get_date_taken", flaky_date), \
+             mock.patch("src.pipeline.move_media_safe", recording_move):
+            results = list(organize_pipeline(self.src, self.dst, date_workers=4, mover_workers=4))
+
+        self.assertTrue(all(r.status == STATUS_SUCCESS for _, r in results))
+        self.assertEqual(len(results), 40)
+        for folder, movers in movers_by_folder.items():
+            self.assertEqual(len(movers), 1, folder)
+
+    def run_until_failure(self, **kwargs):
+        """Consume el pipeline en otro hilo: si algún hilo no envía su fin, el test no se cuelga."""
+        outcome = {}
+        def consume():
+            try:
+                outcome["results"] = list(organize_pipeline(self.src, self.dst, queue_size=2, **kwargs))
+            except Exception as e:
+                outcome["error"] = e
+        consumer = threading.Thread(target=consume, daemon=True)
+        consumer.start()
+        consumer.join(10)
+        self.assertFalse(consumer.is_alive(), "el pipeline no terminó")
+        return outcome.get("error")
+
+    def test_mover_failure_ends_the_generator_and_reraises(self):
+        self.create_files(30)
+        checkpoint = mock.Mock()
+        checkpoint.is_done.return_value = False
+        checkpoint.record.side_effect = RuntimeError("record roto")
+
+        error = self.run_until_failure(mover_workers=2, checkpoint=checkpoint)
+
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(str(error), "record roto")
+
+    def test_discard_failure_in_mover_ends_the_generator_and_reraises(self):
+        from src.mover import OperationResult, STATUS_ERROR
+        self.create_files(30)
+        snapshot = mock.Mock()
+        snapshot.forget.side_effect = RuntimeError("forget roto")
+
+        with mock.patch("src.pipeline.move_media_safe", return_value=OperationResult(STATUS_ERROR, "fallo")), \
+             mock.patch("src.pipeline.scan_directory", side_effect=lambda *a, **k: scan_directory(self.src)):
+            error = self.run_until_failure(snapshot=snapshot)
+
+        self.assertIsInstance(error, RuntimeError)
+
+    def test_date_worker_failure_ends_the_generator_and_reraises(self):
+        self.create_files(30)
+
+        with mock.patch("src.pipeline.get_date_taken", side_effect=OSError("exif")), \
+             mock.patch("src.pipeline.get_filesystem_date", side_effect=RuntimeError("stat roto")):
+            error = self.run_until_failure(date_workers=2)
+
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(len(list(self.src.rglob("*.jpg"))), 30)
+
+if __name__ == '__main__':
+    unittest.main()
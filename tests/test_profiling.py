@@ -0,0 +1,99 @@
+import unittest
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from src.mover import STATUS_SUCCESS
+from src.pipeline import organize_pipeline
+from src.profiling import RunProfiler
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+def outside_worker(stop):
+    while not stop.is_set():
+        busy(0.01)
+
+class TestRunProfiler(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_profiles_owner_and_prefixed_threads_only(self):
+        stop = threading.Event()
+        # Hilo ajeno (como el mainloop de Tk): ya existe y no lleva el prefijo
+        outsider = threading.Thread(target=outside_worker, args=(stop,), name="tk-mainloop")
+        outsider.start()
+        try:
+            with RunProfiler(self.root / "perfil", sample_interval=0.005) as profiler:
+                worker = threading.Thread(target=busy, args=(0.2,), name="ordenafotos-date-0")
+                other = threading.Thread(target=busy, args=(0.05,), name="otro-hilo")
+                worker.start()
+                other.start()
+                busy(0.1)
+                worker.join()
+                other.join()
+        finally:
+            stop.set()
+            outsider.join()
+
+        names = sorted(path.name for path in profiler.files)
+        self.assertEqual(names, ["perfil.folded", "perfil.pstats", "perfil_memoria.txt"])
+
+        roots = {line.split(";")[0] for line in (self.root / "perfil.folded").read_text().splitlines()}
+        self.assertEqual(roots, {"worker", "ordenafotos-date"})
+        self.assertGreater(profiler.samples, 0)
+
+        stats = pstats.Stats(str(self.root / "perfil.pstats"))
+        functions = {name for _, _, name in stats.stats}
+        self.assertIn("busy", functions)
+        if sys.version_info < (3, 12):
+            # Desde 3.12 cProfile es global al proceso: solo las pilas muestreadas filtran por hilo
+            self.assertNotIn("outside_worker", functions)
+        self.assertTrue(profiler.summary_lines())
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(threading.getprofile())
+
+    def test_pipeline_threads_survive_profiling(self):
+        src, dst = self.root / "src", self.root / "dst"
+        for i in range(30):
+            folder = src / f"card{i % 3}"
+            folder.mkdir(parents=True, exist_ok=True)
+            (folder / f"IMG_{i:04d}.jpg").write_bytes(f"foto {i}".encode())
+        dst.mkdir()
+
+        results = []
+        def run():
+            with RunProfiler(self.root / "perfil", sample_interval=0.005, trace_memory=False):
+                results.extend(organize_pipeline(src, dst, date_workers=3, mover_workers=2))
+        # En un hilo aparte: si un hilo del pipeline muriera, el test no debe colgarse
+        runner = threading.Thread(target=run, daemon=True)
+        runner.start()
+        runner.join(30)
+        self.assertFalse(runner.is_alive(), "el pipeline se quedó colgado bajo el perfilador")
+
+        self.assertEqual(len(results), 30)
+        self.assertTrue(all(result.status == STATUS_SUCCESS for _, result in results))
+        stats = pstats.Stats(str(self.root / "perfil.pstats"))
+        self.assertTrue(any(name == "move_media_safe" for _, _, name in stats.stats))
+
+    def test_stop_is_idempotent_and_memory_optional(self):
+        profiler = RunProfiler(self.root / "sub" / "perfil", trace_memory=False)
+        profiler.start()
+        busy(0.02)
+        files = profiler.stop()
+        self.assertEqual(profiler.stop(), files)
+        self.assertEqual(sorted(path.name for path in files), ["perfil.folded", "perfil.pstats"])
+
+
+if __name__ == '__main__':
+    unittest.main()
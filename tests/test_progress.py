@@ -0,0 +1,109 @@
+import unittest
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from src.progress import ProgressTracker, STAGE_SCAN, STAGE_HASH, STAGE_COPY, format_event, format_duration
+from src.pipeline import organize_pipeline
+from src.deduplicator import scan_and_move_duplicates
+
+class TestProgressTracker(unittest.TestCase):
+    def test_rates_and_eta(self):
+        tracker = ProgressTracker()
+        tracker.add_total(STAGE_COPY, 10, 10_000_000)
+        with mock.patch("src.progress.time.monotonic", side_effect=[100.0, 102.0]):
+            tracker.advance(STAGE_COPY, 2, 2_000_000)
+            event = tracker.event(STAGE_COPY)
+
+        self.assertAlmostEqual(event.fraction, 0.2)
+        self.assertAlmostEqual(event.files_per_s, 1.0)
+        self.assertAlmostEqual(event.mb_per_s, 1.0)
+        self.assertEqual(event.bytes_remaining, 8_000_000)
+        self.assertAlmostEqual(event.eta, 8.0)
+        self.assertEqual(event.as_dict()["eta_s"], 8.0)
+
+    def test_fraction_by_files_without_bytes(self):
+        tracker = ProgressTracker()
+        tracker.add_total(STAGE_SCAN, 4)
+        tracker.advance(STAGE_SCAN)
+        self.assertAlmostEqual(tracker.event(STAGE_SCAN).fraction, 0.25)
+        self.assertIsNone(ProgressTracker().event(STAGE_HASH).eta)
+
+    def test_finish_completes_the_stage(self):
+        tracker = ProgressTracker()
+        tracker.add_total(STAGE_HASH, 5, 500)
+        tracker.advance(STAGE_HASH, 3, 300)
+        tracker.finish(STAGE_HASH)
+        event = tracker.event(STAGE_HASH)
+        self.assertEqual((event.fraction, event.files_total, event.eta), (1.0, 3, 0.0))
+        self.assertTrue(event.total_final)
+
+    def test_current_is_latest_running_stage(self):
+        tracker = ProgressTracker()
+        self.assertIsNone(tracker.current())
+        tracker.advance(STAGE_SCAN)
+        time.sleep(0.001)
+        tracker.advance(STAGE_COPY)
+        tracker.advance(STAGE_SCAN)
+        self.assertEqual(tracker.current().stage, STAGE_COPY)
+        tracker.finish(STAGE_COPY)
+        self.assertEqual(tracker.current().stage, STAGE_SCAN)
+
+    def test_format(self):
+        tracker = ProgressTracker()
+        tracker.add_total(STAGE_COPY, 100, 1024 ** 3)
+        tracker.advance(STAGE_COPY, 50, 1024 ** 3 // 2)
+        text = format_event(tracker.event(STAGE_COPY))
+        self.assertIn("Copia: 50/~100 archivos (50%)", text)
+        self.assertIn("quedan 0.50 GB", text)
+        self.assertEqual(format_duration(3725), "1:02:05")
+        self.assertEqual(format_duration(65), "1:05")
+
+
+class TestStageProgress(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.src = self.root / "src"
+        for i in range(12):
+            path = self.src / f"card{i % 3}" / f"IMG_{i:03d}.jpg"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"x" * (100 + i))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_pipeline_publishes_scan_and_copy(self):
+        tracker = ProgressTracker()
+        list(organize_pipeline(self.src, self.root / "dst", progress=tracker, mover_workers=2))
+
+        copy = tracker.event(STAGE_COPY)
+        self.assertEqual((copy.files_done, copy.files_total), (12, 12))
+        self.assertEqual(copy.bytes_done, sum(100 + i for i in range(12)))
+        self.assertTrue(copy.finished)
+        self.assertEqual(tracker.event(STAGE_SCAN).files_done, 12)
+
+    def test_pipeline_estimates_total_for_explicit_groups(self):
+        from src.scanner import scan_directory
+        groups = list(scan_directory(self.src))[:5]
+        tracker = ProgressTracker()
+        list(organize_pipeline(self.src, self.root / "dst", groups=groups, progress=tracker))
+        copy = tracker.event(STAGE_COPY)
+        self.assertEqual((copy.files_done, copy.files_total), (5, 5))
+
+    def test_deduplicator_publishes_all_stages(self):
+        for i in range(3):
+            (self.src / f"copia_{i}.jpg").write_bytes(b"x" * 100)
+        tracker = ProgressTracker()
+        list(scan_and_move_duplicates(self.src, progress=tracker))
+
+        self.assertEqual(tracker.event(STAGE_SCAN).files_done, 15)
+        hashed = tracker.event(STAGE_HASH)
+        self.assertEqual(hashed.files_done, 4)
+        self.assertTrue(hashed.finished)
+        moved = tracker.event(STAGE_COPY)
+        self.assertEqual((moved.files_done, moved.bytes_done), (3, 300))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+from src import scanner
+from src.scanner import scan_directory, group_directory
+
+class TestScannerSyscalls(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        for d in range(3):
+            folder = self.test_dir / f"carpeta{d}"
+            folder.mkdir()
+            for i in range(20):
+                (folder / f"IMG_{i:04d}.JPG").touch()
+            (folder / "IMG_0000.xmp").touch()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_no_stat_per_file(self):
+        calls = []
+        real_stat, real_lstat = os.stat, os.lstat
+        with mock.patch("os.stat", side_effect=lambda *a, **k: calls.append(a) or real_stat(*a, **k)), \
+             mock.patch("os.lstat", side_effect=lambda *a, **k: calls.append(a) or real_lstat(*a, **k)):
+            groups = list(scan_directory(self.test_dir))
+
+        self.assertEqual(len(groups), 60)
+        # Solo la resolución de la raíz; nunca un stat por archivo
+        self.assertLess(len(calls), 10)
+
+    def test_root_resolved_once(self):
+        with mock.patch.object(Path, "resolve", autospec=True, side_effect=lambda p, strict=False: Path(os.path.realpath(p))) as resolve:
+            list(scan_directory(self.test_dir))
+        self.assertEqual(resolve.call_count, 1)
+
+    def test_group_directory_uses_listing_only(self):
+        groups = list(group_directory(Path("/no/existe"), ["a.JPG", "a.JPG.xmp", "b.mov", "nota.txt"]))
+        self.assertEqual([g.main_file.name for g in groups], ["a.JPG", "b.mov"])
+        self.assertEqual([s.name for s in groups[0].sidecars], ["a.JPG.xmp"])
+
+class TestParallelScanner(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        for rel in ("a.jpg", "a.xmp", "x/b.jpg", "x/y/c.mov", "x/y/c.mov.aae", "z/@eaDir/t.jpg",
+                    "z/d.png", "privado/e.jpg"):
+            path = self.test_dir / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def summary(self, groups):
+        return sorted((str(g.main_file), tuple(sorted(str(s) for s in g.sidecars))) for g in groups)
+
+    def test_same_groups_and_exclusions_as_serial(self):
+        excluded = {"**/@eaDir", str(self.test_dir / "privado")}
+        serial = self.summary(scan_directory(self.test_dir, excluded))
+        parallel = self.summary(scan_directory(self.test_dir, excluded, workers=4))
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(serial), 4)
+
+    def test_directories_are_listed_concurrently(self):
+        real_list = scanner._list_directory
+        active = [0, 0]
+        lock = threading.Lock()
+
+        def slow_list(path):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return real_list(path)
+
+        for i in range(8):
+            (self.test_dir / f"tarjeta{i}").mkdir()
+        with mock.patch("src.scanner._list_directory", side_effect=slow_list):
+            list(scan_directory(self.test_dir, workers=4))
+        self.assertGreater(active[1], 1)
+
+    def test_early_close(self):
+        gen = scan_directory(self.test_dir, workers=4)
+        next(gen)
+        gen.close()
+
+if __name__ == '__main__':
+    unittest.main()
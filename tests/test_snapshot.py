@@ -0,0 +1,96 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from src import snapshot as snapshot_module
+from src.snapshot import DirectorySnapshot
+from src.scanner import scan_directory
+
+class TestDirectorySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+        self.src = self.test_dir / "src"
+        for rel in ("a.jpg", "2020/b.jpg", "2020/05/c.jpg", "2021/d.mov"):
+            self.create(rel)
+        self.snapshot = DirectorySnapshot(self.test_dir / "snap.db")
+        self.clock = time.time() - 3600
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.test_dir)
+
+    def create(self, rel, content=b"x"):
+        path = self.src / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+    def age(self):
+        """Fecha las carpetas en el pasado (fuera del margen de mtime recién modificado)."""
+        self.clock += 60
+        for folder in [self.src] + [p for p in self.src.rglob("*") if p.is_dir()]:
+            os.utime(folder, (self.clock, self.clock))
+
+    def scan(self, **kwargs):
+        return sorted(g.main_file.name for g in scan_directory(self.src, snapshot=self.snapshot, **kwargs))
+
+    def test_unchanged_tree_is_not_listed(self):
+        self.age()
+        self.assertEqual(self.scan(), ["a.jpg", "b.jpg", "c.jpg", "d.mov"])
+        with mock.patch("src.snapshot._list_with_stats", side_effect=AssertionError("no debería listar")):
+            self.assertEqual(self.scan(), [])
+        self.assertEqual(self.snapshot.hits, 4)
+
+    def test_only_changed_directory_is_listed(self):
+        self.age()
+        self.scan()
+        self.create("2020/05/nueva.jpg")
+        os.utime(self.src / "2020" / "05", (self.clock + 30, self.clock + 30))
+
+        listed = []
+        real = snapshot_module._list_with_stats
+        with mock.patch("src.snapshot._list_with_stats", side_effect=lambda p: listed.append(p) or real(p)):
+            self.assertEqual(self.scan(), ["nueva.jpg"])
+        self.assertEqual(listed, [self.src / "2020" / "05"])
+
+    def test_full_rescan_yields_everything(self):
+        self.age()
+        self.scan()
+        self.assertEqual(self.scan(full_rescan=True), ["a.jpg", "b.jpg", "c.jpg", "d.mov"])
+
+    def test_recent_directory_is_listed_again(self):
+        # Sin envejecer: mtime dentro del margen, la carpeta no se da por estable
+        self.scan()
+        with mock.patch("src.snapshot._list_with_stats", wraps=snapshot_module._list_with_stats) as lister:
+            self.assertEqual(self.scan(), [])
+        self.assertGreater(lister.call_count, 0)
+
+    def test_forgotten_file_is_yielded_again(self):
+        self.age()
+        self.scan()
+        self.snapshot.forget(self.src / "2020" / "b.jpg")
+        self.assertEqual(self.scan(), ["b.jpg"])
+
+    def test_interrupted_scan_resumes(self):
+        for i in range(5):
+            self.create(f"lote/{i}.jpg")
+        self.age()
+        gen = scan_directory(self.src, snapshot=self.snapshot)
+        next(gen)
+        gen.close()
+        # Ninguna carpeta llegó a confirmarse: la siguiente ejecución emite todo otra vez
+        self.assertEqual(len(self.scan()), 9)
+
+    def test_deleted_directories_are_pruned(self):
+        self.age()
+        self.scan()
+        shutil.rmtree(self.src / "2021")
+        os.utime(self.src, (self.clock + 30, self.clock + 30))
+        self.scan()
+        self.assertEqual(len(self.snapshot), 3)
+
+if __name__ == '__main__':
+    unittest.main()
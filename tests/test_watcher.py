@@ -0,0 +1,122 @@
+import unittest
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.watcher import watch, inotify_available
+
+FAST = dict(debounce=0.2, settle=0.2, poll_interval=0.1, max_latency=5.0)
+
+class WatcherTestMixin:
+    use_inotify = False
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+        self.src = self.test_dir / "src"
+        self.src.mkdir()
+        self.batches = []
+        self.stop = threading.Event()
+        self.thread = None
+
+    def tearDown(self):
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join(10)
+        shutil.rmtree(self.test_dir)
+
+    def start(self, **kwargs):
+        options = dict(FAST, use_inotify=self.use_inotify, stop_event=self.stop)
+        options.update(kwargs)
+        ready = threading.Event()
+
+        def run():
+            generator = watch(self.src, **options)
+            ready.set()
+            for batch in generator:
+                self.batches.append(batch)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        # Dar tiempo a que se instalen los watches (o a la primera pasada del sondeo)
+        time.sleep(0.3)
+
+    def create(self, rel, content=b"x"):
+        path = self.src / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+    def delivered(self):
+        return sorted(g.main_file.name for batch in self.batches for g in batch)
+
+    def wait_for(self, count, timeout=10):
+        deadline = time.monotonic() + timeout
+        while len(self.delivered()) < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.delivered()
+
+    def test_new_files_are_grouped_with_sidecars(self):
+        self.start()
+        self.create("a.jpg")
+        self.create("a.xmp")
+        self.create("b.mov")
+        self.assertEqual(self.wait_for(2), ["a.jpg", "b.mov"])
+        groups = {g.main_file.name: g for batch in self.batches for g in batch}
+        self.assertEqual([p.name for p in groups["a.jpg"].sidecars], ["a.xmp"])
+
+    def test_new_subfolder_is_watched(self):
+        self.start()
+        self.create("2024/05/c.jpg")
+        self.assertEqual(self.wait_for(1), ["c.jpg"])
+
+    def test_burst_is_delivered_in_few_batches(self):
+        self.start()
+        for i in range(300):
+            self.create(f"dump/IMG_{i:04d}.jpg")
+        self.assertEqual(len(self.wait_for(300)), 300)
+        self.assertLessEqual(len(self.batches), 3)
+
+    def test_growing_file_waits_until_stable(self):
+        self.start()
+        path = self.create("big.jpg", b"a")
+        for _ in range(8):
+            time.sleep(0.1)
+            with open(path, "ab") as f:
+                f.write(b"a" * 1024)
+        self.assertEqual(self.wait_for(1), ["big.jpg"])
+        self.assertEqual(self.batches[0][0].main_file.stat().st_size, 1 + 8 * 1024)
+
+    def test_excluded_folders_are_ignored(self):
+        self.start(excluded_folders={str(self.src / "private"), "**/@eaDir"})
+        self.create("private/p.jpg")
+        self.create("x/@eaDir/t.jpg")
+        self.create("ok.jpg")
+        self.assertEqual(self.wait_for(1), ["ok.jpg"])
+        time.sleep(0.5)
+        self.assertEqual(self.delivered(), ["ok.jpg"])
+
+    def test_initial_scan(self):
+        self.create("old.jpg")
+        self.start()
+        self.assertEqual(self.wait_for(1), ["old.jpg"])
+
+    def test_without_initial_scan_existing_files_are_skipped(self):
+        self.create("old.jpg")
+        self.start(initial_scan=False)
+        self.create("new.jpg")
+        self.assertEqual(self.wait_for(1), ["new.jpg"])
+
+
+class TestPollingWatcher(WatcherTestMixin, unittest.TestCase):
+    use_inotify = False
+
+
+@unittest.skipUnless(inotify_available(), "inotify no disponible")
+class TestInotifyWatcher(WatcherTestMixin, unittest.TestCase):
+    use_inotify = True
+
+
+if __name__ == '__main__':
+    unittest.main()